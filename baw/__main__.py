@@ -15,6 +15,10 @@ import traceback
 def run():
     """Entry point of script"""
     try:
+        import baw.client
+        returncode = baw.client.forward()
+        if returncode is not None:
+            sys.exit(returncode)
         import baw.dockers
         sys.exit(baw.dockers.switch_docker())
     except KeyboardInterrupt:
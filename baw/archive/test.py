@@ -6,13 +6,45 @@
 # use or distribution is an offensive act against international law and may
 # be prosecuted under federal law. Its content is company confidential.
 # =============================================================================
+"""Archive of successfully tested commits.
 
+The archive is a sqlite database keyed by commit hash. Parallel CI jobs
+can write it concurrently. The legacy `tested` text file is imported on
+first use.
+"""
+
+import contextlib
+import dataclasses
 import os
+import sqlite3
+import time
 
 import utilo
 
 import baw.config
-import baw.utils
+
+# wait for concurrent writer in secs
+TIMEOUT = 30.0
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS tested (
+    hash TEXT PRIMARY KEY,
+    mode TEXT,
+    duration REAL,
+    workers INTEGER,
+    requirements TEXT,
+    created REAL
+)"""
+
+
+@dataclasses.dataclass
+class Record:
+    hash: str
+    mode: str = None
+    duration: float = None
+    workers: int = None
+    requirements: str = None
+    created: float = None
 
 
 def path_tested(root: str) -> str:
@@ -20,27 +52,94 @@ def path_tested(root: str) -> str:
     return utilo.join(tmpdir, 'tested')
 
 
+def path_archive(root: str) -> str:
+    return f'{path_tested(root)}.db'
+
+
+@contextlib.contextmanager
+def connect(root: str):
+    path = path_archive(root)
+    created = not os.path.exists(path)
+    connection = sqlite3.connect(path, timeout=TIMEOUT)
+    try:
+        if created:
+            # allow readers while another process writes
+            connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            connection.execute(SCHEMA)
+            if created:
+                migrate(root, connection)
+        yield connection
+    finally:
+        connection.close()
+
+
+def migrate(root: str, connection):
+    """Import hashes of legacy text archive."""
+    legacy = path_tested(root)
+    if not os.path.exists(legacy):
+        return
+    hashes = utilo.file_read(legacy).split()
+    connection.executemany(
+        'INSERT OR IGNORE INTO tested (hash) VALUES (?)',
+        [(item,) for item in hashes],
+    )
+
+
 def is_tested(root: str, hashed: str) -> bool:
+    return record(root, hashed) is not None
+
+
+def record(root: str, hashed: str) -> Record | None:
+    """Load test record of commit `hashed`, None if it was not tested."""
     assert hashed.strip(), 'require hashed value'
-    archive = path_tested(root)
-    if not os.path.exists(archive):
-        return False
-    content = utilo.file_read(archive)
-    lines = content.splitlines()
-    if any(line.strip() == hashed for line in lines):
-        return True
-    return False
+    if not os.path.exists(path_archive(root)):
+        if not os.path.exists(path_tested(root)):
+            # do not create an empty archive for a lookup
+            return None
+    with connect(root) as connection:
+        row = connection.execute(
+            'SELECT * FROM tested WHERE hash = ?',
+            (hashed.strip(),),
+        ).fetchone()
+    if row is None:
+        return None
+    return Record(*row)
+
 
+def mark_tested(  # pylint:disable=R0913
+    root: str,
+    hashed: str,
+    *,
+    mode: str = None,
+    duration: float = None,
+    workers: int = None,
+    requirements: str = None,
+) -> bool:
+    """Record successful test run of commit `hashed`.
 
-def mark_tested(root: str, hashed: str) -> bool:
+    Args:
+        root(str): project root
+        hashed(str): commit hash
+        mode(str): selected tests, for example `long` or `all`
+        duration(float): runtime of tests in secs
+        workers(int): number of pytest-xdist workers
+        requirements(str): hash of requirements, see `baw.cmd.info.requirement_hash`
+    Returns:
+        True if recorded
+    """
     assert hashed.strip(), 'require hashed value'
-    if is_tested(root, hashed):
-        return True
-    archive = path_tested(root)
-    # add newline to separate hash values in file
-    hashed = f'{hashed}\n'
-    if os.path.exists(archive):
-        baw.utils.file_append(archive, hashed)
-    else:
-        utilo.file_create(archive, hashed)
+    with connect(root) as connection:
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO tested VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    hashed.strip(),
+                    mode,
+                    duration,
+                    workers,
+                    requirements,
+                    time.time(),
+                ),
+            )
     return True
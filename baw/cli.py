@@ -9,66 +9,99 @@
 """Define structure of cmd line interface."""
 
 import argparse
+import collections
+import importlib
 import sys
 
-import baw.cmd.baseline
-import baw.cmd.clean
-import baw.cmd.cov
-import baw.cmd.doc
-import baw.cmd.format
-import baw.cmd.generate
-import baw.cmd.ide
-import baw.cmd.image
-import baw.cmd.info
-import baw.cmd.init
-import baw.cmd.install
-import baw.cmd.lint
-import baw.cmd.pipe
-import baw.cmd.publish
-import baw.cmd.rebase
-import baw.cmd.refactor
-import baw.cmd.release
-import baw.cmd.sh
-import baw.cmd.sync
-import baw.cmd.test
-import baw.cmd.upgrade
 import baw.run
 
+Command = collections.namedtuple('Command', 'name module extend help')
 
-def create_parser():  # noqa: Z21
+# Subcommands are registered by light metadata only. The module which
+# defines a subcommand is imported when the subcommand is selected. This
+# avoids importing docker, git, semver, pip... when running trivial cmds
+# like `baw info shortcut` or `baw --version`.
+COMMANDS = (
+    Command('init', 'baw.cmd.init', 'extend_cli', 'Create .baw project'),
+    Command('rebase', 'baw.cmd.rebase', 'extend_cli', 'Sync branches.'),
+    Command('ide', 'baw.cmd.ide', 'extend_cli', 'Create Workspace and open IDE'),
+    Command('open', 'baw.cli', 'add_open_options', 'Open directory'),
+    Command('doc', 'baw.cmd.doc', 'extend_cli', 'Generate docs using Sphinx'),
+    Command('clean', 'baw.cmd.clean', 'extend_cli', 'Remove generated content'),
+    Command('upgrade', 'baw.cmd.upgrade', 'extend_cli', 'Upgrade requirements.txt/dev/ext'),
+    Command('sync', 'baw.cmd.sync', 'extend_cli', 'Synchronize project requirements'),
+    Command('install', 'baw.cmd.install', 'extend_cli', 'Run install task'),
+    Command('generate', 'baw.cmd.generate', 'extend_cli', 'Generate test data'),
+    Command('test', 'baw.cmd.test', 'extend_cli', 'Run unit tests'),
+    Command('format', 'baw.cmd.format', 'extend_cli', 'Format code'),
+    Command('lint', 'baw.cmd.lint', 'extend_cli', 'Statical code analysis'),
+    Command('pipe', 'baw.cmd.pipe', 'extend_cli', 'Run pipline task'),
+    Command('image', 'baw.cmd.image', 'extend_cli', 'Create docker environment'),
+    Command('refactor', 'baw.cmd.refactor', 'extend_cli', 'Run refactor'),
+    Command('sh', 'baw.cli', 'add_shell_option', 'Run shell cmd in env'),
+    Command('plan', 'baw.cli', 'add_plan_options', 'Manage release plans'),
+    Command('baseline', 'baw.cmd.baseline', 'extend_cli', 'Run baseline command'),
+    Command('cov', 'baw.cmd.cov', 'extend_cli', 'Manage test coverage'),
+    Command('release', 'baw.cmd.release', 'extend_cli', 'Test, commit, tag and publish'),
+    Command('publish', 'baw.cmd.publish', 'extend_cli', 'Push release to repository'),
+    Command('info', 'baw.cmd.info', 'extend_cli', 'Print project information'),
+    Command('serve', 'baw.cmd.serve', 'extend_cli', 'Serve baw cmds in a daemon'),
+)  # yapf:disable
+
+
+def create_parser(argv: list = None):  # noqa: Z21
     """Create parser out of defined dictionary with cmd-line-definition.
 
-    Returns created argparser
+    Only the selected subcommand is loaded completely, all other
+    subcommands are represented by their help text.
+
+    Args:
+        argv(list): cmd line to parse, use sys.argv if nothing is given
+    Returns:
+        created argparser
     """
     parser = argparse.ArgumentParser(prog='baw')
     add_parameter(parser)
     cmds = parser.add_subparsers(help='sub-cmd help')
-    baw.cmd.init.extend_cli(cmds)
-    baw.cmd.rebase.extend_cli(cmds)
-    baw.cmd.ide.extend_cli(cmds)
-    add_open_options(cmds)
-    baw.cmd.doc.extend_cli(cmds)
-    baw.cmd.clean.extend_cli(cmds)
-    baw.cmd.upgrade.extend_cli(cmds)
-    baw.cmd.sync.extend_cli(cmds)
-    baw.cmd.install.extend_cli(cmds)
-    baw.cmd.generate.extend_cli(cmds)
-    baw.cmd.test.extend_cli(cmds)
-    baw.cmd.format.extend_cli(cmds)
-    baw.cmd.lint.extend_cli(cmds)
-    baw.cmd.pipe.extend_cli(cmds)
-    baw.cmd.image.extend_cli(cmds)
-    baw.cmd.refactor.extend_cli(cmds)
-    add_shell_option(cmds)
-    add_plan_options(cmds)
-    baw.cmd.baseline.extend_cli(cmds)
-    baw.cmd.cov.extend_cli(cmds)
-    baw.cmd.release.extend_cli(cmds)
-    baw.cmd.publish.extend_cli(cmds)
-    baw.cmd.info.extend_cli(cmds)
+    selected = select_command(sys.argv[1:] if argv is None else argv)
+    for command in COMMANDS:
+        if command.name != selected:
+            cmds.add_parser(command.name, help=command.help)
+            continue
+        module = importlib.import_module(command.module)
+        extend = getattr(module, command.extend)
+        extend(cmds)
     return parser
 
 
+def select_command(argv: list) -> str | None:
+    """Select registered subcommand out of cmd line.
+
+    Values of options like `--bisect` are skipped, the subcommand is the
+    first positional argument.
+
+    >>> select_command(['--verbose', 'info', 'shortcut'])
+    'info'
+    >>> select_command(['--bisect', 'test', 'lint'])
+    'lint'
+    >>> select_command(['--version']) is None
+    True
+    """
+    probe = argparse.ArgumentParser(add_help=False, exit_on_error=False)
+    add_parameter(probe)
+    try:
+        _, positional = probe.parse_known_args(argv)
+    except argparse.ArgumentError:
+        # invalid option, reported by complete parser
+        return None
+    names = {command.name for command in COMMANDS}
+    for item in positional:
+        if item.startswith('-'):
+            continue
+        return item if item in names else None
+    return None
+
+
 def parse():
     """Parse arguments from sys-args and return the result as dictionary."""
     parser = create_parser()
@@ -101,6 +134,12 @@ def add_parameter(parser):
         '--docken',
         help='Use docker generated env, inject PASSWORD=xxx;BASE=hello',
     )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        help='Total number of parallel jobs, default: BAW_JOBS or cpu count',
+    )
     parser.add_argument(
         '--raw',
         action='store_true',
@@ -149,6 +188,7 @@ def add_plan_options(parser):
 
 
 def add_shell_option(parser):
+    import baw.cmd.sh  # pylint:disable=W0621
     init = parser.add_parser('sh', help='Run shell cmd in env')
     init.add_argument('cmd', help='cmd')
     init.set_defaults(func=baw.cmd.sh.run_shell)
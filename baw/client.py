@@ -0,0 +1,57 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Forward cmds to the `baw serve` daemon, see baw.cmd.serve.
+
+Every invocation imports this module, it therefore does not import the
+config or any subcommand. The cli is only imported if a daemon runs.
+"""
+
+import os
+import sys
+
+from baw.plugins import bawserve
+
+SOCKET = 'serve.sock'
+
+# cmds which require an interactive terminal or run the daemon itself
+INTERACTIVE = ('ide', 'open', 'serve')
+
+
+def socket_path() -> str:
+    # baw tmp dir, see baw.config.bawtmp
+    folder = os.environ.get('BAW', '/tmp/.baw')  # nosec B108
+    return bawserve.socket_path(folder, SOCKET)
+
+
+def forward(argv: list = None) -> int | None:
+    """Run cmd inside the daemon if available.
+
+    Args:
+        argv(list): cmd line to forward, use sys.argv if nothing is given
+    Returns:
+        returncode of forwarded cmd or None if no daemon is available
+    """
+    argv = list(sys.argv if argv is None else argv)
+    path = socket_path()
+    # the request contains the environment, do not send it to a socket
+    # of another user
+    if bawserve.SERVING or not bawserve.trusted(path):
+        return None
+    import baw.cli  # pylint:disable=C0415
+    if baw.cli.select_command(argv[1:]) in INTERACTIVE or '--pdb' in argv[1:]:
+        return None
+    connection = bawserve.connect(path)
+    if connection is None:
+        return None
+    request = {
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'env': dict(os.environ.items()),
+    }
+    return bawserve.call(connection, request)
@@ -51,7 +51,7 @@ def commit(root: str, push: bool = True) -> int:
     return returnvalue
 
 
-def test(root, worker: int = 32):
+def test(root, worker: str = 'auto'):
     pre(root)
     testconfig = [f'-n={worker}']
     with enable_baseline():
@@ -81,7 +81,7 @@ def enable_baseline():
 def run(args: dict):
     root = baw.cmd.utils.get_root(args)
     if args['baseline'] == 'test':
-        worker = args.get('n', os.cpu_count())
+        worker = args.get('n', 'auto')
         return test(
             root,
             worker=worker,
@@ -100,7 +100,7 @@ def extend_cli(parser):
     )
     baseline.add_argument(
         '-n',
-        help='process count; use auto to select os.cpu_count',
+        help='process count; use auto to use the whole job budget',
         default='auto',
     )
     baseline.set_defaults(func=run)
@@ -8,7 +8,6 @@
 # =============================================================================
 
 import collections
-import glob
 import os
 import shutil
 import stat
@@ -20,6 +19,7 @@ import baw
 import baw.cmd.utils
 import baw.config
 import baw.gix
+import baw.index
 import baw.runtime
 
 
@@ -40,18 +40,20 @@ def clean(  # pylint:disable=R1260,too-many-branches
     if tmp:
         clean_git(root)
     patterns = create_pattern(root, resources, tmp, tests)
+    # all patterns are matched against one index of the project
+    index = baw.index.snapshot(root)
     # problems while deleting recursive
     ret = 0
     for pattern in patterns:
         if isinstance(pattern, ResourceDir):
             todo = [pattern.path]
         else:
-            try:
-                todo = glob.glob(root + '/**/' + pattern, recursive=True)
-            except NotADirectoryError:
-                todo = glob.glob(root + '**' + pattern, recursive=True)
+            todo = index.match(pattern)
             todo = sorted(todo, reverse=True)  # longtest path first, to avoid
         for item in todo:
+            if not os.path.lexists(item):
+                # removed with folder of previous pattern
+                continue
             baw.log(f'remove {item}')
             try:
                 if os.path.isfile(item):
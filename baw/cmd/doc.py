@@ -13,6 +13,7 @@ import shutil
 import utilo
 
 import baw.config
+import baw.parallel
 import baw.resources
 import baw.runtime
 import baw.utils
@@ -66,6 +67,7 @@ def generate_docs(root: str, verbose: int) -> int:
         root,
         cmd=cmd,
         cwd=root,
+        stream=True,
         verbose=verbose,
     )
     if completed.returncode:
@@ -96,13 +98,14 @@ def generate_docs(root: str, verbose: int) -> int:
 
 def build_html(root: str, verbose: int) -> int:
     # Create html result
+    workers = baw.parallel.share(8)
     build_options = ' '.join([
         # '-vvvv ',
         '-n',  # warn about all missing references
         # '-W',  # turn warning into error # TODO: ENABLE LATER
         '--keep-going',
         # '-b coverage',  # TODO: Check autodoc package
-        '-j 8'
+        f'-j {workers}'
     ])
     doctmp = baw.config.docpath(root)
     htmloutput = utilo.join(doctmp, 'html')
@@ -114,6 +117,8 @@ def build_html(root: str, verbose: int) -> int:
         root,
         cmd=cmd,
         cwd=root,
+        stream=True,
+        jobs=workers,
         verbose=verbose,
     )
     return result.returncode
@@ -0,0 +1,321 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2019-2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Format python sources, imports, toml and yaml files.
+
+The formatted files are taken from the index of the project, which does
+not enter folders ignored by git, see `discover`.
+
+`baw format --changed` formats changed files only. Without --base, a
+file is changed if its content differs from the content after the last
+successful format, see `path_state`. With --base, files which differ
+from the base ref, staged, not staged or untracked, are changed.
+"""
+
+import json
+import os
+
+import tomli_w
+import utilo
+
+import baw.cmd.format.engine
+import baw.cmd.lint.cache
+import baw.cmd.test.impact
+import baw.cmd.utils
+import baw.config
+import baw.index
+import baw.parallel
+import baw.runtime
+import baw.utils
+
+PYTHON = ('.py',)
+TOML = ('.toml',)
+YAML = ('.yml', '.yaml')
+
+
+def evaluate(args):
+    root = baw.cmd.utils.get_root(args)
+    result = format_repository(
+        root,
+        verbose=args.get('verbose', 0),
+        changed=args.get('changed', False),
+        base=args.get('base'),
+    )
+    return result
+
+
+def format_repository(
+    root: str,
+    verbose: int = 0,
+    changed: bool = False,
+    base: str = None,
+):
+    """Format all files of `root`, or changed files only.
+
+    Args:
+        root(str): project root
+        verbose(int): increase logging
+        changed(bool): format files changed since last successful format
+        base(str): format files changed since this git ref instead
+    """
+    found = discover(root)
+    # formatters share the files of a single walk
+    paths = [path for paths in found.values() for path in paths]
+    current = None
+    if changed or base:
+        current = hashes(root, found)
+        paths = changed_files(root, current, base)
+        if paths is None:
+            return baw.FAILURE
+        if not paths:
+            baw.log('format: no changed files')
+            return baw.SUCCESS
+        baw.log(f'format: {len(paths)} changed files')
+    for item in (format_python, format_toml, format_imports, format_yaml):
+        try:
+            # TODO: MAKE VERBOSE LEVEL GOBAL
+            failure = item(root, verbose=verbose, paths=paths)
+        except TypeError:
+            failure = item(root, paths=paths)
+        if failure:
+            return failure
+    if current is not None:
+        store(root, current, paths)
+    return baw.SUCCESS
+
+
+def hashes(root: str, found: dict) -> dict:
+    """Map `found` files of `discover` to content hash."""
+    return {
+        path: baw.cmd.lint.cache.hashed(utilo.join(root, path))
+        for paths in found.values() for path in paths
+    }
+
+
+def discover(root: str, filters: bool = True) -> dict:
+    """Formatted files relative to `root` per suffix of formatter.
+
+    Python files are formatted in sources and tests, toml and yaml files
+    in the whole project. Files which git ignores are skipped, see
+    `baw.index`.
+
+    Args:
+        root(str): project root
+        filters(bool): skip toml files of tmp and yaml files of build
+                       folders in projects without git
+    Returns:
+        dict which maps `PYTHON`, `TOML` and `YAML` to sorted paths
+    """
+    python = ()
+    if os.path.isfile(baw.config.config_path(root)):
+        # toml and yaml files are formatted without project as well
+        python = tuple(f'{item}/' for item in sources(root))
+    index = baw.index.snapshot(root, persist=True)
+    result = {}
+    result[PYTHON] = [
+        path for path in index.files(PYTHON) if f'{path}/'.startswith(python)
+    ]
+    result[TOML] = [
+        path for path in index.files(TOML)
+        if not (filters and path.startswith('tmp/'))
+    ]
+    result[YAML] = [
+        path for path in index.files(YAML)
+        if not (filters and 'build' in path.split('/')[:-1])
+    ]
+    return result
+
+
+def changed_files(root: str, current: dict, base: str = None) -> list | None:
+    """Formatted files which changed since `base` or last format.
+
+    Returns:
+        paths relative to `root`, None if git fails
+    """
+    if base:
+        changed = baw.cmd.test.impact.changed_files(root, base)
+        if changed is None:
+            return None
+        return sorted(set(changed) & current.keys())
+    known = load(root)
+    if known.get('key') != formatters():
+        return sorted(current)
+    files = known.get('files', {})
+    return sorted(
+        path for path, value in current.items() if files.get(path) != value)
+
+
+def formatters() -> str:
+    """Key of formatters and their options, another key formats all."""
+    return baw.cmd.lint.cache.key(
+        *ISORT,
+        STYLE,
+        baw.cmd.lint.cache.version('yapf'),
+        baw.cmd.lint.cache.version('isort'),
+        baw.cmd.lint.cache.version('yamlfix'),
+        baw.cmd.lint.cache.version('utilo'),
+    )
+
+
+def path_state(root: str) -> str:
+    return utilo.join(baw.utils.tmp(root), 'format.json')
+
+
+def load(root: str) -> dict:
+    try:
+        return json.loads(utilo.file_read(path_state(root)))
+    except (AssertionError, ValueError):
+        return {}
+
+
+def store(root: str, current: dict, formatted: list):
+    """Store content hash of files after formatting."""
+    known = load(root)
+    files = known.get('files', {}) if known.get('key') == formatters() else {}
+    # forget removed files
+    files = {path: files[path] for path in current if path in files}
+    for path in formatted:
+        files[path] = baw.cmd.lint.cache.hashed(utilo.join(root, path))
+    baw.utils.file_replace(
+        path_state(root),
+        json.dumps({
+            'key': formatters(),
+            'files': files
+        }),
+    )
+
+
+def selected(root: str, paths: list, suffixes: tuple) -> list:
+    """Absolute paths of `paths` with one of `suffixes`."""
+    return [utilo.join(root, item) for item in paths if item.endswith(suffixes)]
+
+
+def sources(root: str):
+    """\
+    >>> import baw.project; sources(baw.determine_root(__file__))
+    ['tests', 'baw']
+    """
+    result = []
+    for item in 'setup.py tests'.split():
+        if not os.path.exists(item):
+            continue
+        result.append(item)
+    result.extend(baw.config.sources(root))
+    return result
+
+
+def format_python(root: str, verbose: int = 0, paths: list = None) -> int:
+    baw.log('format source')
+    if paths is None:
+        paths = discover(root)[PYTHON]
+    files = selected(root, paths, PYTHON)
+    completed = baw.cmd.format.engine.format_files(root, files, STYLE, verbose)
+    baw.log('format source: completed')
+    return completed
+
+
+# yapf style, local style files are not used
+STYLE = 'google'
+
+
+def format_toml(root: str, filters: bool = True, paths: list = None) -> int:
+    """Format toml files, write files whose formatted content differs."""
+    if paths is None:
+        paths = discover(root, filters=filters)[TOML]
+    written = 0
+    for item in selected(root, paths, TOML):
+        with open(item, 'rb') as fp:
+            content = fp.read()
+        config = baw.utils.parse_toml(content, item)
+        formatted = tomli_w.dumps(config)
+        if formatted.encode(baw.utils.UTF8) == content:
+            continue
+        utilo.file_replace(item, formatted)
+        written += 1
+    if written:
+        baw.log(f'format toml: {written} files changed')
+    return baw.SUCCESS
+
+
+def format_yaml(root: str, paths: list = None) -> int:
+    if paths is None:
+        paths = discover(root)[YAML]
+    files = selected(root, paths, YAML)
+    if not files:
+        return baw.SUCCESS
+    utilo.log('format yaml')
+    cmd = f'yamlfix {" ".join(files)}'
+    completed = utilo.run(cmd, cwd=root, expect=None)
+    if completed.returncode:
+        utilo.error('format yaml: failed')
+    else:
+        utilo.log('format yaml: completed')
+    if completed.stdout.strip():
+        utilo.log(completed.stdout)
+    if completed.returncode:
+        if completed.stderr:
+            utilo.error(utilo.NEWLINE.join(completed.stderr.splitlines()[-4:]))
+        return completed.returncode
+    return baw.SUCCESS
+
+
+def format_imports(root: str, verbose: int = 0, paths: list = None):
+    baw.log('sort imports')
+    if paths is None:
+        paths = discover(root)[PYTHON]
+    project_sources = baw.config.sources(root)
+    short = ' -p '.join(project_sources)
+    isort: str = ' '.join(ISORT) % short
+    completed = baw.cmd.format.engine.sort_imports(
+        isort,
+        paths=selected(root, paths, PYTHON),
+        verbose=verbose,
+        root=root,
+    )
+    if not completed:
+        baw.log('sort imports: completed\n')
+    return completed
+
+
+ISORT = (
+    "-o",
+    "pytest",
+    '-p',
+    '%s',
+    "-p",
+    "tests",
+    "--ot",
+    "--sl",  # force single line
+    "--ns",  # override default skip of __init__
+    "__init__.py",
+    "--line-width 999",  # do not break imports
+)
+
+
+def extend_cli(parser):
+    test = parser.add_parser('format', help='Format code')
+    test.add_argument(
+        '--imports',
+        help='run isort',
+        action='store_true',
+    )
+    test.add_argument(
+        '--code',
+        help='run yapf',
+        action='store_true',
+    )
+    test.add_argument(
+        '--changed',
+        help='format files changed since last successful format only',
+        action='store_true',
+    )
+    test.add_argument(
+        '--base',
+        help='format files changed since this git ref only',
+    )
+    test.set_defaults(func=evaluate)
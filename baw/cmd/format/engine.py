@@ -0,0 +1,178 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Format python files with yapf and isort in a pool of processes.
+
+The workers call the api of yapf and isort per file instead of starting
+a yapf and an isort process per folder. Options, ignored files and the
+written bytes are the same as of the cmd line tools. Files are only
+written if their content changed. The format time of every file is
+logged in verbose mode.
+"""
+
+import contextlib
+import dataclasses
+import functools
+import io
+import os
+import pathlib
+import shlex
+import time
+
+import baw
+import baw.parallel
+import baw.utils
+
+
+@dataclasses.dataclass
+class Formatted:
+    """Result of formatting a single file."""
+    path: str
+    changed: bool = False
+    duration: float = 0.0
+    error: str = ''
+
+
+def format_files(root: str, files: list, style: str, verbose: int = 0) -> int:
+    """Format `files` like `yapf -i --style=STYLE --no-local-style`.
+
+    Files ignored by .yapfignore or pyproject.toml of `root` are skipped.
+    """
+    from yapf.yapflib import file_resources  # pylint:disable=C0415
+    excluded = file_resources.GetExcludePatternsForDir(root)
+    files = file_resources.GetCommandLineFiles(files, False, excluded)
+    worker = functools.partial(format_file, style=style)
+    return execute('format source', worker, files, verbose)
+
+
+def format_file(path: str, style: str) -> Formatted:
+    from yapf.yapflib import yapf_api  # pylint:disable=C0415
+    start = time.perf_counter()
+    try:
+        _, _, changed = yapf_api.FormatFile(
+            path,
+            style_config=style,
+            in_place=True,
+        )
+    except Exception as error:  # pylint:disable=W0703
+        return Formatted(path, error=f'{type(error).__name__}: {error}')
+    return Formatted(path, changed, time.perf_counter() - start)
+
+
+def sort_imports(
+    args: str,
+    folders: list = None,
+    paths: list = None,
+    verbose: int = 0,
+    root: str = None,
+) -> int:
+    """Sort imports like `isort ARGS FOLDER` per folder or `isort ARGS PATHS`.
+
+    Like the cmd line tool, the config files are searched from the
+    folder. `paths` are grouped by their top-level folder below `root`
+    to use the config of `isort ARGS FOLDER` of this folder, the dir of
+    the path is used without `root`.
+    """
+    import isort.files  # pylint:disable=C0415
+    todo = []
+    targets = {item: [item] for item in folders or []}
+    for path in paths or []:
+        targets.setdefault(settings_folder(path, root), []).append(path)
+    for settings, target in targets.items():
+        config = isort_config(args, settings)
+        if config.filter_files:
+            target = [
+                item for item in target
+                if not config.is_skipped(pathlib.Path(item))
+            ]
+        skipped, broken = [], []
+        for path in isort.files.find(target, config, skipped, broken):
+            todo.append((path, settings))
+        if broken:
+            baw.error(f'sort imports: not found: {" ".join(broken)}')
+            return baw.FAILURE
+    worker = functools.partial(sort_file, args=args)
+    return execute('sort imports', worker, todo, verbose)
+
+
+def settings_folder(path: str, root: str = None) -> str:
+    """Folder where isort searches the config files of `path`.
+
+    >>> settings_folder('/root/abc/sub/a.py', '/root')
+    '/root/abc'
+    >>> settings_folder('/root/setup.py', '/root')
+    '/root'
+    >>> settings_folder('/root/abc/sub/a.py')
+    '/root/abc/sub'
+    """
+    if os.path.isdir(path):
+        return path
+    if root is None:
+        return os.path.dirname(path)
+    top, _, below = os.path.relpath(path, root).partition(os.sep)
+    if top == os.pardir:
+        return os.path.dirname(path)
+    if not below:
+        return root
+    return os.path.join(root, top)
+
+
+def sort_file(item: tuple, args: str) -> Formatted:
+    """Sort imports of file with settings dir, see `sort_imports`."""
+    import isort.api  # pylint:disable=C0415
+    import isort.exceptions  # pylint:disable=C0415
+    path, settings = item
+    start = time.perf_counter()
+    config = isort_config(args, settings)
+    try:
+        # isort prints fixed files, the output of the cmd line tool is
+        # dropped as well
+        with contextlib.redirect_stdout(io.StringIO()):
+            changed = isort.api.sort_file(path, config=config)
+    except (isort.exceptions.FileSkipped, isort.exceptions.UnsupportedEncoding):
+        changed = False
+    except Exception as error:  # pylint:disable=W0703
+        return Formatted(path, error=f'{type(error).__name__}: {error}')
+    return Formatted(path, changed, time.perf_counter() - start)
+
+
+@functools.lru_cache
+def isort_config(args: str, settings: str):
+    """Config of isort cmd line `args` and config files of `settings`."""
+    import isort.main  # pylint:disable=C0415
+    import isort.settings  # pylint:disable=C0415
+    options = isort.main.parse_args(shlex.split(args))
+    options.setdefault('settings_path', settings)
+    return isort.settings.Config(**options)
+
+
+def execute(info: str, worker, items: list, verbose: int = 0) -> int:
+    """Run `worker` on `items` in a pool of processes of the job budget.
+
+    Returns:
+        returncode, failure if any file could not be formatted
+    """
+    if not items:
+        return baw.SUCCESS
+    count = max(1, min(baw.parallel.share(), len(items)))
+    if count == 1:
+        results = [worker(item) for item in items]
+    else:
+        executor = baw.utils.select_executor()
+        with executor(max_workers=count) as pool:
+            chunksize = max(1, len(items) // (count * 4))
+            results = list(pool.map(worker, items, chunksize=chunksize))
+    failed = [item for item in results if item.error]
+    for item in failed:
+        baw.error(f'{info}: {item.path}: {item.error}')
+    changed = sum(item.changed for item in results)
+    baw.log(f'{info}: {changed} of {len(results)} files changed')
+    if verbose:
+        for item in sorted(results, key=lambda item: -item.duration):
+            baw.log(f'{item.duration:8.3f} secs {item.path}')
+    return baw.FAILURE if failed else baw.SUCCESS
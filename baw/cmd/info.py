@@ -16,7 +16,6 @@ import sys
 import utilo
 
 import baw
-import baw.cmd.image
 import baw.cmd.utils
 import baw.config
 import baw.gix
@@ -62,7 +61,7 @@ def prints(root, value: str, verbose: int = 0) -> int:  # pylint:disable=R1260,R
         baw.log(pip_version(root, verbose=verbose))
         return baw.SUCCESS
     if value == 'image':
-        baw.log(baw.cmd.image.tag(root))
+        baw.log(image_tag(root))
         return baw.SUCCESS
     if value == 'describe':
         baw.log(baw.gix.describe(root))
@@ -87,6 +86,12 @@ def prints(root, value: str, verbose: int = 0) -> int:  # pylint:disable=R1260,R
     return baw.FAILURE
 
 
+def image_tag(root: str) -> str:
+    # docker and semver are only required to determine the image tag
+    import baw.cmd.image  # pylint:disable=W0621
+    return baw.cmd.image.tag(root)
+
+
 def print_tmp(root: str):
     root = baw.project.determine_root(root)
     name = os.path.split(root)[1]
@@ -7,6 +7,7 @@
 # be prosecuted under federal law. Its content is company confidential.
 # =============================================================================
 
+import baw.cmd.utils
 import baw.config
 import baw.runtime
 import baw.utils
@@ -41,9 +42,10 @@ def install(
         root,
         cmd,
         root,
+        stream=True,
         verbose=verbose,
     )
-    if completed.returncode:
+    if completed.returncode and not completed.echoed:
         baw.log(completed.stdout)
         baw.error(completed.stderr)
     if not verbose:
@@ -0,0 +1,665 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2019-2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""The purpose of this module is to run statical code analysis on
+selected project.
+
+There are three different options to run the linter: all, todo and
+minimal:
+
+* all: every check out of RCFILE_PATH is executed
+* todo: only todos are collected
+* minimal: everything expect of todo is collected"""
+
+import contextlib
+import enum
+import functools
+import json
+import os
+import shlex
+
+import utilo
+
+import baw
+import baw.cmd.info
+import baw.cmd.lint.cache
+import baw.cmd.lint.report
+import baw.cmd.lint.shard
+import baw.cmd.lint.store
+import baw.cmd.test.impact
+import baw.config
+import baw.parallel
+import baw.resources
+import baw.runtime
+import baw.utils
+
+# skipped bandit tests: assert is used, import subprocess
+SKIPS = ('B101', 'B404')
+
+
+class Scope(enum.Enum):
+    ALL = enum.auto()
+    MINIMAL = enum.auto()
+    TODO = enum.auto()
+
+    @staticmethod
+    def from_str(scope: str):
+        if isinstance(scope, str):
+            scope = Scope[scope.upper()]
+        return scope
+
+
+def run_linter(root: str, verbose: int) -> int:
+    if not baw.config.basic(root):
+        return baw.SUCCESS
+    if not baw.config.fail_on_finding(root):
+        return baw.SUCCESS
+    # run linter step before running test and release
+    if returncode := lint(
+            root,
+            scope=Scope.MINIMAL,
+            verbose=verbose,
+            log_always=False,
+    ):
+        baw.error('could not release, solve this errors first.')
+        baw.error("turn ['release']['fail_on_finding'] = False "
+                  "to release with errors")
+        return returncode
+    return baw.SUCCESS
+
+
+def lint(
+    root: str,
+    scope: Scope = Scope.ALL,
+    verbose: int = 0,
+    log_always: bool = True,
+    new_only: str = None,
+    in_process: bool = False,
+) -> int:
+    """Run statical code analysis on `root`.
+
+    Only changed files and files which import them are linted, findings
+    of unchanged files are taken from cache, see `baw.cmd.lint.cache`.
+    The findings of every run are recorded, see `baw.cmd.lint.store`.
+
+    Args:
+        root(str): root of analysed project
+        scope(Mode): select included findings - all, use RCFILE_PATH;
+                    minimal, exclude todos from analysis; todo, exclude
+                    all expect todos.
+        verbose(bool): increase logging
+        log_always(bool): suppress logging if False and process completed
+                          successful
+        new_only(str): report findings introduced since this base ref
+                       only, fail if there is any
+        in_process(bool): run pylint and bandit in one pool of processes
+                          which reads and parses every file once, see
+                          baw/plugins/bawengine.py
+    Returns:
+        Returncode of linter process.
+    """
+    scope = Scope.from_str(scope)
+    folders = baw.cmd.test.impact.folder(root)
+    if in_process:
+        return engine(root, scope, folders, log_always, verbose, new_only)
+    # TODO: ADD TO RETURNCODE LATER
+    bandits = functools.partial(
+        bandit,
+        root,
+        folders,
+        log_always,
+        verbose,
+        new_only,
+    )
+    pylints = functools.partial(
+        pylint,
+        root,
+        scope,
+        folders,
+        log_always,
+        verbose,
+        new_only,
+    )
+    returncode = baw.utils.fork(
+        *[pylints, bandits],
+        process=False,
+        returncode=True,
+        worker=2,
+    )
+    return returncode
+
+
+def rating(root: str, scope: Scope = Scope.MINIMAL, verbose: int = 0):
+    """Rating of pylint, lint only if no run of current files is recorded.
+
+    Returns:
+        rating or None if there is no statement
+    """
+    scope = Scope.from_str(scope)
+    folders = baw.cmd.test.impact.folder(root)
+    _, _, config = pylint_cmd(root, scope)
+    current = baw.cmd.lint.store.state(
+        config,
+        baw.cmd.lint.cache.sources(root, folders),
+    )
+    run = baw.cmd.lint.store.latest(root, 'pylint', scope.name, current)
+    if run is None:
+        pylint(root, scope, folders, log_always=False, verbose=verbose)
+        run = baw.cmd.lint.store.latest(root, 'pylint', scope.name, current)
+    return None if run is None else run['rating']
+
+
+def pylint_cmd(root: str, scope: Scope) -> tuple:
+    """Determine pylint cmd without linted files.
+
+    Returns:
+        (cmd, used rcfile, cache key of cmd and tool)
+    """
+    spelling = baw.config.spelling(root)
+    pyconfig = baw.config.pylint(root)
+    cmd = 'pylint '
+    rcfile = ''
+    if scope in (Scope.ALL, Scope.MINIMAL):
+        rcfile = baw.resources.RCFILE_PATH
+        cmd += f'--rcfile={rcfile} '
+    cmd += '-d R0801 '  # disable duplicated code check
+    cmd += '-d R0902 '  # too many instance attributes
+    cmd += '-d R0912 '  # too many branches
+    if scope == Scope.MINIMAL:
+        # :fixme (W0511):
+        # Used when a warning note as fixme, todo or xxx is detected.
+        cmd += '-d W0511 '
+    if scope == Scope.TODO:
+        cmd += '--disable=all --enable=W0511 '
+    dictionary = baw.config.pylint_spelling() if spelling else ''
+    if spelling:
+        cmd += '--spelling-dict=en_US '
+        cmd += f'--spelling-private-dict-file={dictionary} '
+    if pyconfig:
+        cmd += f'{pyconfig} '
+    config = baw.cmd.lint.cache.key(
+        cmd,
+        baw.cmd.lint.cache.version('pylint'),
+        baw.cmd.lint.cache.version('astroid'),
+        baw.config.python(root),
+        baw.cmd.info.requirement_hash(root),
+        *(baw.cmd.lint.cache.hashed(item) for item in (
+            rcfile,
+            dictionary,
+            utilo.join(root, 'pyproject.toml'),
+            utilo.join(root, 'setup.cfg'),
+            utilo.join(root, 'pylintrc'),
+            utilo.join(root, '.pylintrc'),
+        )),
+    )
+    return cmd, rcfile, config
+
+
+def pylint(  # pylint:disable=R0913
+    root: str,
+    scope: Scope,
+    folders: list,
+    log_always: bool,
+    verbose: int,
+    new_only: str = None,
+) -> int:
+    baw.log('pylint...')
+    cmd, rcfile, config = pylint_cmd(root, scope)
+    whole = baw.cmd.lint.shard.wholeprogram(cmd, rcfile)
+    if whole:
+        baw.log('pylint: whole program checks enabled, run in one process')
+
+    def runner(paths: list | None) -> dict | None:
+        if whole:
+            return pylint_shards(root, cmd, [folders], verbose)
+        paths = paths or baw.cmd.lint.shard.candidates(root, folders)
+        known = baw.cmd.lint.cache.load(root, 'pylint').get('files', {})
+        shards = baw.parallel.balance(
+            baw.cmd.lint.shard.weights(root, paths, known),
+            baw.cmd.lint.shard.count(paths),
+        )
+        return pylint_shards(root, cmd, shards, verbose)
+
+    findings = baw.cmd.lint.cache.findings(
+        root,
+        'pylint',
+        config,
+        folders,
+        runner,
+        importers=True,
+        incremental=not whole,
+    )
+    return pylint_report(root, scope, findings, log_always, verbose, new_only)
+
+
+def pylint_report(  # pylint:disable=R0913
+    root: str,
+    scope: Scope,
+    findings: dict | None,
+    log_always: bool,
+    verbose: int,
+    new_only: str = None,
+) -> int:
+    """Render and record pylint `findings` of all files."""
+    if findings is None:
+        baw.error('pylint failed')
+        return baw.FAILURE
+    report, returncode = baw.cmd.lint.report.pylint(findings)
+    baw.cmd.lint.store.record(
+        root,
+        'pylint',
+        scope.name,
+        findings,
+        rating=baw.cmd.lint.report.rating(findings),
+        returncode=returncode,
+    )
+    if new_only:
+        findings = baw.cmd.lint.store.introduced(
+            root,
+            'pylint',
+            scope.name,
+            findings,
+            new_only,
+        )
+        if findings is None:
+            return baw.FAILURE
+        report, returncode = introduced(
+            root,
+            'pylint',
+            findings,
+            baw.cmd.lint.report.pylint(findings, rated=False)[0],
+            new_only,
+        )
+    return complete('pylint', report, returncode, log_always, verbose)
+
+
+def pylint_shards(root: str, cmd: str, shards: list, verbose: int):
+    """Run one pylint process per shard, merge findings of all shards."""
+    lintdir = baw.cmd.lint.cache.lintdir(root)
+    outputs = [
+        utilo.join(lintdir, f'pylint.out.{index}.json')
+        for index in range(len(shards))
+    ]
+    cmds = []
+    for paths, output in zip(shards, outputs):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(output)
+        cmds.append(f'{cmd}--jobs=1 --output-format=bawlint.Findings:{output} '
+                    f'{" ".join(paths)}')
+    if verbose:
+        baw.log(f'pylint: {len(cmds)} shards')
+    measured = []
+    for completed, output in zip(
+            baw.parallel.execute(
+                cmds,
+                cwd=root,
+                env=baw.utils.plugins(dict(os.environ)),
+                failfast=False,
+            ),
+            outputs,
+    ):
+        try:
+            measured.append(json.loads(utilo.file_read(output)))
+        except (AssertionError, ValueError):
+            baw.log(completed.stdout)
+            baw.error(completed.stderr)
+            return None
+    return baw.cmd.lint.shard.merge(measured)
+
+
+def engine(  # pylint:disable=R0913
+    root: str,
+    scope: Scope,
+    folders: list,
+    log_always: bool,
+    verbose: int,
+    new_only: str = None,
+) -> int:
+    """Lint changed files with pylint and bandit in one run of the engine.
+
+    Findings, cache, report and returncode are the same as of `pylint`
+    and `bandit`.
+    """
+    baw.log('pylint and bandit...')
+    cmd, rcfile, pyconfig = pylint_cmd(root, scope)
+    banconfig = bandit_cmd(root)[1]
+    whole = baw.cmd.lint.shard.wholeprogram(cmd, rcfile)
+    pylints = baw.cmd.lint.cache.plan(
+        root,
+        'pylint',
+        pyconfig,
+        folders,
+        importers=True,
+        incremental=not whole,
+    )
+    bandits = baw.cmd.lint.cache.plan(root, 'bandit', banconfig, folders)
+    measured = engine_run(
+        root,
+        cmd,
+        engine_shards(root, folders, pylints, bandits, whole),
+        verbose,
+    )
+    if measured is None:
+        baw.error('lint engine failed')
+        return baw.FAILURE
+    returncode = pylint_report(
+        root,
+        scope,
+        engine_findings(root, 'pylint', pyconfig, pylints, measured),
+        log_always,
+        verbose,
+        new_only,
+    )
+    returncode += bandit_report(
+        root,
+        engine_findings(root, 'bandit', banconfig, bandits, measured),
+        log_always,
+        verbose,
+        new_only,
+    )
+    return returncode
+
+
+def engine_shards(
+    root: str,
+    folders: list,
+    pylints,
+    bandits,
+    whole: bool,
+) -> list:
+    """Split files to lint of both tools into balanced shards.
+
+    Args:
+        root(str): project root
+        folders(list): linted folders
+        pylints(Plan): files to lint of pylint, see `cache.plan`
+        bandits(Plan): files to lint of bandit
+        whole(bool): pylint runs whole program checks
+    """
+    pypaths = pylints.todo
+    if pypaths is None and not whole:
+        pypaths = baw.cmd.lint.shard.candidates(root, folders)
+    banpaths = bandits.todo
+    if banpaths is None:
+        banpaths = sorted(bandits.current)
+    result = []
+    if whole and pylints.todo is None:
+        # whole program checks require all files in one pylint run
+        result.append({'pylint': folders, 'bandit': []})
+        pypaths = []
+    pypaths, banpaths = set(pypaths or []), set(banpaths)
+    paths = sorted(pypaths | banpaths)
+    if not paths:
+        return result
+    known = pylints.cached.get('files', {})
+    for shard in baw.parallel.balance(
+            baw.cmd.lint.shard.weights(root, paths, known),
+            baw.cmd.lint.shard.count(paths),
+    ):
+        result.append({
+            'pylint': [item for item in shard if item in pypaths],
+            'bandit': [item for item in shard if item in banpaths],
+        })
+    return result
+
+
+def engine_run(root: str, cmd: str, shards: list, verbose: int):
+    """Run engine over `shards`.
+
+    Returns:
+        list of findings of pylint and bandit report per shard, None if
+        the engine failed
+    """
+    if not shards:
+        return []
+    lintdir = baw.cmd.lint.cache.lintdir(root)
+    output = utilo.join(lintdir, 'engine.out.json')
+    request = utilo.join(lintdir, 'engine.json')
+    workers = min(baw.parallel.share(), len(shards))
+    baw.utils.file_replace(
+        request,
+        json.dumps({
+            'pylint': shlex.split(cmd)[1:],
+            'bandit': list(SKIPS),
+            'shards': shards,
+            'workers': workers,
+            'output': output,
+        }),
+    )
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(output)
+    if verbose:
+        baw.log(f'lint engine: {len(shards)} shards, {workers} workers')
+    python = baw.config.python(root)
+    completed = baw.runtime.run_target(
+        root,
+        f'{python} -m bawengine {shlex.quote(request)}',
+        cwd=root,
+        env=baw.utils.plugins(dict(os.environ)),
+        jobs=workers,
+        verbose=verbose,
+    )
+    try:
+        measured = json.loads(utilo.file_read(output))
+    except (AssertionError, ValueError):
+        baw.completed(completed, force=True)
+        return None
+    for item in measured:
+        if (item['pylint'] or {}).get('error'):
+            baw.error(item['pylint']['error'])
+            return None
+    return measured
+
+
+def engine_findings(
+    root: str,
+    tool: str,
+    config: str,
+    planned,
+    measured: list,
+) -> dict:
+    """Merge `measured` findings of all shards into cache of `tool`."""
+    if planned.unchanged:
+        return planned.cached
+    outputs = [item[tool] for item in measured if item[tool]]
+    if tool == 'pylint':
+        merged = baw.cmd.lint.shard.merge(outputs) if outputs else None
+    else:
+        report = {
+            'errors': [item for part in outputs for item in part['errors']],
+            'metrics': {
+                key: value for part in outputs
+                for key, value in part['metrics'].items()
+            },
+            'results': [item for part in outputs for item in part['results']],
+        }
+        merged = bandit_findings(root, report)
+    return baw.cmd.lint.cache.update(
+        root,
+        tool,
+        config,
+        planned,
+        merged or {'files': {}},
+    )
+
+
+def bandit(  # pylint:disable=R0913
+    root: str,
+    folders: list,
+    log_always: bool,
+    verbose: int,
+    new_only: str = None,
+) -> int:
+    baw.log('bandit...')
+    output = utilo.join(baw.cmd.lint.cache.lintdir(root), 'bandit.out.json')
+    cmd, config = bandit_cmd(root)
+    cmd = f'{cmd} -f json -o {output} -r '
+
+    def runner(paths: list | None) -> dict | None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(output)
+        completed = baw.runtime.run_target(
+            root,
+            cmd + ' '.join(paths or folders),
+            cwd=root,
+            verbose=verbose,
+        )
+        try:
+            measured = json.loads(utilo.file_read(output))
+        except (AssertionError, ValueError):
+            baw.completed(completed, force=True)
+            return None
+        return bandit_findings(root, measured)
+
+    findings = baw.cmd.lint.cache.findings(
+        root,
+        'bandit',
+        config,
+        folders,
+        runner,
+    )
+    return bandit_report(root, findings, log_always, verbose, new_only)
+
+
+def bandit_cmd(root: str) -> tuple:
+    """Determine bandit cmd without output and linted files.
+
+    Returns:
+        (cmd, cache key of cmd and tool)
+    """
+    cmd = f'bandit --skip {",".join(SKIPS)}'
+    config = baw.cmd.lint.cache.key(
+        cmd,
+        baw.cmd.lint.cache.version('bandit'),
+        baw.config.python(root),
+    )
+    return cmd, config
+
+
+def bandit_report(
+    root: str,
+    findings: dict | None,
+    log_always: bool,
+    verbose: int,
+    new_only: str = None,
+) -> int:
+    """Render and record bandit `findings` of all files."""
+    if findings is None:
+        baw.error('bandit failed')
+        return baw.FAILURE
+    report, returncode = baw.cmd.lint.report.bandit(findings)
+    # bandit does not depend on scope
+    scope = Scope.ALL.name
+    baw.cmd.lint.store.record(
+        root,
+        'bandit',
+        scope,
+        findings,
+        returncode=returncode,
+    )
+    if new_only:
+        findings = baw.cmd.lint.store.introduced(
+            root,
+            'bandit',
+            scope,
+            findings,
+            new_only,
+        )
+        if findings is None:
+            return baw.FAILURE
+        report, returncode = introduced(
+            root,
+            'bandit',
+            findings,
+            baw.cmd.lint.report.bandit(findings)[0],
+            new_only,
+        )
+    return complete('bandit', report, returncode, log_always, verbose)
+
+
+def introduced(root: str, tool: str, findings: dict, report: str, base: str):
+    """Fail if `findings` introduced since `base` are not empty.
+
+    Returns:
+        (report, returncode)
+    """
+    count = len(baw.cmd.lint.store.rows(root, tool, findings))
+    summary = f'{tool}: {count} new findings since {base}'
+    report = f'{report}\n{summary}' if report else summary
+    return report, baw.FAILURE if count else baw.SUCCESS
+
+
+def bandit_findings(root: str, measured: dict) -> dict:
+    """Group results and errors of bandit json report per file."""
+    files = {}
+
+    def entry(path: str) -> dict:
+        relative = baw.utils.forward_slash(
+            os.path.relpath(utilo.join(root, path), root))
+        return files.setdefault(relative, {'results': [], 'errors': []})
+
+    for path in measured.get('metrics', {}):
+        if path != '_totals':
+            entry(path)
+    for issue in measured.get('results', []):
+        entry(issue['filename'])['results'].append({
+            key: issue[key] for key in (
+                'test_id',
+                'test_name',
+                'issue_text',
+                'issue_severity',
+                'issue_confidence',
+                'line_number',
+            )
+        })
+    for error in measured.get('errors', []):
+        entry(error['filename'])['errors'].append(error['reason'])
+    return {'files': files}
+
+
+def complete(
+    tool: str,
+    report: str,
+    returncode: int,
+    log_always: bool,
+    verbose: int,
+) -> int:
+    if report and (returncode or verbose):
+        baw.log(report)
+    if not returncode and log_always:
+        baw.log(f'{tool} complete')
+    return returncode
+
+
+def extend_cli(parser):
+    lints = parser.add_parser('lint', help='Statical code analysis')
+    lints.add_argument(
+        'action',
+        help='what shall we do',
+        choices='all minimal todo'.split(),
+        nargs='?',
+        default='minimal',
+    )
+    lints.add_argument(
+        '--new_only',
+        '--new-only',
+        help='report findings introduced since --base only',
+        action='store_true',
+    )
+    lints.add_argument(
+        '--base',
+        help='base ref of --new_only',
+        default='HEAD',
+    )
+    lints.add_argument(
+        '--in_process',
+        '--in-process',
+        help='run pylint and bandit in one pool of processes',
+        action='store_true',
+    )
+    lints.set_defaults(func=baw.run.run_lint)
@@ -0,0 +1,203 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Lint changed files only, take the findings of other files from cache.
+
+The findings are stored per file together with the sha256 of its
+content. The cache of a tool is bound to a key of tool version, rcfile
+and lint options, another key lints all files again. Added or removed
+files lint all files too, the tool decides which files of a folder are
+linted. pylint infers imported modules, files which import a changed
+module directly or indirectly are linted again.
+"""
+
+import dataclasses
+import hashlib
+import importlib.metadata
+import json
+import os
+
+import utilo
+
+import baw.cmd.test.impact
+import baw.index
+import baw.utils
+
+
+def key(*parts) -> str:
+    """\
+    >>> key('pylint', '3.0') == key('pylint', '3.0'), key('a') == key('b')
+    (True, False)
+    """
+    return hashlib.sha256('\0'.join(str(item) for item in parts).encode(
+        baw.utils.UTF8)).hexdigest()
+
+
+def version(distribution: str) -> str:
+    try:
+        return importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        return ''
+
+
+def hashed(path: str) -> str:
+    if not path or not os.path.isfile(path):
+        return ''
+    with open(path, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+def sources(root: str, folders: list) -> dict:
+    """Map python files of `folders` relative to `root` to content hash."""
+    index = baw.index.snapshot(root, persist=True)
+    return {
+        path: hashed(utilo.join(root, path))
+        for path in index.files(('.py',), folders)
+    }
+
+
+def lintdir(root: str) -> str:
+    result = utilo.join(baw.utils.tmp(root), 'lint')
+    os.makedirs(result, exist_ok=True)
+    return result
+
+
+def path_cache(root: str, tool: str) -> str:
+    return utilo.join(lintdir(root), f'{tool}.json')
+
+
+def load(root: str, tool: str) -> dict:
+    return baw.utils.load_json(path_cache(root, tool))
+
+
+@dataclasses.dataclass
+class Plan:
+    """Files to lint of a tool, see `plan`."""
+    # path to content hash of all files
+    current: dict
+    # last stored findings
+    cached: dict
+    # files to lint, None to lint the folders
+    todo: list | None
+    # files whose cache entry is updated
+    changed: set
+
+    @property
+    def unchanged(self) -> bool:
+        return not self.changed
+
+
+def plan(  # pylint:disable=R0913
+    root: str,
+    tool: str,
+    config: str,
+    folders: list,
+    importers: bool = False,
+    incremental: bool = True,
+) -> Plan:
+    """Determine files which are linted again.
+
+    Args:
+        root(str): project root
+        tool(str): name of cache
+        config(str): key of tool version and options, see `key`
+        folders(list): folders relative to `root` which are linted
+        importers(bool): lint files which import changed files as well
+        incremental(bool): lint all files after a change, if False
+    Returns:
+        files to lint, nothing is linted if cache is up to date
+    """
+    current = sources(root, folders)
+    cached = load(root, tool)
+    known = cached.get('files', {})
+    if cached.get('key') != config or known.keys() != current.keys():
+        return Plan(current, cached, None, set(current))
+    changed = {
+        path for path, value in current.items() if known[path]['hash'] != value
+    }
+    if not changed:
+        baw.log(f'{tool}: no changed files, use cached findings')
+        return Plan(current, cached, [], changed)
+    if not incremental:
+        return Plan(current, cached, None, set(current))
+    relint = dependents(root, changed) if importers else changed
+    # files the tool skipped in the full run stay skipped
+    todo = sorted(
+        path for path in relint if path in known and known[path]['linted'])
+    baw.log(f'{tool}: lint {len(todo)} of {len(current)} files')
+    return Plan(current, cached, todo, changed | set(todo))
+
+
+def update(root: str, tool: str, config: str, planned: Plan,
+           measured: dict) -> dict:
+    """Merge `measured` findings of planned files into cache.
+
+    Returns:
+        findings of all files
+    """
+    known = planned.cached.get('files', {})
+    result = {**planned.cached, **measured, 'key': config}
+    result['files'] = {} if planned.todo is None else dict(known)
+    for path in planned.changed:
+        if planned.todo is None or path in planned.todo:
+            entry = measured['files'].get(path, {'linted': False})
+        else:
+            entry = dict(known[path])
+        entry.setdefault('linted', True)
+        entry['hash'] = planned.current[path]
+        result['files'][path] = entry
+    baw.utils.file_replace(path_cache(root, tool), json.dumps(result))
+    return result
+
+
+def findings(  # pylint:disable=R0913
+    root: str,
+    tool: str,
+    config: str,
+    folders: list,
+    runner,
+    importers: bool = False,
+    incremental: bool = True,
+) -> dict | None:
+    """Findings of all files of `folders`, lint changed files only.
+
+    Args:
+        root(str): project root
+        tool(str): name of cache
+        config(str): key of tool version and options, see `key`
+        folders(list): folders relative to `root` which are linted
+        runner(callable): lint list of files or None for `folders`,
+                          returns dict with `files`, which maps linted
+                          files to their findings, or None on failure
+        importers(bool): lint files which import changed files as well
+        incremental(bool): lint all files after a change, if False
+    Returns:
+        dict with `files` and other data of the last run of `runner`,
+        None if the tool failed
+    """
+    planned = plan(root, tool, config, folders, importers, incremental)
+    if planned.unchanged:
+        return planned.cached
+    measured = runner(planned.todo) if planned.todo != [] else {'files': {}}
+    if measured is None:
+        return None
+    return update(root, tool, config, planned, measured)
+
+
+def dependents(root: str, changed: set) -> set:
+    """Changed files and files which import them.
+
+    Files outside of the import graph of sources and tests are returned
+    unchanged.
+    """
+    names = baw.cmd.test.impact.modules(root)
+    paths = {value: name for name, value in names.items()}
+    imported = baw.cmd.test.impact.graph(root, names)
+    modules = {paths[item] for item in changed if item in paths}
+    found = baw.cmd.test.impact.dependents(imported, modules)
+    return {names[item] for item in found} | set(changed)
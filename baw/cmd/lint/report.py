@@ -0,0 +1,148 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Render report and returncode out of the findings of all files.
+
+A full and an incremental run, see `baw.cmd.lint.cache`, render the same
+findings, the report and the returncode are therefore the same. The
+returncode follows the rules of the tool.
+"""
+
+import baw.cmd.test.impact
+
+# see pylint.constants.MSG_TYPES_STATUS
+STATUS = {'I': 0, 'C': 16, 'R': 8, 'W': 4, 'E': 2, 'F': 1}
+CATEGORIES = {
+    'I': 'info',
+    'C': 'convention',
+    'R': 'refactor',
+    'W': 'warning',
+    'E': 'error',
+    'F': 'fatal',
+}
+
+# see pylint --evaluation
+EVALUATION = ('max(0, 0 if fatal else 10.0 - ((float(5 * error + warning + '
+              'refactor + convention) / statement) * 10))')
+
+
+def pylint(findings: dict, rated: bool = True) -> tuple:
+    """Render pylint findings sorted by path and line like the text reporter.
+
+    Args:
+        findings(dict): findings of all files, see `baw.cmd.lint.cache`
+        rated(bool): append rating of code
+    Returns:
+        (report, returncode)
+    """
+    options = findings.get('options', {})
+    lines = []
+    current = None
+    messages = list(findings.get('others', []))
+    statements = 0
+    for path, entry in sorted(findings['files'].items()):
+        statements += entry.get('statements', 0)
+        # shards may name modules differently, use name of path
+        module = baw.cmd.test.impact.modulename(path)
+        for message in sorted(entry.get('messages', []), key=position):
+            messages.append(dict(message, path=path, module=module))
+    for message in messages:
+        if message['module'] != current:
+            current = message['module']
+            lines.append(f'************* Module {current}')
+        lines.append(f"{message['path']}:{message['line']}:"
+                     f"{message['column']}: {message['msg_id']}: "
+                     f"{message['msg']} ({message['symbol']})")
+    note = score(messages, statements, options.get('evaluation', EVALUATION))
+    if note is not None and rated:
+        lines.append('')
+        lines.append('-' * 66)
+        lines.append(f'Your code has been rated at {note:.2f}/10')
+    returncode = pylint_returncode(messages, note, options)
+    return '\n'.join(lines), returncode
+
+
+def rating(findings: dict) -> float | None:
+    """Rating of pylint findings, None without statements."""
+    messages = list(findings.get('others', []))
+    statements = 0
+    for entry in findings['files'].values():
+        statements += entry.get('statements', 0)
+        messages.extend(entry.get('messages', []))
+    evaluation = findings.get('options', {}).get('evaluation', EVALUATION)
+    return score(messages, statements, evaluation)
+
+
+def position(message: dict) -> tuple:
+    return message['line'] or 0, message['column'] or 0, message['msg_id']
+
+
+def score(messages: list, statements: int, evaluation: str) -> float | None:
+    """Rate findings like pylint, None without statements.
+
+    >>> message = dict(category='C')
+    >>> score([message], 10, EVALUATION), score([], 0, EVALUATION)
+    (9.0, None)
+    """
+    if not statements:
+        return None
+    stats = {name: 0 for name in CATEGORIES.values()}
+    for message in messages:
+        stats[CATEGORIES[message['category']]] += 1
+    stats['statement'] = statements
+    try:
+        return eval(evaluation, {}, stats)  # nosec pylint:disable=W0123
+    except Exception:  # pylint:disable=W0703
+        return None
+
+
+def pylint_returncode(messages: list, note: float | None, options: dict):
+    """Returncode of pylint, bit mask of found categories.
+
+    >>> pylint_returncode([dict(category='C'), dict(category='W')], 9.0, {})
+    20
+    >>> pylint_returncode([dict(category='C')], 9.0, dict(fail_under=8))
+    0
+    """
+    status = 0
+    for message in messages:
+        status |= STATUS[message['category']]
+    if options.get('exit_zero'):
+        return 0
+    failon = set(options.get('fail_on', []))
+    for item in messages:
+        if failon & {item.get('msg_id'), item.get('symbol'), item['category']}:
+            return status or 1
+    if note is not None:
+        return 0 if note >= options.get('fail_under', 10) else status or 1
+    return status
+
+
+def bandit(findings: dict) -> tuple:
+    """Render bandit findings, returncode 1 if any issue was found.
+
+    Returns:
+        (report, returncode)
+    """
+    lines = []
+    issues = skipped = 0
+    for path, entry in sorted(findings['files'].items()):
+        for issue in entry.get('results', []):
+            issues += 1
+            lines.append(f">> Issue: [{issue['test_id']}:{issue['test_name']}]"
+                         f" {issue['issue_text']}")
+            lines.append(f"   Severity: {issue['issue_severity']}   "
+                         f"Confidence: {issue['issue_confidence']}")
+            lines.append(f"   Location: {path}:{issue['line_number']}")
+            lines.append('')
+        for error in entry.get('errors', []):
+            skipped += 1
+            lines.append(f'Skipped: {path} ({error})')
+    if issues or skipped:
+        lines.append(f'Total issues: {issues}, skipped files: {skipped}')
+    return '\n'.join(lines), 1 if issues else 0
@@ -0,0 +1,145 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Split the files linted by pylint into shards which run in parallel.
+
+The shards are balanced by the lint time of every file of the last run,
+files without lint time are estimated by their size. Every shard is one
+pylint process with a single job, the findings of all shards are merged.
+Checks which require the whole program, see WHOLE, can not be sharded:
+if enabled, pylint runs in one process over all folders.
+"""
+
+import configparser
+import os
+import shlex
+
+import utilo
+
+import baw.index
+import baw.parallel
+import baw.utils
+
+# checks which compare modules with each other
+WHOLE = {
+    'R0401': 'cyclic-import',
+    'R0801': 'duplicate-code',
+}
+
+# do not start a pylint process for less files
+MIN_FILES = 8
+
+
+def wholeprogram(cmd: str, rcfile: str = None) -> bool:
+    """Determine if `cmd` enables a check which requires all files.
+
+    >>> wholeprogram('pylint -d R0801 -d cyclic-import')
+    False
+    >>> wholeprogram('pylint -d R0801,R0401 --enable=duplicate-code')
+    True
+    >>> wholeprogram('pylint --disable=all --enable=W0511')
+    False
+    """
+    enabled = set(WHOLE)
+    if rcfile and os.path.exists(rcfile):
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(rcfile, encoding='utf8')
+        for section in parser.sections():
+            disabled = parser[section].get('disable', '')
+            enabled -= messages(disabled)
+    splitted = shlex.split(cmd)
+    for index, option in enumerate(splitted):
+        name, _, value = option.partition('=')
+        if not value and index + 1 < len(splitted):
+            value = splitted[index + 1]
+        if name in {'-d', '--disable'}:
+            enabled -= messages(value)
+        elif name in {'-e', '--enable'}:
+            enabled |= messages(value)
+    return bool(enabled)
+
+
+def messages(selected: str) -> set:
+    """Whole program checks of comma separated message ids or symbols.
+
+    >>> sorted(messages('C0111,\\n duplicate-code, R0401'))
+    ['R0401', 'R0801']
+    >>> len(messages('all'))
+    2
+    """
+    selected = {item.strip() for item in selected.split(',')}
+    if 'all' in selected:
+        return set(WHOLE)
+    return {
+        msgid for msgid, symbol in WHOLE.items()
+        if msgid in selected or symbol in selected
+    }
+
+
+def candidates(root: str, folders: list) -> list:
+    """Files which pylint lints in `folders` relative to `root`.
+
+    Like pylint, subfolders of a package are only linted if they are
+    packages themselves.
+    """
+    index = baw.index.snapshot(root, persist=True)
+    result = []
+    for folder in folders:
+        package = os.path.exists(utilo.join(root, folder, '__init__.py'))
+        for current, dirs, files in index.walk(folder):
+            dirs[:] = [item for item in dirs if not item.startswith('.')]
+            if package and '__init__.py' not in files:
+                dirs[:] = []
+                continue
+            result.extend(
+                baw.index.joined(current, name)
+                for name in files
+                if name.endswith('.py'))
+    return result
+
+
+def weights(root: str, paths: list, known: dict) -> dict:
+    """Expected lint time of `paths`, use size of files without lint time.
+
+    Sizes are converted to time by the ratio of lint time and size of
+    files with known lint time.
+    """
+    sizes = {item: os.path.getsize(utilo.join(root, item)) for item in paths}
+    measured = {
+        item: known[item]['duration']
+        for item in paths
+        if known.get(item, {}).get('duration') is not None
+    }
+    size = sum(sizes[item] for item in measured)
+    ratio = sum(measured.values()) / size if measured and size else 1.0
+    return {item: measured.get(item, sizes[item] * ratio) for item in paths}
+
+
+def count(paths: list) -> int:
+    """Number of shards, limited by the job budget.
+
+    >>> count(['a.py'] * 3)
+    1
+    """
+    return max(1, min(baw.parallel.share(), len(paths) // MIN_FILES))
+
+
+def merge(outputs: list) -> dict:
+    """Merge findings of pylint shards.
+
+    >>> merge([dict(files={'a': 1}, others=[1]), dict(files={'b': 2}, others=[1])])
+    {'files': {'a': 1, 'b': 2}, 'others': [1]}
+    """
+    result = dict(outputs[0], files={}, others=[])
+    for output in outputs:
+        result['files'].update(output['files'])
+        # messages of options are reported by every shard
+        for message in output.get('others', []):
+            if message not in result['others']:
+                result['others'].append(message)
+    return result
@@ -0,0 +1,335 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Findings of previous lint runs.
+
+Every lint run records its findings, the pylint rating and the state of
+the linted files in a sqlite store in the baw tmp dir. A run of the same
+state is only recorded once. The store answers:
+
+* the rating of the current files without linting them again
+* findings introduced since a base commit, see `baw lint --new_only`
+
+A finding is new if it is not part of the last run of a clean tree of
+the base commit. Findings are compared by a fingerprint of path, check,
+message and content of the reported line, moved lines are therefore no
+new findings. Without such a run findings in lines changed since the
+base commit are new.
+"""
+
+import collections
+import contextlib
+import hashlib
+import os
+import sqlite3
+import time
+
+import utilo
+
+import baw.cmd.lint.cache
+import baw.cmd.test.covmap
+import baw.cmd.test.impact
+import baw.gix
+import baw.runtime
+
+# wait for concurrent writer in secs
+TIMEOUT = 30.0
+
+# number of runs kept per tool and scope
+KEEP = 20
+
+# findings of a file of every tool
+ITEMS = {'pylint': 'messages', 'bandit': 'results'}
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tool TEXT,
+    scope TEXT,
+    state TEXT,
+    revision TEXT,
+    clean INTEGER,
+    rating REAL,
+    returncode INTEGER,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    run INTEGER,
+    path TEXT,
+    line INTEGER,
+    code TEXT,
+    symbol TEXT,
+    message TEXT,
+    severity TEXT,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS findings_run ON findings (run);
+"""
+
+
+def path_store(root: str) -> str:
+    return utilo.join(baw.cmd.lint.cache.lintdir(root), 'findings.db')
+
+
+@contextlib.contextmanager
+def connect(root: str):
+    path = path_store(root)
+    created = not os.path.exists(path)
+    connection = sqlite3.connect(path, timeout=TIMEOUT)
+    connection.row_factory = sqlite3.Row
+    try:
+        if created:
+            connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            connection.executescript(SCHEMA)
+        yield connection
+    finally:
+        connection.close()
+
+
+def state(config: str, hashes: dict) -> str:
+    """Identify linted files and lint options.
+
+    Args:
+        config(str): key of tool and options, see `baw.cmd.lint.cache.key`
+        hashes(dict): linted path to content hash
+    """
+    return baw.cmd.lint.cache.key(config, *sorted(hashes.items()))
+
+
+def findings_state(findings: dict) -> str:
+    return state(
+        findings['key'],
+        {
+            path: entry['hash'] for path, entry in findings['files'].items()
+        },
+    )
+
+
+def revision(root: str) -> tuple:
+    """Commit of HEAD and True if nothing changed since then."""
+    head = baw.gix.headhash(root)
+    if not head:
+        return '', False
+    return head, baw.gix.has_changes(root) is False
+
+
+def record(  # pylint:disable=R0913
+    root: str,
+    tool: str,
+    scope: str,
+    findings: dict,
+    rating: float | None = None,
+    returncode: int = 0,
+) -> int:
+    """Store `findings` of a lint run.
+
+    Returns:
+        id of run
+    """
+    current = findings_state(findings)
+    commit, clean = revision(root)
+    with connect(root) as connection:
+        # lock before lookup, concurrent runs must not record twice
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            known = connection.execute(
+                'SELECT id FROM runs WHERE tool = ? AND scope = ? '
+                'AND state = ? AND revision = ? AND clean = ?',
+                (tool, scope, current, commit, clean),
+            ).fetchone()
+            if known:
+                run = known['id']
+                connection.execute(
+                    'UPDATE runs SET created = ? WHERE id = ?',
+                    (time.time(), run),
+                )
+            else:
+                run = connection.execute(
+                    'INSERT INTO runs (tool, scope, state, revision, clean, '
+                    'rating, returncode, created) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (tool, scope, current, commit, clean, rating, returncode,
+                     time.time()),
+                ).lastrowid
+                connection.executemany(
+                    'INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(run, item['path'], item['line'], item['code'],
+                      item['symbol'], item['message'], item['severity'],
+                      item['fingerprint'])
+                     for item in rows(root, tool, findings)],
+                )
+                prune(connection, tool, scope)
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+    return run
+
+
+def prune(connection, tool: str, scope: str, keep: int = KEEP):
+    outdated = [
+        item['id'] for item in connection.execute(
+            'SELECT id FROM runs WHERE tool = ? AND scope = ? '
+            'ORDER BY created DESC LIMIT -1 OFFSET ?',
+            (tool, scope, keep),
+        )
+    ]
+    for run in outdated:
+        connection.execute('DELETE FROM findings WHERE run = ?', (run,))
+        connection.execute('DELETE FROM runs WHERE id = ?', (run,))
+
+
+def latest(root: str, tool: str, scope: str, current: str = None):
+    """Last recorded run, of state `current` if defined, or None."""
+    if not os.path.exists(path_store(root)):
+        return None
+    query = 'SELECT * FROM runs WHERE tool = ? AND scope = ?'
+    parameters = [tool, scope]
+    if current is not None:
+        query += ' AND state = ?'
+        parameters.append(current)
+    with connect(root) as connection:
+        return connection.execute(
+            query + ' ORDER BY created DESC LIMIT 1',
+            parameters,
+        ).fetchone()
+
+
+def baseline(root: str, tool: str, scope: str, commit: str) -> list | None:
+    """Fingerprints of last run of clean tree of `commit`, None if unknown."""
+    if not os.path.exists(path_store(root)):
+        return None
+    with connect(root) as connection:
+        run = connection.execute(
+            'SELECT id FROM runs WHERE tool = ? AND scope = ? AND revision = ? '
+            'AND clean = 1 ORDER BY created DESC LIMIT 1',
+            (tool, scope, commit),
+        ).fetchone()
+        if run is None:
+            return None
+        return [
+            item['fingerprint'] for item in connection.execute(
+                'SELECT fingerprint FROM findings WHERE run = ?',
+                (run['id'],),
+            )
+        ]
+
+
+def introduced(
+    root: str,
+    tool: str,
+    scope: str,
+    findings: dict,
+    base: str,
+) -> dict | None:
+    """Reduce `findings` to findings introduced since `base`.
+
+    Returns:
+        findings in format of `findings`, None if git fails
+    """
+    parsed = baw.runtime.run(f'git rev-parse {base}', cwd=root)
+    if parsed.returncode:
+        baw.error(f'lint: unknown base {base}: {parsed.stderr}')
+        return None
+    known = baseline(root, tool, scope, parsed.stdout.strip())
+    if known is not None:
+        fresh = collections.Counter(
+            item['fingerprint'] for item in rows(root, tool, findings))
+        fresh.subtract(collections.Counter(known))
+        return select(root, tool, findings, lambda item: consume(fresh, item))
+    baw.log(f'{tool}: no lint run of {base}, use changed lines')
+    changed = baw.cmd.test.covmap.hunks(root, base, new=True)
+    untracked = baw.cmd.test.impact.changed_files(root, base)
+    if changed is None or untracked is None:
+        return None
+    # files without hunks are untracked, all lines are new
+    added = {item for item in untracked if item not in changed}
+    return select(
+        root,
+        tool,
+        findings,
+        lambda item: item['path'] in added or item['line'] in changed.get(
+            item['path'], ()),
+    )
+
+
+def consume(counter: collections.Counter, finding: dict) -> bool:
+    if counter[finding['fingerprint']] <= 0:
+        return False
+    counter[finding['fingerprint']] -= 1
+    return True
+
+
+def select(root: str, tool: str, findings: dict, wanted) -> dict:
+    """Copy of `findings` with findings whose row matches `wanted`."""
+    result = dict(findings, files={}, others=[])
+    for path, entry in findings['files'].items():
+        lines = source(root, path)
+        items = [
+            item for item in entry.get(ITEMS[tool], [])
+            if wanted(row(tool, path, item, lines))
+        ]
+        result['files'][path] = dict(entry, **{ITEMS[tool]: items})
+    return result
+
+
+def rows(root: str, tool: str, findings: dict) -> list:
+    """Findings of all tools in the same format."""
+    result = []
+    for path, entry in sorted(findings['files'].items()):
+        lines = source(root, path) if entry.get(ITEMS[tool]) else []
+        for item in entry.get(ITEMS[tool], []):
+            result.append(row(tool, path, item, lines))
+    return result
+
+
+def row(tool: str, path: str, item: dict, lines: list) -> dict:
+    if tool == 'pylint':
+        result = {
+            'path': path,
+            'line': item['line'],
+            'code': item['msg_id'],
+            'symbol': item['symbol'],
+            'message': item['msg'],
+            'severity': item['category'],
+        }
+    else:
+        result = {
+            'path': path,
+            'line': item['line_number'],
+            'code': item['test_id'],
+            'symbol': item['test_name'],
+            'message': item['issue_text'],
+            'severity': item['issue_severity'],
+        }
+    result['fingerprint'] = fingerprint(result, lines)
+    return result
+
+
+def fingerprint(finding: dict, lines: list) -> str:
+    """Identify finding independent of its line number.
+
+    >>> finding = dict(path='a.py', code='W0611', message='x', line=2)
+    >>> fingerprint(finding, ['', 'import os']) == fingerprint(
+    ...     dict(finding, line=1), ['import os'])
+    True
+    """
+    line = finding['line'] or 0
+    content = lines[line - 1].strip() if 0 < line <= len(lines) else ''
+    parts = (finding['path'], finding['code'], finding['message'], content)
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def source(root: str, path: str) -> list:
+    try:
+        with open(utilo.join(root, path), encoding='utf8',
+                  errors='replace') as fp:
+            return fp.read().splitlines()
+    except OSError:
+        return []
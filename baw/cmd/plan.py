@@ -10,7 +10,6 @@
 import dataclasses
 import enum
 import os
-import re
 
 import utilo
 
@@ -198,28 +197,15 @@ def status(root: str) -> Status:
 
 
 def code_quality(root: str, verbose: int = 0) -> CodeQuality:
-    # Your code has been rated at 9.24/10
-    completed = baw.runtime.run_target(
-        root,
-        cmd='baw --verbose lint',
-        skip_error_code=set(range(100)),
-        verbose=verbose,
-    )
-    rating = re.search(
-        r'Your code has been rated at (?P<major>\d{1,2})\.(?P<minor>\d{1,2})/10',
-        completed.stdout,
-    )
-    if rating is None:
-        baw.completed(completed)
-    # Hint: If broken, verify 'baw --verbose lint' and ensure that code
-    # rating is printed.
-    assert rating is not None, completed
+    import baw.cmd.lint  # pylint:disable=W0621
     result = CodeQuality(
         coverage=1.0,
         rating=10.0,
     )
-    if rating:
-        result.rating = float(rating['major'] + '.' + rating['minor'])
+    # recorded rating of current files, lint if unknown
+    rating = baw.cmd.lint.rating(root, verbose=verbose)
+    if rating is not None:
+        result.rating = rating
     # Total coverage: 0.00
     # completed = baw.runtime.run_target(
     #     root,
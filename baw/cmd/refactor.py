@@ -14,6 +14,7 @@ import utilo
 
 import baw.cmd.utils
 import baw.gix
+import baw.index
 import baw.resources
 import baw.utils
 
@@ -77,17 +78,11 @@ def todo() -> dict:
 
 
 def files(root: str) -> list:
-    collected = baw.utils.file_list(
-        path=root,
-        include='py',
-        recursive=True,
-        absolute=True,
-    )
     result = []
-    for path in collected:
+    for path in baw.index.snapshot(root).files(('.py',)):
         if 'build' in path:
             continue
-        result.append(path)
+        result.append(utilo.join(root, path))
     return result
 
 
@@ -14,10 +14,10 @@ import utilo
 
 import baw.config
 import baw.gix
+import baw.resources
 import baw.utils
 
 TEMPLATES = utilo.join(baw.ROOT, 'baw/templates')
-TEMPLATE = utilo.file_read(utilo.join(TEMPLATES, 'semantic.cfg'))
 SEMANTIC = utilo.join(TEMPLATES, 'semantic')
 
 
@@ -25,7 +25,7 @@ SEMANTIC = utilo.join(TEMPLATES, 'semantic')
 def release_config_tmp(root: str, verbose: int):
     package = baw.config.shortcut(root)
     upload = str(is_ci()).lower()
-    generated = TEMPLATE + ''
+    generated = baw.resources.load_template('semantic.cfg')
     generated = generated.replace('{{REPO_DIR}}', root)
     generated = generated.replace('{{PACKAGE}}', package)
     generated = generated.replace('{{TEMPLATE_DIR}}', SEMANTIC)
@@ -0,0 +1,129 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Serve baw cmds out of a long living process.
+
+`baw serve` imports every subcommand once, keeps the parsed project
+config in memory and listens on a unix socket. Every `baw` invocation
+forwards argv, environment and cwd to the daemon if the socket exists,
+see baw.client. The daemon forks a worker per request which runs the cmd
+and streams stdout/stderr back, see baw/plugins/bawserve.py. Without
+daemon the cmd runs in-process as before.
+"""
+
+import importlib
+import os
+import sys
+
+import baw
+import baw.cli
+import baw.client
+import baw.cmd.info
+import baw.config
+import baw.gix
+import baw.project
+import baw.utils
+from baw.plugins import bawserve
+
+# last modification of parsed config, to invalidate cached config
+STAMPS = {}
+
+
+def serve(path: str = None, verbose: int = 0) -> int:
+    """Listen on unix socket `path` and run every request in a fork.
+
+    Args:
+        path(str): location of unix socket
+        verbose(int): log every served request
+    Returns:
+        SUCCESS after the daemon was stopped with ctrl+c
+    """
+    if not path:
+        baw.config.bawtmp()
+        path = baw.client.socket_path()
+    preload()
+
+    def dispatch(request: dict):
+        if verbose:
+            baw.log(f'serve: {" ".join(request["argv"])}')
+        refresh(request['cwd'])
+        return execute
+
+    baw.log(f'serve: {path}')
+    bawserve.serve(path, dispatch)
+    baw.log('serve: stopped')
+    return baw.SUCCESS
+
+
+def preload():
+    """Import every registered subcommand once."""
+    for command in baw.cli.COMMANDS:
+        importlib.import_module(command.module)
+
+
+def refresh(cwd: str):
+    """Keep parsed project config of `cwd` in memory, reload if changed."""
+    root = baw.project.determine_root(cwd)
+    if not root:
+        return
+    path = baw.config.config_path(root)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return
+    if STAMPS.get(path) != stamp:
+        cache_clear()
+        STAMPS[path] = stamp
+    baw.config.load(path)
+    baw.config.shortcut(root)
+    baw.config.name(root)
+    baw.gix.installed()
+
+
+def cache_clear():
+    for cached in (
+            baw.cmd.info.baw_config,
+            baw.config.config_path,
+            baw.config.load,
+            baw.config.name,
+            baw.config.project,
+            baw.config.python,
+            baw.config.shortcut,
+    ):
+        cached.cache_clear()
+
+
+def execute(request: dict) -> int:
+    import baw.__main__  # pylint:disable=W0621
+    sys.argv = request['argv']
+    try:
+        baw.__main__.run()
+    except SystemExit as exited:
+        code = exited.code
+        if code is None:
+            return baw.SUCCESS
+        if isinstance(code, int):
+            return code
+        baw.error(code)
+    return baw.FAILURE
+
+
+def run(args: dict):
+    return serve(
+        path=args.get('socket'),
+        verbose=args.get('verbose', 0),
+    )
+
+
+def extend_cli(parser):
+    cli = parser.add_parser('serve', help='Serve baw cmds in a daemon')
+    cli.add_argument(
+        '--socket',
+        help='location of unix socket',
+    )
+    cli.set_defaults(func=run)
@@ -8,18 +8,29 @@
 # =============================================================================
 
 import os
-import shutil
+import re
+import shlex
 import sys
+import time
 
 import utilo
 
 import baw.archive.test
 import baw.cmd.baseline
+import baw.cmd.info
+import baw.cmd.test.cache
 import baw.cmd.test.cov
+import baw.cmd.test.covmap
+import baw.cmd.test.durations
+import baw.cmd.test.impact
+import baw.cmd.test.session
+import baw.cmd.test.shard
+import baw.cmd.test.warm
+import baw.cmd.test.watch
 import baw.cmd.utils
 import baw.config
-import baw.datetime
 import baw.gix
+import baw.parallel
 import baw.run
 import baw.runtime
 import baw.utils
@@ -43,6 +54,12 @@ def run_test(  # pylint:disable=R0914,R1260
     stash: bool = False,
     noinstall: bool = False,
     cov_report: bool = False,
+    cache: bool = False,
+    selected: list = None,
+    covmap: bool = False,
+    shard: tuple = None,
+    shard_durations: str = None,
+    warm: bool = False,
     verbose: int = 0,
 ) -> int:
     """Running test-step in root/tests
@@ -66,6 +83,12 @@ def run_test(  # pylint:disable=R0914,R1260
         stash(bool): stash all changes to test commited-change in repository
         noinstall(bool): do not run install step before testing
         cov_report(bool): generate and open cov report
+        cache(bool): replay result of previous run if nothing changed
+        selected(list): run these test and doctest modules only
+        covmap(bool): record which test covers which line
+        shard(tuple): run part (index, count) of tests, index starts with 1
+        shard_durations(str): durations to partition shards, see `baw test merge`
+        warm(bool): run tests on server which keeps dependencies imported
         verbose(bool): extend logging
     Returns:
         returncode(int): 0 if successful else > 0
@@ -73,6 +96,10 @@ def run_test(  # pylint:disable=R0914,R1260
     if baseline:
         baw.cmd.baseline.pre(root)
         alls = True
+    # coverage map requires coverage
+    coverage = coverage or covmap
+    testconfig, workers = xdist(testconfig)
+    warm, testconfig, workers = warmup(warm, pdb, testconfig, workers)
     if not any((generate, nightly, longrun, fast, docs, alls)):
         baw.log('skip tests...')
         return baw.SUCCESS
@@ -96,24 +123,41 @@ def run_test(  # pylint:disable=R0914,R1260
         generate_only=generate_only,
         instafail=instafail,
         parameter=testconfig,
+        selected=selected,
+        covmap=covmap,
+        partial=bool(shard),
         markers=markers,
         pdb=pdb,
         quiet=quiet,
         cov_report=cov_report,
         verbose=verbose,
     )
+    cmd += setup_recording(root, testenv, covmap, shard, shard_durations)
+    complete = all_tests(testconfig) and not (selected or shard)
+    # record complete runs only to predict the next one
+    mode = None
+    if complete and not (generate_only or docs):
+        mode = 'fast' if fast else selection(longrun, nightly)
+        predict(root, mode, workers)
+    cached = None
+    # user defined junit report would be replaced by cache report
+    junit = 'junit' in str(testconfig)
+    if cache and not (pdb or stash or coverage or generate or junit or shard):
+        cached, replayed = baw.cmd.test.cache.lookup(root, cmd, testenv)
+        if replayed is not None:
+            return replayed
+        cmd += baw.cmd.test.cache.junit(root, cached)
     environment = baw.git_stash if stash else baw.utils.empty
+    start = time.time()
     with environment(root, verbose=verbose):
-        completed = baw.runtime.run_target(
-            root,
-            cmd,
-            cwd=root,  # to include project code(namespace) into syspath
-            debugging=True,  # live test reporting
-            env=testenv,
-            verbose=verbose,
-            # no tests available => no problem
-            skip_error_code={NO_TEST_TO_RUN},
-        )
+        completed = execute(root, cmd, testenv, warm, workers, verbose)
+    baw.cmd.test.durations.update(
+        root,
+        mode=mode,
+        wall=time.time() - start,
+        workers=workers,
+    )
+    record(root, completed.returncode, covmap and not pdb, shard, cached)
     if completed.returncode == baw.SUCCESS:
         if generate_only:
             # do not write log of collect tests
@@ -123,24 +167,168 @@ def run_test(  # pylint:disable=R0914,R1260
         # do not log partial long running tests as completed
         # TODO: ADJUST -n6!!!
         # TODO: VERIFY THAT SELECTIVE TESTING WAS NOT USED
-        if all_tests(testconfig) and (longrun or nightly or alls):
-            head = baw.gix.headhash(root)
-            if head:
-                baw.archive.test.mark_tested(root, head)
+        if complete and (longrun or nightly or alls):
+            mark_tested(
+                root,
+                mode=selection(longrun=longrun, nightly=nightly),
+                duration=time.time() - start,
+                workers=workers,
+            )
     if completed.returncode == NO_TEST_TO_RUN:
         # override pytest error code
         return baw.SUCCESS
     if baseline:
-        if baw.cmd.baseline.commit(root):
-            return baw.FAILURE
-        return baw.SUCCESS
+        return baw.FAILURE if baw.cmd.baseline.commit(root) else baw.SUCCESS
     return completed.returncode
 
 
+def execute(
+    root: str,
+    cmd: str,
+    testenv: dict,
+    warm: bool,
+    workers: int,
+    verbose: int,
+):
+    if warm:
+        return baw.cmd.test.warm.run(root, cmd, testenv)
+    return baw.runtime.run_target(
+        root,
+        cmd,
+        cwd=root,  # to include project code(namespace) into syspath
+        debugging=True,  # live test reporting
+        env=testenv,
+        jobs=workers,
+        verbose=verbose,
+        # no tests available => no problem
+        skip_error_code={NO_TEST_TO_RUN},
+    )
+
+
+def warmup(warm: bool, pdb: bool, testconfig: list, workers: int) -> tuple:
+    """Run on warm server without xdist workers if possible.
+
+    Returns:
+        (warm, testconfig, workers)
+    """
+    if warm and (pdb or not baw.cmd.test.warm.available()):
+        baw.log('test: warm server requires fork and no pdb, run cold')
+        warm = False
+    if warm and workers > 1:
+        # xdist workers would import everything again
+        testconfig = [item for item in testconfig if not XDIST.fullmatch(item)]
+        workers = 1
+    return warm, testconfig, workers
+
+
+def setup_recording(
+    root: str,
+    testenv: dict,
+    covmap: bool,
+    shard: tuple,
+    shard_durations: str,
+) -> str:
+    """Extend `testenv` and return pytest options to record durations,
+    coverage map and shard results."""
+    if covmap:
+        testenv['COVERAGE_FILE'] = baw.cmd.test.covmap.datafile(root)
+    result = baw.cmd.test.durations.setup(root, testenv)
+    if shard:
+        result += baw.cmd.test.shard.setup(
+            root,
+            testenv,
+            *shard,
+            durations=shard_durations,
+        )
+    return result
+
+
+def predict(root: str, mode: str, workers: int):
+    predicted = baw.cmd.test.durations.predict(root, mode, workers)
+    if predicted is not None:
+        baw.log(f'test: {mode} predicted {predicted:.1f} secs '
+                f'with {workers} workers')
+
+
+def record(
+    root: str,
+    returncode: int,
+    covmap: bool,
+    shard: tuple,
+    cached: str,
+):
+    """Collect shard results, coverage map and cached result of run."""
+    if shard:
+        baw.cmd.test.shard.collect(root, *shard)
+    if covmap:
+        baw.cmd.test.covmap.record(root)
+    if cached and returncode in (baw.SUCCESS, NO_TEST_TO_RUN):
+        baw.cmd.test.cache.store(root, cached, baw.SUCCESS)
+
+
+def mark_tested(root: str, mode: str, duration: float, workers: int):
+    head = baw.gix.headhash(root)
+    if not head:
+        return
+    baw.archive.test.mark_tested(
+        root,
+        head,
+        mode=mode,
+        duration=duration,
+        workers=workers,
+        requirements=baw.cmd.info.requirement_hash(root),
+    )
+
+
+def selection(longrun: bool, nightly: bool) -> str:
+    """\
+    >>> selection(longrun=True, nightly=False)
+    'long'
+    """
+    if nightly:
+        return 'nightly'
+    if longrun:
+        return 'long'
+    return 'all'
+
+
 # pytest returncode when runnining without tests
 # from _pytest.main import EXIT_NOTESTSCOLLECTED
 NO_TEST_TO_RUN = 5
 
+# -n=4, -n 4, -n auto or +n=4 to forward via --config
+XDIST = re.compile(r'[-+]n(?:[=\s]*(?P<workers>\w+))?')
+
+
+def xdist(testconfig: list) -> tuple:
+    """Limit pytest-xdist worker count to the share of the job budget.
+
+    >>> xdist(['-n=1', '-k abc'])
+    (['-k abc'], 1)
+    >>> xdist(['-n', 'auto'])[1] == baw.parallel.jobs()
+    True
+    >>> xdist(None)
+    (None, 1)
+    """
+    if not testconfig:
+        return testconfig, 1
+    result, workers = [], 1
+    todo = list(testconfig)
+    while todo:
+        item = todo.pop(0)
+        matched = XDIST.fullmatch(item.strip())
+        if not matched:
+            result.append(item)
+            continue
+        wanted = matched['workers']
+        if wanted is None and todo:
+            wanted = todo.pop(0)
+        workers = baw.parallel.share(wanted)
+        if workers > 1:
+            # without -n pytest runs in-process
+            result.append(f'{item.strip()[0]}n={workers}')
+    return result, workers
+
 
 def all_tests(testconfig) -> bool:
     if not testconfig:
@@ -207,6 +395,9 @@ def create_test_cmd(  # pylint:disable=R0914
     markers: str,
     cov_report: bool = True,
     doctest: bool = True,
+    selected: list = None,
+    covmap: bool = False,
+    partial: bool = False,
     verbose: int = 0,
 ):
     """\
@@ -222,7 +413,10 @@ def create_test_cmd(  # pylint:disable=R0914
         pdb=debugger,
         outdir=coverage,
         report=cov_report,
+        minimum=not partial,
     ) if coverage else ''
+    if covmap and cov:
+        cov += f' {baw.cmd.test.covmap.args()}'
     # create test directory
     tmp_testpath, cachedir = create_testdir(root)
     # config
@@ -238,6 +432,7 @@ def create_test_cmd(  # pylint:disable=R0914
         doctest,
         generate_only,
         coverage,
+        selected,
     )
     # python -m to include sys path of cwd
     # --basetemp define temp directory where the tests run
@@ -248,7 +443,7 @@ def create_test_cmd(  # pylint:disable=R0914
            f'{override_testconfig} {debugger} {cov} {generate_only} '
            f'--basetemp={tmp_testpath} {plugins} '
            f'-o cache_dir={cachedir} {sources}')
-    if doctest or generate_only or coverage:
+    if doctest or generate_only or coverage or selected:
         cmd += '--doctest-modules '
     if markers:
         cmd += f'{markers} '
@@ -260,30 +455,11 @@ def create_test_cmd(  # pylint:disable=R0914
 
 
 def create_pytest_config(root: str) -> str:
-    pytest_ini = utilo.join(baw.ROOT, 'baw/templates/pytest.pini')
-    # using ROOT to get location from baw-tool
-    assert os.path.exists(pytest_ini), f'no testconfig available {pytest_ini}'
-    config = utilo.file_read(pytest_ini)
-    path = utilo.join(root, 'pytest.ini')
-    baw.utils.file_replace(
-        path,
-        content=config,
-    )
-    return path
+    return baw.cmd.test.session.config(root)
 
 
 def create_testdir(root):
-    tmpdir = baw.utils.tmp(root)
-    testtime = baw.datetime.current(seconds=True, separator='_')
-    testfolder = f'test_{testtime}'
-    logfolder = utilo.join(tmpdir, 'log')
-    os.makedirs(logfolder, exist_ok=True)
-    tmp_testpath = utilo.join(tmpdir, testfolder)
-    if os.path.exists(tmp_testpath):
-        # remove test folder if exists
-        shutil.rmtree(tmp_testpath)
-    cachedir = utilo.join(tmpdir, 'pytest_cache')
-    return tmp_testpath, cachedir
+    return baw.cmd.test.session.prepare_testdir(root)
 
 
 def select_tests_sources(
@@ -292,7 +468,18 @@ def select_tests_sources(
     doctest: bool,
     generate_only: bool,
     coverage: bool,
+    selected: list = None,
 ) -> str:
+    """Determine test and doctest locations of pytest cmd.
+
+    >>> select_tests_sources('/root', None, False, False, False, ['tests/test_me.py::test_me[a b]'])
+    "'/root/tests/test_me.py::test_me[a b]' "
+    """
+    if selected:
+        # test and doctest modules selected by impact analysis, quote
+        # ids of parametrized tests like test_me[a b]
+        return ' '.join(
+            shlex.quote(utilo.join(root, item)) for item in selected) + ' '
     # set to root to run doctests for all subproject's
     testdir = utilo.join(root, 'tests')
     doctests = ' '.join(baw.config.sources(root))
@@ -343,25 +530,57 @@ def run(args: dict):
     selected = args['test']
     generate = args['generate']
     generate |= selected == 'generate'  # TODO: REMOVE LEGACY
-    coverage = baw.cmd.test.cov.select_cov(args)
-    result = run_test(
-        root=root,
-        baseline=selected == 'baseline',
-        coverage=coverage,
-        docs=selected == 'docs',
-        fast=selected == 'fast',
-        longrun=selected == 'long',
-        nightly=selected == 'nightly',
-        alls=selected == 'all',
-        pdb=args['pdb'],
-        generate=generate,
-        stash=args['stash'],
-        instafail=args['instafail'],
-        testconfig=testconfig,
-        noinstall=args.get('no_install', False),
-        cov_report=not args.get('no_report', False),
-        verbose=args.get('verbose', 0),
-    )
+    if args.get('warm_stop'):
+        return baw.cmd.test.warm.stop(root)
+    if selected == 'merge':
+        paths = args.get('shards') or [baw.cmd.test.shard.shardir(root)]
+        return baw.cmd.test.shard.merge(root, paths, args['junit_xml'])
+    shard = None
+    if args.get('shard'):
+        shard = baw.cmd.test.shard.parse(args['shard'])
+        if shard is None:
+            baw.error(f'invalid shard: {args["shard"]}, require index/count')
+            return baw.FAILURE
+    options = {
+        'root': root,
+        'baseline': selected == 'baseline',
+        'coverage': baw.cmd.test.cov.select_cov(args),
+        'docs': selected == 'docs',
+        'fast': selected in {'fast', 'changed'},
+        'longrun': selected == 'long',
+        'nightly': selected == 'nightly',
+        'alls': selected == 'all',
+        'pdb': args['pdb'],
+        'generate': generate,
+        'stash': args['stash'],
+        'instafail': args['instafail'],
+        'testconfig': testconfig,
+        'noinstall': args.get('no_install', False),
+        'cov_report': not args.get('no_report', False),
+        'cache': not args.get('no_cache', False),
+        'covmap': args.get('cov_map', False),
+        'shard': shard,
+        'shard_durations': args.get('shard_durations'),
+        'warm': args.get('warm', False),
+        'verbose': args.get('verbose', 0),
+    }
+    if args.get('watch'):
+        # compact output of every run
+        options['quiet'] = True
+        return baw.cmd.test.watch.watch(
+            root,
+            lambda tests: run_test(selected=tests, **options),
+        )
+    changed = None
+    if selected == 'changed':
+        if baw.cmd.test.covmap.available(root):
+            changed = baw.cmd.test.covmap.select(root, base=args['base'])
+        else:
+            changed = baw.cmd.test.impact.select(root, base=args['base'])
+        if changed == []:
+            baw.log(f'test changed: no test affected since {args["base"]}')
+            return baw.SUCCESS
+    result = run_test(selected=changed, **options)
     return result
 
 
@@ -369,7 +588,7 @@ def extend_cli(parser):
     test = parser.add_parser('test', help='Run unit tests')
     test.add_argument(
         '-n',
-        help='process count; use auto to select os.cpu_count',
+        help='process count; use auto to use the whole job budget',
         default='auto',
     )
     test.add_argument(
@@ -382,6 +601,12 @@ def extend_cli(parser):
         default=baw.cmd.test.cov.NOT_SELECTED,
         help='determine coverage, use optional report-path',
     )
+    test.add_argument(
+        '--cov_map',
+        '--cov-map',
+        help='record covered lines per test to select `baw test changed`',
+        action='store_true',
+    )
     test.add_argument(
         '--generate',
         help='test data generator',
@@ -402,6 +627,12 @@ def extend_cli(parser):
         help='print error while running pytest',
         action='store_true',
     )
+    test.add_argument(
+        '--no_cache',
+        '--no-cache',
+        help='run tests even if nothing changed since last successful run',
+        action='store_true',
+    )
     test.add_argument(
         '--no_install',
         help='do not run setup before testing',
@@ -426,6 +657,41 @@ def extend_cli(parser):
         '--junit_xml',
         help='junit-xml for pytest',
     )
+    test.add_argument(
+        '--base',
+        help='base ref of `baw test changed`',
+        default='HEAD',
+    )
+    test.add_argument(
+        '--shard',
+        help='run part index/count of tests, for example 3/8',
+    )
+    test.add_argument(
+        '--shard_durations',
+        '--shard-durations',
+        help='durations.json of `baw test merge` to balance all shards',
+    )
+    test.add_argument(
+        '--shards',
+        help='shard dirs or files of `baw test merge`',
+        nargs='*',
+    )
+    test.add_argument(
+        '--warm',
+        help='run tests on server which keeps pytest and dependencies imported',
+        action='store_true',
+    )
+    test.add_argument(
+        '--warm_stop',
+        '--warm-stop',
+        help='stop warm test server of project',
+        action='store_true',
+    )
+    test.add_argument(
+        '--watch',
+        help='run affected tests whenever sources or tests change',
+        action='store_true',
+    )
     test.add_argument(
         '-x',
         help='fail fast after first error',
@@ -436,6 +702,7 @@ def extend_cli(parser):
         help='',
         nargs='?',
         default='fast',
-        choices='skip docs fast long generate nightly all baseline'.split(),
+        choices=('skip docs fast changed long generate nightly all '
+                 'baseline merge').split(),
     )
     test.set_defaults(func=run)
@@ -0,0 +1,202 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Replay results of test runs whose inputs did not change.
+
+The key combines the git tree hash of sources and tests including not
+committed changes, the pytest and project config files of the root, the
+requirement files, the installed packages and the selected pytest
+options. Only successful runs are recorded, a failing
+or flaky test is always executed again.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import xml.etree.ElementTree as ET  # nosec
+
+import utilo
+
+import baw.cmd.info
+import baw.cmd.sync
+import baw.config
+import baw.gix
+import baw.runtime
+import baw.utils
+
+# environment variables which select tests
+FLAGS = 'LONGRUN FAST NIGHTLY GENERATE NOINSTALL'.split()
+
+# keep most recent results only
+LIMIT = 100
+
+# config files of root which change the test run, ignored files as well
+ROOTFILES = ('conftest.py', 'pytest.ini', 'pyproject.toml', 'setup.cfg',
+             'tox.ini')
+
+
+def cachedir(root: str) -> str:
+    return utilo.join(baw.utils.tmp(root), 'testcache')
+
+
+def lookup(root: str, cmd: str, env: dict) -> tuple:
+    """Determine key of test run and replay recorded result.
+
+    Returns:
+        (key, returncode): key is None if root is no git repo, returncode
+                           is None if nothing was recorded
+    """
+    hashed = key(root, cmd, env)
+    if hashed is None:
+        return None, None
+    return hashed, replay(root, hashed)
+
+
+def key(root: str, cmd: str, env: dict) -> str | None:
+    """Determine cache key of test run, None if root is no git repo."""
+    tree = tree_hash(root)
+    if tree is None:
+        return None
+    # location of test dir contains the current time
+    cmd = re.sub(r'--basetemp=\S+', '', cmd)
+    flags = [f'{item}={env.get(item, "")}' for item in FLAGS]
+    result = hashlib.sha256()
+    for item in (
+            tree,
+            rootfiles(root),
+            baw.cmd.info.requirement_hash(root),
+            str(baw.cmd.sync.pip_list(root)),
+            ' '.join(cmd.split()),
+            ' '.join(flags),
+    ):
+        result.update(item.encode(baw.utils.UTF8))
+        result.update(b'\0')
+    return result.hexdigest()
+
+
+def rootfiles(root: str) -> str:
+    """Hash content of existing ROOTFILES."""
+    result = hashlib.sha256()
+    for name in ROOTFILES:
+        path = utilo.join(root, name)
+        if not os.path.isfile(path):
+            continue
+        result.update(name.encode(baw.utils.UTF8) + b'\0')
+        with open(path, 'rb') as fp:
+            result.update(fp.read())
+        result.update(b'\0')
+    return result.hexdigest()
+
+
+def tree_hash(root: str) -> str | None:
+    """Hash sources and tests of working tree with a private git index.
+
+    Untracked files are included, ignored files are not.
+    """
+    gitdir = baw.gix.find_gitdir(root)
+    if gitdir is None:
+        return None
+    index = utilo.join(baw.utils.tmp(root), 'testcache.index')
+    current = utilo.join(gitdir, 'index')
+    if os.path.exists(current):
+        # reuse stat information of real index to avoid rehashing
+        shutil.copyfile(current, index)
+    paths = [
+        item for item in baw.config.sources(root) + ['tests']
+        if os.path.exists(utilo.join(root, item))
+    ]
+    env = dict(os.environ.items())
+    env['GIT_INDEX_FILE'] = index
+    completed = baw.runtime.run(
+        f'git add -A -- {" ".join(paths)} && git write-tree',
+        cwd=root,
+        env=env,
+    )
+    if completed.returncode:
+        return None
+    return completed.stdout.strip()
+
+
+def junit(root: str, hashed: str | None) -> str:
+    """pytest option to write the report which is summarized later."""
+    if hashed is None:
+        return ''
+    os.makedirs(cachedir(root), exist_ok=True)
+    return f'--junit-xml={report(root, hashed)} '
+
+
+def report(root: str, hashed: str) -> str:
+    return utilo.join(cachedir(root), f'{hashed}.xml')
+
+
+def replay(root: str, hashed: str) -> int | None:
+    """Log recorded result of `hashed`, None if nothing was recorded."""
+    path = utilo.join(cachedir(root), f'{hashed}.json')
+    if not os.path.exists(path):
+        return None
+    try:
+        recorded = json.loads(utilo.file_read(path))
+    except ValueError:
+        return None
+    # mark as recently used
+    os.utime(path)
+    baw.log(recorded['summary'])
+    baw.log('test: unchanged, replay cached result, use --no-cache to run')
+    return recorded['returncode']
+
+
+def store(root: str, hashed: str, returncode: int):
+    """Record successful test run of `hashed`."""
+    summary = summarize(report(root, hashed))
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(report(root, hashed))
+    path = utilo.join(cachedir(root), f'{hashed}.json')
+    recorded = {
+        'returncode': returncode,
+        'summary': summary,
+        'created': time.time(),
+    }
+    baw.utils.file_replace(path, json.dumps(recorded))
+    prune(root)
+
+
+def summarize(path: str) -> str:
+    """Create pytest like summary out of junit report."""
+    if not os.path.exists(path):
+        return 'no tests ran'
+    parsed = ET.parse(path).getroot()  # nosec
+    suites = parsed.iter('testsuite')
+    counted = {'tests': 0, 'failures': 0, 'errors': 0, 'skipped': 0}
+    duration = 0.0
+    for suite in suites:
+        for item in counted:
+            counted[item] += int(suite.get(item, 0))
+        duration += float(suite.get('time', 0))
+    passed = counted['tests'] - sum(
+        counted[item] for item in ('failures', 'errors', 'skipped'))
+    result = f'{passed} passed'
+    if counted['skipped']:
+        result += f', {counted["skipped"]} skipped'
+    return f'{result} in {duration:.2f}s'
+
+
+def prune(root: str, limit: int = LIMIT):
+    recorded = utilo.file_list(
+        cachedir(root),
+        include=['json'],
+        absolute=True,
+    )
+    if len(recorded) <= limit:
+        return
+    recorded.sort(key=os.path.getmtime)
+    for item in recorded[:-limit]:
+        os.remove(item)
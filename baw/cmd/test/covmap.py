@@ -0,0 +1,224 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Map covered lines to the tests which executed them.
+
+`baw test --cov_map` records coverage contexts per test. The map stores
+for every line of the project sources which tests touched it and the
+commit it was recorded on. `baw test changed` selects the tests whose
+covered lines intersect the changed lines. Lines which run on import
+only, for example a changed signature, fall back to the import graph of
+`baw.cmd.test.impact`.
+"""
+
+import json
+import os
+import re
+
+import utilo
+
+import baw.cmd.test.impact
+import baw.gix
+import baw.runtime
+import baw.utils
+
+# @@ -old,count +new,count @@
+HUNK = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+# context of lines executed while importing test modules
+IMPORT = ''
+
+
+def mapdir(root: str) -> str:
+    result = utilo.join(baw.utils.tmp(root), 'covmap')
+    os.makedirs(result, exist_ok=True)
+    return result
+
+
+def datafile(root: str) -> str:
+    """Coverage data file which is written while recording."""
+    return utilo.join(mapdir(root), 'coverage')
+
+
+def mappath(root: str) -> str:
+    return utilo.join(mapdir(root), 'map.json')
+
+
+def args() -> str:
+    return '--cov-context=test '
+
+
+def available(root: str) -> bool:
+    return os.path.exists(mappath(root))
+
+
+def record(root: str) -> bool:
+    """Convert coverage data of last test run into the coverage map."""
+    import coverage
+    path = datafile(root)
+    if not os.path.exists(path):
+        baw.error(f'cov map: no coverage data: {path}')
+        return False
+    data = coverage.CoverageData(basename=path)
+    data.read()
+    tests = {}
+    files = {}
+    for measured in data.measured_files():
+        relative = baw.utils.forward_slash(os.path.relpath(measured, root))
+        lines = {}
+        for lineno, contexts in data.contexts_by_lineno(measured).items():
+            # tests/test_me.py::test_me|run
+            selected = {item.split('|')[0] for item in contexts}
+            lines[lineno] = sorted(
+                tests.setdefault(item, len(tests)) for item in selected)
+        files[relative] = lines
+    dirty = baw.cmd.test.impact.changed_files(root, 'HEAD') or []
+    mapped = {
+        'commit': baw.gix.headhash(root),
+        'dirty': sorted(dirty),
+        'tests': sorted(tests, key=tests.get),
+        'files': files,
+    }
+    baw.utils.file_replace(mappath(root), json.dumps(mapped))
+    baw.log(f'cov map: {len(tests)} tests, {len(files)} files')
+    return True
+
+
+def select(root: str, base: str = 'HEAD') -> list | None:
+    """Select tests whose covered lines intersect changes since `base`.
+
+    Returns:
+        sorted test ids and modules, None to run all tests
+    """
+    mapped = json.loads(utilo.file_read(mappath(root)))
+    commit = mapped['commit']
+    if not commit:
+        return None
+    changed = changes(root, base, commit)
+    if changed is None:
+        return None
+    relevant = baw.cmd.test.impact.relevant(root, list(changed))
+    if relevant is None:
+        return None
+    result, fallback = covering(mapped, relevant, changed)
+    if fallback:
+        # select by import graph
+        result.update(baw.cmd.test.impact.affected(root, fallback))
+    return sorted(result)
+
+
+def changes(root: str, base: str, commit: str) -> dict | None:
+    """Changed lines since `base` relative to `commit` of the map.
+
+    Returns:
+        changed lines per path, None if git failed
+    """
+    changed = hunks(root, f'{base} {commit}', new=True)
+    if changed is None:
+        return None
+    current = hunks(root, commit, new=False)
+    if current is None:
+        return None
+    for path, lines in current.items():
+        changed.setdefault(path, set()).update(lines)
+    # include untracked files
+    pending = baw.cmd.test.impact.changed_files(root, 'HEAD')
+    if pending is None:
+        return None
+    for path in pending:
+        changed.setdefault(path, set())
+    return changed
+
+
+def covering(mapped: dict, relevant: list, changed: dict) -> tuple:
+    """Select tests which cover changed lines of `relevant` paths.
+
+    Returns:
+        (selected tests, paths which require the import graph)
+    """
+    tests = mapped['tests']
+    result, fallback = set(), []
+    for path in relevant:
+        covered = mapped['files'].get(path)
+        lines = changed[path]
+        if baw.cmd.test.impact.istest(path):
+            result.add(path)
+        elif covered is None or not lines or path in mapped['dirty']:
+            # not measured or line numbers are not reliable
+            fallback.append(path)
+        else:
+            ids = intersect(covered, lines)
+            if IMPORT in {tests[item] for item in ids}:
+                fallback.append(path)
+            result.update(tests[item] for item in ids)
+    result.discard(IMPORT)
+    return result, fallback
+
+
+def intersect(covered: dict, lines: set) -> set:
+    """Collect test indexes of covered `lines`.
+
+    >>> sorted(intersect({'3': [0], '4': [0, 1], '9': [2]}, {4, 5}))
+    [0, 1]
+    """
+    result = set()
+    for line in lines:
+        result.update(covered.get(str(line), ()))
+    return result
+
+
+def hunks(root: str, refs: str, new: bool) -> dict | None:
+    """Parse changed line numbers of `git diff refs`.
+
+    Args:
+        root(str): project root
+        refs(str): refs to compare
+        new(bool): use line numbers of new side instead of old side
+    Returns:
+        changed path to line numbers, None if git fails
+    """
+    cmd = f'git diff -U0 --no-renames --no-color {refs} --'
+    completed = baw.runtime.run(cmd, cwd=root)
+    if completed.returncode:
+        baw.error(f'cov map: {cmd}\n{completed.stderr}')
+        return None
+    return parse(completed.stdout, new=new)
+
+
+def parse(diff: str, new: bool) -> dict:
+    """\
+    >>> diff = '--- a/a.py\\n+++ b/a.py\\n@@ -3,2 +3 @@\\n@@ -9,0 +9,2 @@'
+    >>> sorted(parse(diff, new=False)['a.py'])
+    [3, 4, 9, 10]
+    >>> sorted(parse(diff, new=True)['a.py'])
+    [3, 9, 10]
+    """
+    result = {}
+    paths = {}
+    for line in diff.splitlines():
+        if line.startswith('diff --git'):
+            paths = {}
+            continue
+        if line.startswith(('--- a/', '+++ b/')):
+            # side of path: --- old, +++ new
+            paths[line.startswith('+++')] = line[6:]
+            continue
+        matched = HUNK.match(line)
+        if not matched:
+            continue
+        # added or removed files have one path only
+        path = paths.get(new, paths.get(not new))
+        start, count = matched.group(3, 4) if new else matched.group(1, 2)
+        start, count = int(start), 1 if count is None else int(count)
+        if count:
+            changed = range(start, start + count)
+        else:
+            # pure insertion or removal: neighbours of the position
+            changed = (start, start + 1)
+        result.setdefault(path, set()).update(changed)
+    return result
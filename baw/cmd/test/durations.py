@@ -0,0 +1,192 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Durations of previous test runs.
+
+Every test run records the duration of every single test in a sqlite
+store in the baw tmp dir. The durations are passed to the injected
+`bawschedule` plugin, see baw/plugins, which hands out the longest tests
+first to the xdist workers. The tests of the last run of every mode are
+kept to predict the wall time of the next run.
+"""
+
+import contextlib
+import heapq
+import json
+import os
+import sqlite3
+import time
+
+import utilo
+
+import baw.utils
+
+# see baw/plugins/bawschedule.py
+PLUGIN = 'bawschedule'
+DURATIONS = 'BAW_DURATIONS'
+REPORT = 'BAW_DURATIONS_REPORT'
+
+# weight of latest measurement compared to previous runs
+WEIGHT = 0.5
+
+# wait for concurrent writer in secs
+TIMEOUT = 30.0
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS durations (
+    nodeid TEXT PRIMARY KEY,
+    duration REAL,
+    runs INTEGER,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    mode TEXT PRIMARY KEY,
+    nodeids TEXT,
+    wall REAL,
+    workers INTEGER,
+    created REAL
+);
+"""
+
+
+def path_store(root: str) -> str:
+    return utilo.join(baw.utils.tmp(root), 'durations.db')
+
+
+def path_export(root: str) -> str:
+    return utilo.join(baw.utils.tmp(root), 'durations.json')
+
+
+def path_report(root: str) -> str:
+    return utilo.join(baw.utils.tmp(root), 'durations_report.json')
+
+
+@contextlib.contextmanager
+def connect(root: str):
+    path = path_store(root)
+    created = not os.path.exists(path)
+    connection = sqlite3.connect(path, timeout=TIMEOUT)
+    try:
+        if created:
+            connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            connection.executescript(SCHEMA)
+        yield connection
+    finally:
+        connection.close()
+
+
+def setup(root: str, env: dict) -> str:
+    """Pass durations of previous runs to the scheduler plugin.
+
+    Returns:
+        pytest option to load the plugin
+    """
+    baw.utils.plugins(env)
+    env[DURATIONS] = export(root)
+    env[REPORT] = path_report(root)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(env[REPORT])
+    return f'-p {PLUGIN} '
+
+
+def export(root: str) -> str:
+    """Write known durations to json file which is read by the plugin."""
+    path = path_export(root)
+    known = {}
+    if os.path.exists(path_store(root)):
+        with connect(root) as connection:
+            known = dict(
+                connection.execute('SELECT nodeid, duration FROM durations'))
+    baw.utils.file_replace(path, json.dumps(known))
+    return path
+
+
+def update(
+    root: str,
+    mode: str = None,
+    wall: float = None,
+    workers: int = None,
+) -> int:
+    """Merge durations of last run into the store.
+
+    Args:
+        root(str): project root
+        mode(str): record tests of a complete `fast`, `long`, ... run
+        wall(float): wall time of run in secs
+        workers(int): number of xdist workers
+    Returns:
+        number of measured tests
+    """
+    path = path_report(root)
+    if not os.path.exists(path):
+        return 0
+    try:
+        measured = json.loads(utilo.file_read(path))
+    except ValueError:
+        return 0
+    now = time.time()
+    with connect(root) as connection:
+        with connection:
+            known = dict(
+                connection.execute('SELECT nodeid, duration FROM durations'))
+            connection.executemany(
+                'INSERT INTO durations VALUES (?, ?, 1, ?) '
+                'ON CONFLICT(nodeid) DO UPDATE SET '
+                'duration = excluded.duration, runs = runs + 1, '
+                'updated = excluded.updated',
+                [(nodeid, smooth(known.get(nodeid), duration), now)
+                 for nodeid, duration in measured.items()],
+            )
+            if mode and measured:
+                connection.execute(
+                    'INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)',
+                    (mode, json.dumps(sorted(measured)), wall, workers, now),
+                )
+    return len(measured)
+
+
+def smooth(previous: float, current: float) -> float:
+    """\
+    >>> smooth(None, 2.0), smooth(1.0, 3.0)
+    (2.0, 2.0)
+    """
+    if previous is None:
+        return current
+    return WEIGHT * current + (1 - WEIGHT) * previous
+
+
+def predict(root: str, mode: str, workers: int) -> float | None:
+    """Predict wall time of next `mode` run in secs, None if unknown."""
+    if not os.path.exists(path_store(root)):
+        return None
+    with connect(root) as connection:
+        row = connection.execute(
+            'SELECT nodeids FROM runs WHERE mode = ?',
+            (mode,),
+        ).fetchone()
+        if row is None:
+            return None
+        known = dict(
+            connection.execute('SELECT nodeid, duration FROM durations'))
+    durations = [known.get(item, 0.0) for item in json.loads(row[0])]
+    return schedule(durations, workers)
+
+
+def schedule(durations: list, workers: int) -> float:
+    """Simulate longest-processing-time-first schedule, return makespan.
+
+    >>> schedule([3.0, 3.0, 2.0, 2.0, 2.0], 2)
+    7.0
+    >>> schedule([1.0, 2.0], 1)
+    3.0
+    """
+    loads = [0.0] * max(1, workers)
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
@@ -0,0 +1,225 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Select tests which are affected by changes since a base ref.
+
+A module graph of static imports of project sources and tests is stored
+in the baw tmp dir and only changed files are parsed again. Every test
+module and doctest module which imports a changed module, directly or
+transitively, is selected.
+"""
+
+import ast
+import json
+import os
+
+import utilo
+
+import baw.config
+import baw.runtime
+import baw.utils
+
+# changes of these files require to run all tests
+GLOBAL = ('conftest.py', 'pyproject.toml', 'setup.py', '.baw')
+
+
+def select(root: str, base: str = 'HEAD') -> list | None:
+    """Determine test and doctest modules affected by changes since `base`.
+
+    Returns:
+        sorted paths relative to root, None to run all tests
+    """
+    changed = changed_files(root, base)
+    if changed is None:
+        return None
+    changed = relevant(root, changed)
+    if changed is None:
+        return None
+    return affected(root, changed)
+
+
+def relevant(root: str, changed: list) -> list | None:
+    """Filter changed python files of sources and tests.
+
+    Returns:
+        changed python files, None if a change requires to run all tests
+    """
+    folders = tuple(f'{item}/' for item in folder(root))
+    result = []
+    for path in changed:
+        if os.path.basename(path) in GLOBAL:
+            baw.log(f'test changed: {path} changed, run all tests')
+            return None
+        if not path.startswith(folders):
+            # docs, readme and other files without effect on tests
+            continue
+        if not path.endswith('.py'):
+            baw.log(f'test changed: resource {path} changed, run all tests')
+            return None
+        result.append(path)
+    return result
+
+
+def affected(root: str, changed: list) -> list:
+    """Select test modules and doctest modules which import `changed`."""
+    names = modules(root)
+    paths = {path: name for name, path in names.items()}
+    todo = {paths.get(path, modulename(path)) for path in changed}
+    selected = dependents(graph(root, names), todo)
+    result = [
+        names[item]
+        for item in selected
+        if item in names and (istest(names[item]) or not intests(names[item]))
+    ]
+    return sorted(result)
+
+
+def changed_files(root: str, base: str) -> list | None:
+    """Files changed since `base`, including not committed and untracked
+    files. None if git fails."""
+    result = []
+    for cmd in (
+            f'git diff --name-only --no-renames {base} --',
+            'git ls-files --others --exclude-standard',
+    ):
+        completed = baw.runtime.run(cmd, cwd=root)
+        if completed.returncode:
+            baw.error(f'test changed: {cmd}\n{completed.stderr}')
+            return None
+        result.extend(completed.stdout.split())
+    return result
+
+
+def folder(root: str) -> list:
+    result = list(baw.config.sources(root))
+    if os.path.exists(utilo.join(root, 'tests')):
+        result.append('tests')
+    return result
+
+
+def modules(root: str) -> dict:
+    """Map dotted module name to path relative to `root`."""
+    result = {}
+    for item in folder(root):
+        for path in utilo.file_list(
+                utilo.join(root, item),
+                include=['py'],
+                absolute=True,
+        ):
+            relative = baw.utils.forward_slash(os.path.relpath(path, root))
+            result[modulename(relative)] = relative
+    return result
+
+
+def modulename(path: str) -> str:
+    """\
+    >>> modulename('baw/cmd/__init__.py'), modulename('tests/test_a.py')
+    ('baw.cmd', 'tests.test_a')
+    """
+    result = path.removesuffix('.py').replace('/', '.')
+    return result.removesuffix('.__init__')
+
+
+def graph(root: str, names: dict) -> dict:
+    """Map module name to imported module names of project.
+
+    Parsed imports are stored with modification time and size of the
+    parsed file to parse changed files only.
+    """
+    path = utilo.join(baw.utils.tmp(root), 'impact.json')
+    stored = {}
+    if os.path.exists(path):
+        try:
+            stored = json.loads(utilo.file_read(path))
+        except ValueError:
+            stored = {}
+    packages = {item.split('.')[0] for item in names}
+    current = {}
+    for name, relative in names.items():
+        stat = os.stat(utilo.join(root, relative))
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        known = stored.get(relative)
+        if known and known['stamp'] == stamp:
+            current[relative] = known
+            continue
+        imported = imports(
+            utilo.join(root, relative),
+            name,
+            relative.endswith('__init__.py'),
+            packages,
+        )
+        current[relative] = {'stamp': stamp, 'imports': imported}
+    if current != stored:
+        baw.utils.file_replace(path, json.dumps(current))
+    return {
+        name: current[relative]['imports'] for name, relative in names.items()
+    }
+
+
+def imports(path: str, name: str, package: bool, packages: set) -> list:
+    """Collect imported modules of `packages` including parent packages."""
+    try:
+        parsed = ast.parse(utilo.file_read(path))
+    except (SyntaxError, ValueError):
+        return []
+    result = set()
+    for node in ast.walk(parsed):
+        if isinstance(node, ast.Import):
+            result.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parent = name if package else name.rpartition('.')[0]
+                for _ in range(node.level - 1):
+                    parent = parent.rpartition('.')[0]
+                base = f'{parent}.{base}' if base else parent
+            result.add(base)
+            result.update(f'{base}.{alias.name}' for alias in node.names)
+    # importing a.b.c also runs a and a.b
+    for item in list(result):
+        while '.' in item:
+            item = item.rpartition('.')[0]
+            result.add(item)
+    return sorted(item for item in result if item.split('.')[0] in packages)
+
+
+def dependents(imported: dict, changed: set) -> set:
+    """Modules in `changed` and all modules which import them.
+
+    >>> sorted(dependents({'a': ['b'], 'b': ['c'], 'd': []}, {'c'}))
+    ['a', 'b', 'c']
+    """
+    reverse = {}
+    for module, required in imported.items():
+        for item in required:
+            reverse.setdefault(item, set()).add(module)
+    result = set(changed)
+    todo = list(changed)
+    while todo:
+        current = todo.pop()
+        for item in reverse.get(current, ()):
+            if item in result:
+                continue
+            result.add(item)
+            todo.append(item)
+    return result
+
+
+def intests(path: str) -> bool:
+    return path.startswith('tests/')
+
+
+def istest(path: str) -> bool:
+    """\
+    >>> istest('tests/test_me.py'), istest('tests/fixtures/project.py')
+    (True, False)
+    """
+    name = os.path.basename(path)
+    if not intests(path):
+        return False
+    return name.startswith('test_') or name.endswith('_test.py')
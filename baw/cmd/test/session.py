@@ -0,0 +1,109 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Prepare the files of a test session once.
+
+The rendered pytest.ini is only written if the template or the written
+file changed since the last run, the stamps of both are kept in the baw
+tmp dir. Test dirs of previous runs, see `--basetemp`, are pruned to the
+most recent ones. The pytest cache dir stays the same for all runs to
+reuse last failed tests and the collection cache.
+"""
+
+import contextlib
+import json
+import os
+import re
+import shutil
+import time
+
+import utilo
+
+import baw.datetime
+import baw.utils
+
+TEMPLATE = 'baw/templates/pytest.pini'
+
+# number of test dirs of previous runs to keep
+KEEP = 3
+
+# do not remove test dirs of runs which may still run, in secs
+GRACE = 600.0
+
+TESTDIR = re.compile(r'test_\d{2}_\d{2}_\d{2}')
+
+
+def config(root: str) -> str:
+    """Render pytest.ini into `root` if template or file changed.
+
+    Returns:
+        path to pytest.ini
+    """
+    # using ROOT to get location from baw-tool
+    template = utilo.join(baw.ROOT, TEMPLATE)
+    assert os.path.exists(template), f'no testconfig available {template}'
+    path = utilo.join(root, 'pytest.ini')
+    statefile = utilo.join(baw.utils.tmp(root), 'pytest.ini.json')
+    state = baw.utils.load_json(statefile)
+    current = {'template': stamp(template), 'config': stamp(path)}
+    if state.get('template') == current['template']:
+        if state.get('config') == current['config']:
+            return path
+    # writes only if content differs, keeps stamp of unchanged file
+    baw.utils.file_replace(path, content=utilo.file_read(template))
+    current['config'] = stamp(path)
+    baw.utils.file_replace(statefile, json.dumps(current))
+    return path
+
+
+def stamp(path: str) -> list | None:
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [current.st_mtime_ns, current.st_size]
+
+
+def prepare_testdir(root: str) -> tuple:
+    """Determine fresh test dir and shared cache dir, prune old test dirs.
+
+    Returns:
+        (test dir of this run, pytest cache dir)
+    """
+    tmpdir = baw.utils.tmp(root)
+    testtime = baw.datetime.current(seconds=True, separator='_')
+    os.makedirs(utilo.join(tmpdir, 'log'), exist_ok=True)
+    path = utilo.join(tmpdir, f'test_{testtime}')
+    if os.path.exists(path):
+        # remove test folder if exists
+        shutil.rmtree(path)
+    prune(tmpdir)
+    cachedir = utilo.join(tmpdir, 'pytest_cache')
+    return path, cachedir
+
+
+def prune(tmpdir: str, keep: int = KEEP, grace: float = GRACE) -> list:
+    """Remove test dirs of previous runs except the `keep` most recent.
+
+    Returns:
+        removed dirs
+    """
+    with os.scandir(tmpdir) as entries:
+        found = [(entry.stat().st_mtime, entry.path)
+                 for entry in entries
+                 if entry.is_dir() and TESTDIR.fullmatch(entry.name)]
+    found.sort(reverse=True)
+    now = time.time()
+    removed = []
+    for modified, path in found[keep:]:
+        if now - modified < grace:
+            continue
+        with contextlib.suppress(OSError):
+            shutil.rmtree(path)
+            removed.append(path)
+    return removed
@@ -0,0 +1,239 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Split one test run across machines.
+
+`baw test nightly --shard 3/8` runs the third of eight parts of the
+collected tests. The `bawschedule` plugin partitions the test ids by
+their recorded durations, every shard writes junit, coverage data and
+measured durations into the shard dir. `baw test merge` combines the
+files of all shards into one report and verdict.
+
+All shards must partition with the same durations, otherwise tests are
+skipped or run twice. Therefore the local durations of the machine are
+not used, pass the `durations.json` written by the last merge via
+`--shard_durations` to balance the next run. Without durations every
+shard runs the same number of tests.
+"""
+
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import xml.etree.ElementTree as ET  # nosec
+
+import utilo
+
+import baw.cmd.test.durations
+import baw.config
+import baw.utils
+
+# see baw/plugins/bawschedule.py
+SHARD = 'BAW_SHARD'
+DURATIONS = 'BAW_SHARD_DURATIONS'
+
+TAG = re.compile(r'(?P<index>\d+)of(?P<count>\d+)')
+
+
+def parse(selected: str) -> tuple | None:
+    """Parse `index/count` of shard, index starts with 1.
+
+    >>> parse('3/8')
+    (3, 8)
+    >>> parse('9/8'), parse('0/1'), parse('abc')
+    (None, None, None)
+    """
+    matched = re.fullmatch(r'(\d+)/(\d+)', selected.strip())
+    if not matched:
+        return None
+    index, count = int(matched[1]), int(matched[2])
+    if not 1 <= index <= count:
+        return None
+    return index, count
+
+
+def shardir(root: str) -> str:
+    result = utilo.join(baw.utils.tmp(root), 'shards')
+    os.makedirs(result, exist_ok=True)
+    return result
+
+
+def tag(index: int, count: int) -> str:
+    """\
+    >>> tag(3, 8)
+    '3of8'
+    """
+    return f'{index}of{count}'
+
+
+def setup(
+    root: str,
+    env: dict,
+    index: int,
+    count: int,
+    durations: str = None,
+) -> str:
+    """Select shard in plugin and redirect coverage data of shard.
+
+    Args:
+        root(str): project root
+        env(dict): environment of test run
+        index(int): selected shard, starts with 1
+        count(int): number of shards
+        durations(str): json file of durations which is shared by shards
+    Returns:
+        pytest option to write junit report of shard
+    """
+    env[SHARD] = f'{index}/{count}'
+    if durations:
+        env[DURATIONS] = os.path.abspath(durations)
+    current = tag(index, count)
+    env['COVERAGE_FILE'] = utilo.join(shardir(root), f'.coverage.{current}')
+    baw.log(f'test: run shard {index} of {count}')
+    return f'--junit-xml={utilo.join(shardir(root), f"junit-{current}.xml")} '
+
+
+def collect(root: str, index: int, count: int):
+    """Keep measured durations of shard for merging."""
+    report = baw.cmd.test.durations.path_report(root)
+    if not os.path.exists(report):
+        return
+    path = f'durations-{tag(index, count)}.json'
+    shutil.copyfile(report, utilo.join(shardir(root), path))
+
+
+def merge(root: str, paths: list, output: str = None) -> int:
+    """Combine junit reports and coverage data of all shards.
+
+    Args:
+        root(str): project root
+        paths(list): shard files or dirs which contain shard files
+        output(str): path of merged junit report
+    Returns:
+        SUCCESS if all shards are available and passed
+    """
+    files = shardfiles(paths)
+    reports = sorted(
+        item for item in files
+        if re.fullmatch(r'junit-\d+of\d+\.xml', os.path.basename(item)))
+    if not reports:
+        baw.error(f'test merge: no shard reports in: {paths}')
+        return baw.FAILURE
+    output = output or utilo.join(shardir(root), 'junit.xml')
+    counted = merge_junit(reports, output)
+    result = baw.SUCCESS
+    missing = missing_shards(reports)
+    if missing:
+        baw.error(f'test merge: missing shards: {missing}')
+        result = baw.FAILURE
+    baw.log(f'test merge: {len(reports)} shards, {counted["tests"]} tests, '
+            f'{counted["failures"]} failures, {counted["errors"]} errors, '
+            f'{counted["skipped"]} skipped, report: {output}')
+    if counted['failures'] or counted['errors']:
+        result = baw.FAILURE
+    merge_durations(
+        [
+            item for item in files
+            if re.fullmatch(r'durations-\d+of\d+\.json', os.path.basename(item))
+        ],
+        utilo.join(os.path.dirname(output), 'durations.json'),
+    )
+    coverages = [
+        item for item in files
+        if re.fullmatch(r'\.coverage\.\d+of\d+', os.path.basename(item))
+    ]
+    if coverages and not merge_coverage(root, coverages):
+        result = baw.FAILURE
+    return result
+
+
+def shardfiles(paths: list) -> list:
+    """Collect files of `paths` including coverage data dot files."""
+    result = []
+    for path in paths:
+        if not os.path.isdir(path):
+            result.append(path)
+            continue
+        for current, _, names in os.walk(path):
+            result.extend(utilo.join(current, item) for item in names)
+    return sorted(result)
+
+
+def missing_shards(reports: list) -> list:
+    """\
+    >>> missing_shards(['a/junit-1of3.xml', 'b/junit-3of3.xml'])
+    ['2/3']
+    """
+    found = {}
+    for item in reports:
+        matched = TAG.search(os.path.basename(item))
+        index, count = int(matched['index']), int(matched['count'])
+        found.setdefault(count, set()).add(index)
+    return [
+        f'{index}/{count}' for count, indexes in sorted(found.items())
+        for index in range(1, count + 1) if index not in indexes
+    ]
+
+
+def merge_junit(reports: list, output: str) -> dict:
+    merged = ET.Element('testsuites')
+    counted = {'tests': 0, 'failures': 0, 'errors': 0, 'skipped': 0}
+    duration = 0.0
+    for report in reports:
+        parsed = ET.parse(report).getroot()  # nosec
+        for suite in parsed.iter('testsuite'):
+            for item in counted:
+                counted[item] += int(suite.get(item, 0))
+            duration += float(suite.get('time', 0))
+            merged.append(suite)
+    for key, value in counted.items():
+        merged.set(key, str(value))
+    merged.set('time', f'{duration:.3f}')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    ET.ElementTree(merged).write(output, encoding='utf-8', xml_declaration=True)
+    return counted
+
+
+def merge_durations(paths: list, output: str):
+    """Write measured durations of all shards to balance next run."""
+    if not paths:
+        return
+    merged = {}
+    for path in paths:
+        with contextlib.suppress(ValueError):
+            merged.update(json.loads(utilo.file_read(path)))
+    baw.utils.file_replace(output, json.dumps(merged, sort_keys=True))
+    baw.log(f'test merge: durations of next run: {output}')
+
+
+def merge_coverage(root: str, paths: list) -> bool:
+    """Combine coverage data and check required coverage of project."""
+    import coverage
+    config = utilo.join(baw.ROOT, 'baw/templates', '.coveragerc')
+    datafile = utilo.join(shardir(root), '.coverage')
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(datafile)
+    combined = coverage.Coverage(data_file=datafile, config_file=config)
+    combined.combine(paths, keep=True)
+    combined.save()
+    try:
+        total = combined.report(file=io.StringIO())
+    except coverage.exceptions.NoDataError:
+        baw.error('test merge: no coverage data')
+        return False
+    output = utilo.join(baw.utils.tmp(root), 'report')
+    combined.html_report(directory=output)
+    required = baw.config.coverage_min(root)
+    baw.log(f'test merge: coverage {total:.2f}%, required {required}%, '
+            f'report: {output}')
+    if total < required:
+        baw.error(f'test merge: coverage {total:.2f}% < {required}%')
+        return False
+    return True
@@ -0,0 +1,131 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Run tests on a warm server which keeps pytest and dependencies imported.
+
+`baw test --warm` passes the pytest args over a unix socket to the
+`bawwarm` server, see baw/plugins. The server forks a pre-imported
+process for every run, socket and fork handling are shared with
+`baw serve`, see bawserve. The server is started on first use and
+restarted if requirements or the interpreter changed. Forked runs do not
+start xdist workers, every xdist worker would import everything again.
+"""
+
+import contextlib
+import hashlib
+import os
+import shlex
+import subprocess
+import time
+
+import utilo
+
+import baw.cmd.info
+import baw.config
+import baw.utils
+from baw.plugins import bawserve
+
+# wait for server startup in secs
+STARTUP = 60.0
+
+
+def available() -> bool:
+    return bawserve.available()
+
+
+def socketpath(root: str) -> str:
+    return bawserve.socket_path(baw.utils.tmp(root), 'warm.sock')
+
+
+def key(root: str) -> str:
+    """Restart server if interpreter or requirements changed."""
+    python = baw.config.python(root)
+    return hashlib.sha256(
+        f'{python}:{baw.cmd.info.requirement_hash(root)}'.encode()).hexdigest()
+
+
+def pytest_args(cmd: str) -> list:
+    """Args of `python -m pytest` cmd.
+
+    >>> pytest_args('python -m pytest -c "a b/pytest.ini" -x')
+    ['-c', 'a b/pytest.ini', '-x']
+    """
+    splitted = shlex.split(cmd)
+    return splitted[splitted.index('pytest') + 1:]
+
+
+def run(root: str, cmd: str, env: dict) -> subprocess.CompletedProcess:
+    """Run pytest `cmd` on warm server, start server if required."""
+    request = {
+        'args': pytest_args(cmd),
+        'cwd': root,
+        'env': env,
+        'key': key(root),
+    }
+    for _ in range(2):
+        connection = connect(root) or start(root, request['key'], env)
+        if connection is None:
+            return subprocess.CompletedProcess(cmd, baw.FAILURE)
+        returncode = bawserve.call(connection, request)
+        if returncode is not None:
+            return subprocess.CompletedProcess(cmd, returncode)
+        baw.log('test: requirements changed, restart warm server')
+        wait_stopped(root)
+    return subprocess.CompletedProcess(cmd, baw.FAILURE)
+
+
+def connect(root: str):
+    return bawserve.connect(socketpath(root))
+
+
+def start(root: str, hashed: str, env: dict):
+    """Start warm server and connect to it."""
+    python = baw.config.python(root)
+    path = socketpath(root)
+    packages = ' '.join(
+        item.replace('/', '.') for item in baw.config.sources(root))
+    logfile = utilo.join(baw.utils.tmp(root), 'warm.log')
+    baw.log(f'test: start warm server, log: {logfile}')
+    with open(logfile, 'ab') as fp:
+        process = subprocess.Popen(  # nosec pylint:disable=R1732
+            f'{python} -m bawwarm {shlex.quote(path)} {hashed} {packages}',
+            cwd=root,
+            env=env,
+            shell=True,
+            stdout=fp,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    end = time.time() + STARTUP
+    while time.time() < end:
+        connection = connect(root)
+        if connection is not None:
+            return connection
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    baw.error(f'test: could not start warm server, see: {logfile}')
+    return None
+
+
+def stop(root: str) -> int:
+    connection = connect(root)
+    if connection is None:
+        baw.log('test: no warm server running')
+        return baw.SUCCESS
+    with contextlib.suppress(OSError):
+        bawserve.call(connection, {'cmd': 'stop'})
+    wait_stopped(root)
+    baw.log('test: warm server stopped')
+    return baw.SUCCESS
+
+
+def wait_stopped(root: str, timeout: float = 5.0):
+    end = time.time() + timeout
+    while os.path.exists(socketpath(root)) and time.time() < end:
+        time.sleep(0.05)
@@ -0,0 +1,229 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Run affected tests whenever sources or tests change.
+
+`baw test --watch` watches the source folders and tests with inotify on
+linux and polls modification times elsewhere. A burst of saves is
+collected till nothing changed for DEBOUNCE secs. The changed files are
+mapped to affected tests with the import graph of `baw.cmd.test.impact`
+and only these tests run again.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+import utilo
+
+import baw.cmd.test.impact
+import baw.utils
+
+# wait for further changes of a burst of saves in secs
+DEBOUNCE = 0.3
+
+# poll interval of fallback watcher in secs
+POLL = 0.5
+
+# see inotify(7)
+IN_MODIFY = 0x002
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOSE_WRITE = 0x008
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM |
+        IN_MOVED_TO)
+EVENT = struct.Struct('iIII')
+
+
+def ignored(path: str) -> bool:
+    """Skip caches, hidden and temporary files of editors.
+
+    >>> ignored('a/__pycache__/b.pyc'), ignored('a/.b.py.swp'), ignored('a/b.py')
+    (True, True, False)
+    """
+    name = os.path.basename(path)
+    if '__pycache__' in path or name.endswith(('.pyc', '~')):
+        return True
+    return name.startswith('.')
+
+
+class Inotify:
+    """Watch folders recursively with linux inotify."""
+
+    def __init__(self, folders: list):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+        for folder in folders:
+            self.add(folder)
+
+    def add(self, folder: str) -> set:
+        """Watch `folder` recursively, return contained files."""
+        result = set()
+        for current, dirs, files in os.walk(folder):
+            dirs[:] = [item for item in dirs if not ignored(item)]
+            descriptor = self.libc.inotify_add_watch(
+                self.fd,
+                os.fsencode(current),
+                MASK,
+            )
+            if descriptor >= 0:
+                self.watches[descriptor] = current
+            result.update(utilo.join(current, item) for item in files)
+        return {item for item in result if not ignored(item)}
+
+    def changes(self, timeout: float = None) -> set:
+        """Wait `timeout` secs for changes, None to wait till a change."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+        result = set()
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            folder = self.watches.get(descriptor)
+            if folder is None or not name:
+                continue
+            path = utilo.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not ignored(path):
+                    # files created before the watch was added
+                    result |= self.add(path)
+                continue
+            if not ignored(path):
+                result.add(path)
+        return result
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Poller:
+    """Detect changes by comparing modification times."""
+
+    def __init__(self, folders: list):
+        self.folders = folders
+        self.stamps = self.scan()
+
+    def scan(self) -> dict:
+        result = {}
+        for folder in self.folders:
+            for current, dirs, files in os.walk(folder):
+                dirs[:] = [item for item in dirs if not ignored(item)]
+                for name in files:
+                    path = utilo.join(current, name)
+                    if ignored(path):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    result[path] = (stat.st_mtime_ns, stat.st_size)
+        return result
+
+    def changes(self, timeout: float = None) -> set:
+        end = None if timeout is None else time.time() + timeout
+        while True:
+            current = self.scan()
+            result = {
+                path for path in current.keys() | self.stamps.keys()
+                if current.get(path) != self.stamps.get(path)
+            }
+            self.stamps = current
+            if result or (end is not None and time.time() >= end):
+                return result
+            time.sleep(POLL if end is None else min(POLL, timeout))
+
+    def close(self):
+        pass
+
+
+def watcher(folders: list):
+    if sys.platform.startswith('linux'):
+        try:
+            return Inotify(folders)
+        except (AttributeError, OSError) as error:
+            baw.log(f'test watch: no inotify: {error}, poll')
+    return Poller(folders)
+
+
+def collect(watching, debounce: float = DEBOUNCE) -> set:
+    """Wait for changes and collect following changes of the same burst."""
+    result = set()
+    while not result:
+        result = watching.changes()
+    while more := watching.changes(debounce):
+        result |= more
+    return result
+
+
+def watch(root: str, runner) -> int:
+    """Run affected tests on changes till ctrl+c.
+
+    Args:
+        root(str): project root
+        runner(callable): run tests, gets selected tests or None for all
+    Returns:
+        returncode of last test run
+    """
+    folders = [
+        utilo.join(root, item) for item in baw.cmd.test.impact.folder(root)
+    ]
+    watching = watcher(folders)
+    baw.log(f'test watch: watching {", ".join(folders)}, ctrl+c to stop')
+    returncode = baw.SUCCESS
+    try:
+        while True:
+            changed = collect(watching)
+            relative = sorted(
+                baw.utils.forward_slash(os.path.relpath(item, root))
+                for item in changed)
+            relevant = baw.cmd.test.impact.relevant(root, relative)
+            if relevant == []:
+                continue
+            selected = None
+            if relevant is not None:
+                selected = baw.cmd.test.impact.affected(root, relevant)
+                if not selected:
+                    continue
+            start = time.time()
+            returncode = runner(selected)
+            summary(relative, selected, returncode, time.time() - start)
+    except KeyboardInterrupt:
+        baw.log('test watch: stopped')
+    finally:
+        watching.close()
+    return returncode
+
+
+def summary(changed: list, selected: list, returncode: int, duration: float):
+    modules = 'all tests' if selected is None else f'{len(selected)} modules'
+    state = 'FAILED' if returncode else 'passed'
+    message = (f'test watch: {state}: {modules} in {duration:.1f} secs '
+               f'after change of {", ".join(changed)}')
+    if returncode:
+        baw.error(message)
+    else:
+        baw.log(message)
@@ -19,6 +19,7 @@ import baw.cmd.sync
 import baw.cmd.utils
 import baw.config
 import baw.gix
+import baw.parallel
 import baw.requirements
 import baw.requirements.check
 import baw.requirements.parser
@@ -320,7 +321,10 @@ def collect_new_packages(  # pylint:disable=R0914
     verbose=False,
 ) -> bool:
     sync_error = False
-    worker = baw.config.pip_parallel_worker(root)
+    worker = min(
+        baw.config.pip_parallel_worker(root),
+        baw.parallel.workers(),
+    )
     with concurrent.futures.ThreadPoolExecutor(max_workers=worker) as executor:
         todo = {
             executor.submit(
@@ -11,10 +11,6 @@ import contextlib
 import os
 import sys
 
-import docker
-
-import baw.cmd.image
-import baw.dockers.container
 import baw.run
 import baw.utils
 
@@ -24,6 +20,7 @@ BASE_URL = 'unix:///var/run/docker.sock'
 
 @contextlib.contextmanager
 def client():
+    import docker
     result = docker.DockerClient(base_url=BASE_URL)
     yield result
     result.close()
@@ -34,6 +31,13 @@ def switch_docker():
     dockerx, dockenx = docker_docken(sys.argv)
     if not dockerx and not dockenx:
         return baw.run.run_main()
+    return run_docker(dockenx)
+
+
+def run_docker(dockenx: bool):
+    # docker is only required when running inside a container
+    import baw.cmd.image  # pylint:disable=W0621
+    import baw.dockers.container  # pylint:disable=W0621
     root = os.getcwd()
     image = baw.cmd.image.tag(
         root,
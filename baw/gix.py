@@ -7,22 +7,29 @@
 # be prosecuted under federal law. Its content is company confidential.
 # =============================================================================
 
+import atexit
 import contextlib
 import functools
 import os
 import subprocess
 import sys
+import threading
 
-import git
 import utilo
 
 import baw
 import baw.config
+import baw.parallel
+import baw.resources
 import baw.runtime
+import baw.utils
 
 GIT_EXT = '.git'
 GIT_REPO_EXCLUDE = '.git/info/exclude'
 
+# files inside git dir which change on commit, checkout, tag and stash
+STAMPED = ('HEAD', 'logs/HEAD', 'packed-refs', 'refs/tags', 'refs/stash')
+
 
 def init(root: str):
     """Init git repository. Do nothing if repo already exists.
@@ -89,6 +96,7 @@ def git_commit(
         f'git commit {source} -m {message}',
         verbose=verbose,
     )
+    invalidate(root)
     if process.returncode:
         baw.completed(process)
         return process.returncode
@@ -99,6 +107,7 @@ def git_commit(
             f'git tag -a {tag} -m {message}',
             verbose=verbose,
         )
+        invalidate(root)
         if process.returncode:
             baw.completed(process)
             sys.exit(baw.FAILURE)
@@ -107,13 +116,39 @@ def git_commit(
 
 def is_clean(root, verbose: int = 4):
     update_gitignore(root, verbose=verbose)
-    process = baw.runtime.run_target(
-        root,
-        'git status',
-        verbose=verbose,
-    )
-    assert not process.returncode
-    return 'nothing to commit, working tree clean' in process.stdout
+    changed = has_changes(root, verbose=verbose)
+    assert changed is not None, f'git status failed: {root}'
+    return not changed
+
+
+def has_changes(root: str, verbose: int = 0) -> bool | None:
+    """Check for modified, staged or untracked files.
+
+    Stop git after the first reported entry instead of waiting for the
+    complete status of large trees. The porcelain format does not depend
+    on the locale of the user.
+
+    Returns:
+        True if something changed, None if git failed
+    """
+    cmd = 'git status --porcelain=v2 -z --untracked-files=normal'
+    if verbose:
+        baw.log(cmd)
+    with baw.parallel.slot():
+        with subprocess.Popen(  # nosec
+                cmd.split(),
+                cwd=root,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+        ) as process:
+            if process.stdout.read(1):
+                process.kill()
+                return True
+            _, stderr = process.communicate()
+    if process.returncode:
+        baw.error(stderr.decode(baw.utils.UTF8, errors='ignore').strip())
+        return None
+    return False
 
 
 def is_release(root) -> bool:
@@ -167,6 +202,7 @@ def reset(
         cmd=f'git checkout -q {to_reset}',
         verbose=verbose,
     )
+    invalidate(root)
     if completed.returncode:
         msg = f'while checkout out {to_reset}\n{completed}'
         baw.error(msg)
@@ -187,6 +223,7 @@ def checkout(
     """
     cmd = f'git checkout {branch}'
     completed = baw.runtime.run(cmd, cwd=root)
+    invalidate(root)
     if completed.returncode:
         msg = f'while checkout {branch}'
         baw.error(msg)
@@ -194,6 +231,7 @@ def checkout(
 
 
 def push(root: str) -> int:
+    import git  # GitPython is expensive to import, load on demand
     server = tokenizes(root)
     repo = git.Repo(
         root,
@@ -220,6 +258,7 @@ def tag_drop(
         cmd=f'git tag -d {tag}',
         verbose=verbose,
     )
+    invalidate(root)
     if completed.returncode:
         baw.error(f'while remove tag: {completed}')
         return False
@@ -254,6 +293,7 @@ def git_stash(
         cmd,
         verbose=verbose,
     )
+    invalidate(root)
     if completed.returncode:
         baw.completed(completed)
         # Stashing an repository with no commit, produces an error
@@ -288,6 +328,7 @@ def stash_pop(root: str, verbose: int = 0) -> int:
         cmd,
         verbose=verbose,
     )
+    invalidate(root)
     if completed.returncode:
         baw.error(completed.stderr)
     return completed.returncode
@@ -298,52 +339,34 @@ def headtag(root: str, verbose: int = 0):
 
     Return None if no Tag is given.
     """
-    cmd = 'git tag --points-at HEAD'
-    completed = baw.runtime.run_target(
-        root,
-        cmd,
-        root,
-        # ignore error when collecting head on empty repository
-        skip_error_code={129},
-        skip_error_message=["error: malformed object name 'HEAD'"],
-        verbose=verbose,
-    )
+    if verbose:
+        baw.log('git tag --points-at HEAD')
+    tags = session(root).headtags()
     # could not collect any git tag of current head
-    if completed.returncode:
+    if tags is None:
         return None
-    return completed.stdout.strip()
+    return '\n'.join(tags)
 
 
 def headhash(root: str) -> str | None:
     if not installed():
         return None
-    cmd = 'git rev-parse --verify HEAD'
-    completed = baw.runtime.run_target(root, cmd, verbose=False)
-    if completed.returncode:
-        return None
-    return completed.stdout.strip()
+    return session(root).head()
 
 
 def is_modified(root: str) -> bool:
     update_gitignore(root)
-    cmd = 'git status -z'
-    completed = baw.runtime.run_target(
-        root,
-        cmd,
-        verbose=False,
-    )
-    if completed.returncode:
+    changed = has_changes(root)
+    if changed is None:
         return True
-    if completed.stdout.strip():
-        return True
-    return False
+    return changed
 
 
 def describe(root: str) -> str:
     if not installed():
         baw.error('install git')
         sys.exit(baw.FAILURE)
-    completed = baw.runtime.run('git describe', cwd=root)
+    completed = session(root).run('git describe')
     if completed.returncode:
         baw.completed(completed)
         sys.exit(baw.FAILURE)
@@ -360,7 +383,9 @@ def branchname(root: str) -> str:
     if not installed():
         baw.error('install git')
         sys.exit(baw.FAILURE)
-    completed = baw.runtime.run('git branch', cwd=root)
+    if name := session(root).branch():
+        return name
+    completed = session(root).run('git branch')
     if completed.returncode:
         baw.exitx(completed)
     branches = completed.stdout.strip()
@@ -377,13 +402,25 @@ def update_gitignore(root: str, verbose: int = 0):
     if not os.path.exists(exclude):
         baw.log(f'no git dir: {exclude}, skip update')
         return baw.SUCCESS
-    baw.file_replace(
-        exclude,
-        baw.resources.GITIGNORE,
-    )
+    content = baw.resources.GITIGNORE
+    expected = (baw.utils.binhash(content), filestamp(exclude))
+    if SYNCED.get(exclude) == expected:
+        # neither template nor exclude file changed since last sync
+        return baw.SUCCESS
+    baw.file_replace(exclude, content)
+    SYNCED[exclude] = (expected[0], filestamp(exclude))
     return baw.SUCCESS
 
 
+# exclude file -> (hash of template, stamp of synced file)
+SYNCED = {}
+
+
+def filestamp(path: str) -> tuple:
+    current = os.stat(path)
+    return current.st_mtime_ns, current.st_size
+
+
 def tokenizes(root: str, token: str = None) -> str:
     """\
     >>> tokenizes(baw.project.determine_root(__file__), 'UNSET')
@@ -424,7 +461,7 @@ def installed() -> bool:
     """
     try:
         process = subprocess.run(  # nosec
-            ['git', 'help'],
+            ['git', '--version'],
             capture_output=True,
             check=False,
         )
@@ -434,12 +471,26 @@ def installed() -> bool:
         root = os.getcwd()
         # ensure that git work inside docker properly. If git user is other
         # than repo owner, git does not work properly without this patch.
-        cmd = f'git config --local --add safe.directory "{root}"'
-        baw.runtime.run(cmd, cwd=root)
+        if not safe_directory(root):
+            cmd = f'git config --local --add safe.directory "{root}"'
+            baw.runtime.run(cmd, cwd=root)
         return True
     return False
 
 
+def safe_directory(root: str) -> bool:
+    """Check if `root` is already added to local safe.directory or if
+    `root` is no git repository at all."""
+    gitdir = find_gitdir(root)
+    if gitdir is None:
+        return False
+    config = utilo.join(gitdir, 'config')
+    if not os.path.exists(config):
+        return False
+    content = utilo.file_read(config)
+    return f'directory = {root}\n' in content
+
+
 def ensure_git(error: str = None):
     if baw.runtime.hasprog('git'):
         return
@@ -448,3 +499,231 @@ def ensure_git(error: str = None):
     else:
         baw.error('git is not installed')
     sys.exit(baw.FAILURE)
+
+
+class GitSession:
+    """Answer git queries of one repository with a single long living
+    `git cat-file --batch-check` process.
+
+    Results are memoized till a commit, checkout, tag or stash changes
+    the refs of the repository. Changes made by other processes are
+    detected by the modification time of the refs.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.gitdir = find_gitdir(root)
+        self.pid = os.getpid()
+        self.process = None
+        self.memo = {}
+        self.stamped = None
+        self.lock = threading.RLock()
+
+    def head(self) -> str | None:
+        """Hash of HEAD, same as `git rev-parse --verify HEAD`."""
+        return self.memoized('head', lambda: self.resolve('HEAD'))
+
+    def branch(self) -> str | None:
+        """Name of current branch, None if HEAD is detached."""
+
+        def compute():
+            if self.gitdir is None:
+                return None
+            path = utilo.join(self.gitdir, 'HEAD')
+            if not os.path.exists(path):
+                return None
+            head = utilo.file_read(path).strip()
+            if not head.startswith('ref: refs/heads/'):
+                return None
+            return head.removeprefix('ref: refs/heads/')
+
+        return self.memoized('branch', compute)
+
+    def headtags(self) -> list | None:
+        """Sorted tags which point at HEAD, None on empty repository."""
+
+        def compute():
+            head = self.head()
+            if head is None:
+                return None
+            result = [
+                name for name, peeled in self.tags().items() if peeled == head
+            ]
+            return sorted(result)
+
+        return self.memoized('headtags', compute)
+
+    def tags(self) -> dict:
+        """Map tag name to hash of tagged commit."""
+
+        def compute():
+            result = {}
+            for tag, (_, commit) in packed_tags(self.gitdir).items():
+                result[tag] = commit
+            tagdir = utilo.join(self.gitdir, 'refs/tags')
+            for path in loose_refs(tagdir):
+                tag = os.path.relpath(path, tagdir).replace(os.sep, '/')
+                result[tag] = None
+            for tag, value in result.items():
+                if value is None:
+                    result[tag] = self.resolve(f'refs/tags/{tag}^{{commit}}')
+            return result
+
+        return self.memoized('tags', compute)
+
+    def run(self, cmd: str) -> subprocess.CompletedProcess:
+        """Run git `cmd` which only reads refs and memoize the result."""
+        return self.memoized(
+            cmd,
+            lambda: baw.runtime.run(cmd, cwd=self.root),
+        )
+
+    def resolve(self, rev: str) -> str | None:
+        """Resolve `rev` to object hash, None if `rev` does not exist."""
+        with self.lock:
+            process = self.batch()
+            if process is None:
+                return None
+            try:
+                process.stdin.write(f'{rev}\n')
+                process.stdin.flush()
+                answer = process.stdout.readline().split()
+            except OSError:
+                self.close()
+                return None
+        # <hash> <type> <size> or <rev> missing
+        if len(answer) != 3:
+            return None
+        return answer[0]
+
+    def batch(self):
+        if self.gitdir is None:
+            return None
+        if self.process is None or self.process.poll() is not None:
+            # pylint:disable=R1732
+            self.process = subprocess.Popen(  # nosec
+                ['git', 'cat-file', '--batch-check'],
+                cwd=self.root,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                encoding=baw.utils.UTF8,
+                bufsize=1,
+            )
+        return self.process
+
+    def memoized(self, key: str, compute):
+        with self.lock:
+            stamp = self.stamp()
+            if stamp != self.stamped:
+                self.invalidate()
+                self.stamped = stamp
+            if key not in self.memo:
+                self.memo[key] = compute()
+            return self.memo[key]
+
+    def stamp(self) -> tuple:
+        if self.gitdir is None:
+            return ()
+        result = []
+        for item in STAMPED:
+            try:
+                result.append(
+                    os.stat(utilo.join(self.gitdir, item)).st_mtime_ns)
+            except FileNotFoundError:
+                result.append(None)
+        return tuple(result)
+
+    def invalidate(self):
+        with self.lock:
+            self.memo.clear()
+            self.stamped = None
+            # cat-file may cache packed refs
+            self.close()
+
+    def close(self):
+        if self.process is None:
+            return
+        with contextlib.suppress(OSError):
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        self.process = None
+
+
+SESSIONS = {}
+
+
+def session(root: str) -> GitSession:
+    """Shared git session of `root`, create one per process."""
+    key = os.path.abspath(root)
+    current = SESSIONS.get(key)
+    if current is None or current.pid != os.getpid():
+        # forked process must not share the pipe of its parent
+        current = SESSIONS[key] = GitSession(key)
+    return current
+
+
+def invalidate(root: str):
+    session(root).invalidate()
+
+
+@atexit.register
+def close_sessions():
+    for item in SESSIONS.values():
+        if item.pid == os.getpid():
+            item.close()
+
+
+def find_gitdir(root: str) -> str | None:
+    """Locate git dir of `root` or of one of its parents.
+
+    >>> find_gitdir(baw.ROOT).endswith('.git')
+    True
+    """
+    current = os.path.abspath(root)
+    while True:
+        path = os.path.join(current, GIT_EXT)
+        if os.path.isdir(path):
+            return baw.utils.forward_slash(path)
+        if os.path.isfile(path):
+            # worktree or submodule: gitdir: <path>
+            content = utilo.file_read(path).strip()
+            if content.startswith('gitdir:'):
+                gitdir = content.removeprefix('gitdir:').strip()
+                gitdir = os.path.join(current, gitdir)
+                return baw.utils.forward_slash(os.path.normpath(gitdir))
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def packed_tags(gitdir: str) -> dict:
+    """Parse tags of packed-refs: name -> (hash, peeled commit or None)."""
+    path = utilo.join(gitdir, 'packed-refs')
+    if not os.path.exists(path):
+        return {}
+    content = utilo.file_read(path)
+    result = {}
+    last = None
+    for line in content.splitlines():
+        if line.startswith('^') and last:
+            # peeled commit of annotated tag in line before
+            result[last] = (result[last][0], line[1:].strip())
+            continue
+        last = None
+        if line.startswith('#') or ' ' not in line:
+            continue
+        hashed, ref = line.split(' ', 1)
+        if not ref.startswith('refs/tags/'):
+            continue
+        last = ref.removeprefix('refs/tags/')
+        result[last] = (hashed, None)
+    return result
+
+
+def loose_refs(path: str) -> list:
+    result = []
+    for folder, _, files in os.walk(path):
+        result.extend(os.path.join(folder, item) for item in files)
+    return result
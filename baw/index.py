@@ -0,0 +1,273 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Index of the files and folders of a project.
+
+The index walks the project once with os.scandir. clean, refactor,
+format and lint query it instead of walking the project again. Folders
+of SKIPPED and folders which git ignores are listed in their parent
+folder but not entered. Files are grouped by suffix and entries by name.
+
+`snapshot` keeps the index of a root for the whole invocation and
+refreshes it on every call: a folder is only scanned again if its mtime
+changed. With `persist`, the index is stored in the baw tmp dir and the
+next invocation refreshes the stored index the same way. Like git, a
+folder changed shortly before it was scanned is always scanned again,
+changes within the resolution of the mtime are therefore not missed.
+"""
+
+import collections
+import dataclasses
+import fnmatch
+import functools
+import glob
+import json
+import os
+import time
+
+import utilo
+
+import baw.runtime
+import baw.utils
+
+# folders which are never entered
+SKIPPED = {'.git', '__pycache__', 'venv'}
+
+# scan folder again if it changed less secs before last scan
+RACY = 2.0
+
+
+@dataclasses.dataclass
+class Folder:
+    """Entries of a single folder."""
+    mtime: int
+    # start of scan in secs since epoch
+    scanned: float
+    files: list
+    folders: list
+
+    def racy(self) -> bool:
+        """\
+        >>> Folder(0, 10.0, [], []).racy(), Folder(9 * 10**9, 10.0, [], []).racy()
+        (False, True)
+        """
+        return self.mtime >= (self.scanned - RACY) * 10**9
+
+
+class Index:
+    """Entries of entered folders of `root`, see `scan`."""
+
+    def __init__(self, root: str, folders: dict, excluded: set):
+        self.root = root
+        # relative path of entered folder to Folder, root is '.'
+        self.folders = folders
+        # files and folders with trailing slash which git ignores
+        self.ignored = excluded
+
+    def walk(self, top: str = '.'):
+        """Like os.walk, yield relative folder, its folders and files.
+
+        Only entered folders are yielded, removing a folder from the
+        yielded folders skips it.
+        """
+        folder = self.folders.get(top)
+        if folder is None:
+            return
+        folders = [
+            item for item in folder.folders if joined(top, item) in self.folders
+        ]
+        yield top, folders, list(folder.files)
+        for item in folders:
+            yield from self.walk(joined(top, item))
+
+    def files(self, suffixes: tuple = None, folders: list = None) -> list:
+        """Sorted files which git does not ignore.
+
+        Args:
+            suffixes(tuple): select files of suffixes like ('.py',)
+            folders(list): select files of relative folders
+        """
+        if suffixes is None:
+            selected = [
+                item for paths in self.suffixes.values() for item in paths
+            ]
+        else:
+            selected = [
+                item for suffix in suffixes
+                for item in self.suffixes.get(suffix, [])
+            ]
+        if folders is not None:
+            prefixes = tuple(f'{item}/' for item in folders)
+            selected = [item for item in selected if item.startswith(prefixes)]
+        return sorted(item for item in selected if item not in self.ignored)
+
+    @functools.cached_property
+    def suffixes(self) -> dict:
+        result = collections.defaultdict(list)
+        for relative, folder in self.folders.items():
+            for name in folder.files:
+                result[os.path.splitext(name)[1]].append(joined(relative, name))
+        return dict(result)
+
+    @functools.cached_property
+    def names(self) -> dict:
+        """Name of entry to relative paths of files and folders.
+
+        Like `glob`, entries below hidden folders are not part of it.
+        """
+        result = collections.defaultdict(list)
+        for relative, folder in self.folders.items():
+            if relative != '.' and any(
+                    item.startswith('.') for item in relative.split('/')):
+                continue
+            for name in folder.files + folder.folders:
+                result[name].append(joined(relative, name))
+        return dict(result)
+
+    def match(self, pattern: str) -> list:
+        """Absolute paths of entries matching `pattern` in any folder.
+
+        Like glob(root + '/**/' + pattern, recursive=True), ignored
+        files are matched as well.
+        """
+        head, _, tail = pattern.partition('/')
+        result = []
+        for name, paths in self.names.items():
+            if name.startswith('.') and not head.startswith('.'):
+                continue
+            if not fnmatch.fnmatchcase(name, head):
+                continue
+            for path in paths:
+                path = utilo.join(self.root, path)
+                if tail:
+                    result.extend(glob.glob(utilo.join(path, tail)))
+                elif os.path.lexists(path):
+                    result.append(path)
+        return sorted(result)
+
+
+def joined(folder: str, name: str) -> str:
+    """\
+    >>> joined('.', 'a.py'), joined('a', 'b.py')
+    ('a.py', 'a/b.py')
+    """
+    return name if folder == '.' else f'{folder}/{name}'
+
+
+# index of every root of this invocation
+SNAPSHOTS = {}
+
+
+def snapshot(root: str, persist: bool = False) -> Index:
+    """Current index of `root`, refresh previous index of invocation.
+
+    Args:
+        root(str): project root
+        persist(bool): load and store index in baw tmp dir
+    """
+    root = os.path.abspath(root)
+    previous = SNAPSHOTS.get(root)
+    folders = previous.folders if previous else {}
+    if persist and not folders:
+        folders = load(root)
+    result = scan(root, folders)
+    SNAPSHOTS[root] = result
+    if persist:
+        store(root, result)
+    return result
+
+
+def scan(root: str, previous: dict = None) -> Index:
+    """Walk `root`, take listings of unchanged folders from `previous`."""
+    previous = previous or {}
+    excluded = ignored(root)
+    folders = {}
+    todo = ['.']
+    while todo:
+        relative = todo.pop()
+        path = root if relative == '.' else utilo.join(root, relative)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        folder = previous.get(relative)
+        if folder is None or folder.mtime != mtime or folder.racy():
+            folder = listing(path, mtime)
+            if folder is None:
+                continue
+        folders[relative] = folder
+        for name in folder.folders:
+            child = joined(relative, name)
+            if name in SKIPPED or f'{child}/' in excluded:
+                continue
+            todo.append(child)
+    return Index(root, folders, excluded)
+
+
+def listing(path: str, mtime: int) -> Folder | None:
+    scanned = time.time()
+    files, folders = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.name)
+                else:
+                    files.append(entry.name)
+    except OSError:
+        return None
+    return Folder(mtime, scanned, sorted(files), sorted(folders))
+
+
+def ignored(root: str) -> set:
+    """Files and folders, with trailing slash, which git ignores.
+
+    Returns:
+        paths relative to `root`, empty if `root` is not part of a git
+        repository
+    """
+    completed = baw.runtime.run(
+        'git ls-files --others --ignored --exclude-standard --directory',
+        cwd=root,
+    )
+    if completed.returncode:
+        return set()
+    return set(completed.stdout.splitlines())
+
+
+def path_index(root: str) -> str:
+    return utilo.join(baw.utils.tmp(root), 'index.json')
+
+
+def load(root: str) -> dict:
+    try:
+        stored = json.loads(utilo.file_read(path_index(root)))
+    except (AssertionError, ValueError):
+        return {}
+    if stored.get('root') != root:
+        return {}
+    return {
+        relative: Folder(*values)
+        for relative, values in stored['folders'].items()
+    }
+
+
+def store(root: str, index: Index):
+    folders = {
+        relative: dataclasses.astuple(folder)
+        for relative, folder in index.folders.items()
+    }
+    path = path_index(root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baw.utils.file_replace(
+        path,
+        json.dumps({
+            'root': root,
+            'folders': folders
+        }),
+    )
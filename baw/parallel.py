@@ -0,0 +1,318 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Run processes in parallel with one global job budget.
+
+The jobserver holds one token per job of the budget, similar to GNU
+make. Every process started by baw acquires a token first, tools which
+start own workers, for example pytest-xdist, acquire one token per
+worker. Nested parallelism, like a forked linter which runs processes
+itself, can therefore not oversubscribe the machine. Use `--jobs` or
+BAW_JOBS to define the budget of one baw invocation. A nested baw
+process inherits the share of its parent via BAW_JOBS.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import functools
+import heapq
+import os
+import signal
+import threading
+import time
+
+import baw.utils
+
+# total number of parallel jobs of one baw invocation
+JOBS = 'BAW_JOBS'
+
+# wait between polling for a free token in secs
+POLL = 0.01
+
+
+@dataclasses.dataclass
+class Result:  # pylint:disable=R0902
+    cmd: str
+    cwd: str = None
+    returncode: int = None
+    stdout: str = ''
+    stderr: str = ''
+    duration: float = 0.0
+    timeout: bool = False
+    cancelled: bool = False
+
+
+class Jobserver:
+    """Hand out `tokens` to running jobs.
+
+    >>> server = Jobserver(2)
+    >>> server.acquire(3), server.acquire(blocking=False)
+    (2, 0)
+    >>> server.release(2); server.acquire(blocking=False)
+    1
+    """
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.free = tokens
+        self.condition = threading.Condition()
+
+    def acquire(self, count: int = 1, blocking: bool = True) -> int:
+        """Wait till `count` tokens are free, return acquired tokens.
+
+        A request greater than the budget is limited to the budget.
+        """
+        count = max(1, min(count, self.tokens))
+        with self.condition:
+            if self.free < count:
+                if not blocking:
+                    return 0
+                self.condition.wait_for(lambda: self.free >= count)
+            self.free -= count
+        return count
+
+    def release(self, count: int = 1):
+        with self.condition:
+            self.free += count
+            self.condition.notify_all()
+
+
+def workers() -> int:
+    """Determine process limit out of cpu count and current load.
+
+    >>> workers() >= 1
+    True
+    """
+    cpus = os.cpu_count() or 1
+    try:
+        load = int(os.getloadavg()[0])
+    except (AttributeError, OSError):
+        # not available on windows
+        load = 0
+    return max(1, cpus // 4, cpus - load)
+
+
+@functools.lru_cache(maxsize=1)
+def jobs() -> int:
+    """Total number of parallel jobs, use BAW_JOBS if defined."""
+    configured = os.environ.get(JOBS, '').strip()
+    if not configured:
+        return workers()
+    try:
+        return max(1, int(configured))
+    except ValueError:
+        baw.utils.error(f'invalid {JOBS}: {configured}, use default')
+        return workers()
+
+
+def setup(count: int = None):
+    """Define job budget of this invocation and its nested processes."""
+    if count:
+        os.environ[JOBS] = str(count)
+    jobs.cache_clear()
+    jobserver.cache_clear()
+
+
+def share(wanted=None) -> int:
+    """Determine worker count of a tool which starts own workers.
+
+    Args:
+        wanted(int|str): requested worker count, None or `auto` to use
+                         the whole budget
+    Returns:
+        `wanted` limited to the job budget
+
+    >>> share(1)
+    1
+    >>> share('auto') == share('logical') == share() == jobs()
+    True
+    """
+    if wanted is None or not str(wanted).isdigit():
+        return jobs()
+    return max(1, min(int(wanted), jobs()))
+
+
+def split(items: list, count: int) -> list:
+    """Split `items` into at most `count` parts of similar size.
+
+    >>> split(list(range(5)), 2)
+    [[0, 2, 4], [1, 3]]
+    >>> split([1], 3)
+    [[1]]
+    """
+    result = [items[index::count] for index in range(count)]
+    return [item for item in result if item]
+
+
+def balance(weights: dict, count: int) -> list:
+    """Split keys of `weights` into at most `count` parts of similar sum.
+
+    The heaviest item goes to the lightest part first. The result only
+    depends on `weights`.
+
+    >>> balance(dict(a=4.0, b=2.0, c=1.0, d=1.0), 2)
+    [['a'], ['b', 'c', 'd']]
+    >>> balance(dict(a=1.0), 3)
+    [['a']]
+    """
+    loads = [(0.0, index) for index in range(count)]
+    result = [[] for _ in range(count)]
+    for item in sorted(weights, key=lambda item: (-weights[item], item)):
+        load, index = heapq.heappop(loads)
+        result[index].append(item)
+        heapq.heappush(loads, (load + weights[item], index))
+    return [sorted(item) for item in result if item]
+
+
+@functools.lru_cache(maxsize=1)
+def jobserver() -> Jobserver:
+    return Jobserver(jobs())
+
+
+@contextlib.contextmanager
+def slot(count: int = 1):
+    """Block till `count` tokens are free."""
+    server = jobserver()
+    acquired = server.acquire(count)
+    try:
+        yield acquired
+    finally:
+        server.release(acquired)
+
+
+@contextlib.asynccontextmanager
+async def aslot(count: int = 1):
+    """Wait till `count` tokens are free without blocking the loop."""
+    server = jobserver()
+    while not (acquired := server.acquire(count, blocking=False)):
+        await asyncio.sleep(POLL)
+    try:
+        yield acquired
+    finally:
+        server.release(acquired)
+
+
+def budget(env: dict, acquired: int) -> dict:
+    """Pass share of job budget to nested baw process.
+
+    >>> budget({}, 1), budget({JOBS: '8'}, 3)
+    ({'BAW_JOBS': '1'}, {'BAW_JOBS': '3'})
+    """
+    env = dict((env if env is not None else os.environ).items())
+    env[JOBS] = str(acquired)
+    return env
+
+
+def execute(
+    cmds: list,
+    cwd: str = None,
+    env: dict = None,
+    *,
+    timeout: float = None,
+    failfast: bool = True,
+    tokens: int = 1,
+) -> list:
+    """Run shell `cmds` in parallel.
+
+    Args:
+        cmds(list): shell cmds, use tuple(cmd, cwd) to run in other cwd
+        cwd(str): default location where cmds are executed
+        env(dict): environment of processes, use os.environ if None
+        timeout(float): kill single process after `timeout` secs
+        failfast(bool): kill sibling processes after first failure
+        tokens(int): number of tokens required by every process
+    Returns:
+        list of Result in order of `cmds`
+
+    >>> [item.stdout for item in execute(['echo 1', 'echo 2'])]
+    ['1\\n', '2\\n']
+    >>> execute(['exit 3', 'sleep 10'])[1].cancelled
+    True
+    >>> execute(['sleep 10'], timeout=0.1)[0].timeout
+    True
+    """
+    todo = [item if isinstance(item, tuple) else (item, cwd) for item in cmds]
+    result = asyncio.run(gather(todo, env, timeout, failfast, tokens))
+    return result
+
+
+async def gather(  # pylint:disable=R0913
+    todo: list,
+    env: dict,
+    timeout: float,
+    failfast: bool,
+    tokens: int,
+):
+    results = [Result(cmd=cmd, cwd=cwd) for cmd, cwd in todo]
+    tasks = [
+        asyncio.create_task(process(item, env, timeout, tokens))
+        for item in results
+    ]
+    for finished in asyncio.as_completed(tasks):
+        current = await finished
+        if not failfast or not current.returncode:
+            continue
+        for task in tasks:
+            task.cancel()
+        break
+    for task, item in zip(tasks, results):
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        if task.cancelled():
+            item.cancelled = True
+    return results
+
+
+async def process(
+    result: Result,
+    env: dict,
+    timeout: float,
+    tokens: int,
+) -> Result:
+    async with aslot(tokens) as acquired:
+        start = time.time()
+        created = await asyncio.create_subprocess_shell(
+            result.cmd,
+            cwd=result.cwd,
+            env=budget(env, acquired),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            # own process group to kill the children of the shell as well
+            start_new_session=True,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                created.communicate(),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            result.timeout = True
+            stdout, stderr = b'', b''
+        except asyncio.CancelledError:
+            kill(created)
+            await created.wait()
+            raise
+        finally:
+            kill(created)
+        result.returncode = await created.wait()
+        result.stdout = stdout.decode(baw.utils.UTF8, errors='ignore')
+        result.stderr = stderr.decode(baw.utils.UTF8, errors='ignore')
+        result.duration = time.time() - start
+    return result
+
+
+def kill(created):
+    """Kill shell process `created` and its process group."""
+    if created.returncode is not None:
+        return
+    with contextlib.suppress(ProcessLookupError):
+        if hasattr(os, 'killpg'):
+            os.killpg(created.pid, signal.SIGKILL)
+        else:
+            created.kill()
@@ -0,0 +1,142 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Lint engine which runs pylint and bandit in one pool of processes.
+
+`baw lint --in_process` starts the engine in the interpreter of the
+project:
+
+    python -m bawengine REQUEST
+
+REQUEST is a json file with the pylint args, the skipped bandit tests,
+the shards of files and the output file. Every shard is linted by one
+process of the pool, the shards run concurrently. A process reads every
+file of its shard once: pylint takes the astroid trees which are built
+out of the read source, bandit parses the read bytes. The astroid cache
+of inferred modules is shared by all files of a shard. The output is a
+list of the findings of the bawlint reporter and the bandit json report
+per shard.
+"""
+
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import sys
+
+import bawlint
+
+
+def main(argv: list = None):
+    argv = sys.argv[1:] if argv is None else argv
+    with open(argv[0], encoding='utf8') as fp:
+        request = json.load(fp)
+    shards = request['shards']
+    workers = max(1, min(request.get('workers', 1), len(shards)))
+    if workers == 1:
+        result = [lint(request, shard) for shard in shards]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            result = list(pool.map(lint, [request] * len(shards), shards))
+    with open(request['output'], 'w', encoding='utf8') as fp:
+        json.dump(result, fp)
+
+
+def lint(request: dict, shard: dict) -> dict:
+    sources = read(shard['pylint'] + shard['bandit'])
+    return {
+        'pylint': pylint(request['pylint'], shard['pylint'], sources),
+        'bandit': bandit(request['bandit'], shard['bandit'], sources),
+    }
+
+
+def read(paths: list) -> dict:
+    """Read content of files once, folders are skipped."""
+    result = {}
+    for path in paths:
+        if path in result or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as fp:
+            result[path] = fp.read()
+    return result
+
+
+def pylint(args: list, paths: list, sources: dict) -> dict | None:
+    if not paths:
+        return None
+    from pylint.lint import Run  # pylint:disable=C0415
+    prebuild(paths, sources)
+    reporter = bawlint.Findings(io.StringIO())
+    absolute = [os.path.abspath(item) for item in paths]
+    try:
+        Run([*args, '--jobs=1', *absolute], reporter=reporter, exit=False)
+    except SystemExit as exited:
+        return {'error': f'pylint stopped with {exited.code}'}
+    return json.loads(reporter.out.getvalue())
+
+
+def prebuild(paths: list, sources: dict):
+    """Build astroid trees of read files, pylint takes them from cache."""
+    # pylint:disable=C0415
+    from astroid import MANAGER
+    from astroid import modutils
+    from astroid.builder import AstroidBuilder
+    for path in paths:
+        if path not in sources:
+            continue
+        filepath = os.path.abspath(path)
+        with contextlib.suppress(Exception):
+            # pylint builds and reports broken files itself
+            modname = '.'.join(modutils.modpath_from_file(filepath))
+            AstroidBuilder(MANAGER).string_build(
+                sources[path].decode('utf8'),
+                modname,
+                filepath,
+            )
+
+
+def bandit(skips: list, paths: list, sources: dict) -> dict | None:
+    if not paths:
+        return None
+    # pylint:disable=C0415
+    from bandit.core import config
+    from bandit.core import constants
+    from bandit.core import manager
+    profile = {'include': set(), 'exclude': set(skips)}
+    checker = manager.BanditManager(
+        config.BanditConfig(),
+        'file',
+        profile=profile,
+        quiet=True,
+    )
+    checker.files_list = list(paths)
+    for path in paths:
+        if path not in sources:
+            checker.skipped.append((path, 'could not read file'))
+            continue
+        # pylint:disable=W0212
+        checker._parse_file(path, io.BytesIO(sources[path]), checker.files_list)
+    issues = checker.get_issue_list(
+        sev_level=constants.LOW,
+        conf_level=constants.LOW,
+    )
+    return {
+        'errors': [{
+            'filename': filename,
+            'reason': reason
+        } for filename, reason in checker.get_skipped()],
+        'metrics': {
+            key: {} for key in checker.metrics.data if key != '_totals'
+        },
+        'results': [issue.as_dict() for issue in issues],
+    }
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""pylint reporter which writes the findings per linted file as json.
+
+`baw lint` loads this reporter with
+
+    pylint --output-format=bawlint.Findings:PATH
+
+and renders the report out of the stored findings, see baw/cmd/lint. It
+does not import baw, it runs in the interpreter of the project. Paths
+are relative to the working dir and use forward slashes. The lint time
+per file is measured if pylint runs with a single job.
+"""
+
+import json
+import os
+import time
+
+from pylint.reporters import BaseReporter
+
+
+def relative(path: str) -> str:
+    return os.path.relpath(os.path.abspath(path)).replace(os.sep, '/')
+
+
+class Findings(BaseReporter):
+    """Collect messages and statements per linted file."""
+
+    name = 'bawfindings'
+    extension = 'json'
+
+    def __init__(self, output=None):
+        super().__init__(output)
+        self.files = {}
+        # messages which do not belong to a linted file
+        self.others = []
+        self.current = None
+        self.started = None
+
+    def on_set_current_module(self, module: str, filepath: str | None):
+        if not filepath:
+            return
+        self.measure()
+        self.current = relative(filepath)
+        self.files.setdefault(self.current, {
+            'module': module,
+            'messages': [],
+            'statements': 0,
+        })
+
+    def measure(self):
+        """Add lint time of current file."""
+        now = time.perf_counter()
+        if self.current is not None and self.linter.config.jobs == 1:
+            entry = self.files[self.current]
+            entry['duration'] = entry.get('duration', 0.0) + now - self.started
+        self.started = now
+
+    def handle_message(self, msg):
+        message = {
+            'module': msg.module,
+            'obj': msg.obj,
+            'line': msg.line,
+            'column': msg.column,
+            'msg_id': msg.msg_id,
+            'symbol': msg.symbol,
+            'msg': msg.msg,
+            'category': msg.C,
+        }
+        path = relative(msg.abspath) if msg.abspath else ''
+        if path in self.files:
+            self.files[path]['messages'].append(message)
+            return
+        message['path'] = msg.path
+        self.others.append(message)
+
+    def display_messages(self, layout):
+        pass
+
+    def display_reports(self, layout):
+        pass
+
+    def _display(self, layout):
+        pass
+
+    def on_close(self, stats, previous_stats):
+        self.measure()
+        for entry in self.files.values():
+            module = stats.by_module.get(entry['module'], {})
+            entry['statements'] = module.get('statement', 0)
+        config = self.linter.config
+        options = {
+            'evaluation': config.evaluation,
+            'exit_zero': config.exit_zero,
+            'fail_on': list(config.fail_on),
+            'fail_under': config.fail_under,
+        }
+        json.dump(
+            {
+                'files': self.files,
+                'others': self.others,
+                'options': options,
+            },
+            self.out,
+        )
@@ -0,0 +1,52 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""xdist scheduler which sends the longest tests first, see bawschedule.
+
+The `bawschedule` plugin imports this module only if xdist requests a
+scheduler, xdist is therefore always available.
+"""
+
+import bawschedule
+from xdist.scheduler import LoadScheduling
+
+
+class LongestFirst(LoadScheduling):  # pylint:disable=R0903
+    """Load scheduling which sends single tests in LPT order.
+
+    Every idle worker receives the longest pending test. A worker keeps
+    two pending tests, it requires the next test to finish the current.
+    """
+
+    def __init__(self, config, log=None, durations: dict = None):
+        super().__init__(config, log)
+        self.durations = durations or {}
+        self.maxschedchunk = 1
+
+    def schedule(self):
+        assert self.collection_is_completed
+        if self.collection is not None:
+            super().schedule()
+            return
+        if not self._check_nodes_have_same_collection():
+            self.log('**Different tests collected, aborting run**')
+            return
+        self.collection = next(iter(self.node2collection.values()))
+        self.pending[:] = bawschedule.order(self.collection, self.durations)
+        if not self.collection:
+            return
+        for _ in range(2):
+            for node in self.nodes:
+                self._send_tests(node, 1)
+        if not self.pending:
+            for node in self.nodes:
+                node.shutdown()
+
+    def remove_pending_tests_from_node(self, node, indices):
+        # work stealing is not supported, same as LoadScheduling
+        raise NotImplementedError
@@ -0,0 +1,177 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""pytest plugin which schedules the slowest tests first.
+
+baw injects this plugin into every test run. It does not import baw to
+keep the startup of every xdist worker cheap.
+
+BAW_DURATIONS: json file of predicted durations per test id, the
+               xdist controller hands out the longest tests first
+BAW_DURATIONS_REPORT: json file where the controller writes the
+                      measured durations per test id of this run
+BAW_SHARD: `index/count`, run the index-th part of the collected tests
+BAW_SHARD_DURATIONS: json file of durations to partition the tests,
+                     all shards must use the same file
+
+Source modules which are passed as explicit paths, see `baw test
+changed`, contribute their doctests only.
+"""
+
+import fnmatch
+import heapq
+import json
+import os
+
+import pytest
+
+DURATIONS = 'BAW_DURATIONS'
+REPORT = 'BAW_DURATIONS_REPORT'
+SHARD = 'BAW_SHARD'
+SHARD_DURATIONS = 'BAW_SHARD_DURATIONS'
+
+
+def load(path: str) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf8') as fp:
+            return json.load(fp)
+    except ValueError:
+        return {}
+
+
+def order(collection: list, durations: dict) -> list:
+    """Indexes of `collection`, longest predicted duration first.
+
+    Unknown tests are expected to take the mean duration. Tests of equal
+    duration keep their collection order to share fixtures.
+
+    >>> order(['a', 'b', 'c', 'd'], {'b': 3.0, 'c': 1.0, 'd': 1.0})
+    [1, 0, 2, 3]
+    >>> order(['a', 'b'], {})
+    [0, 1]
+    """
+    known = [durations[item] for item in collection if item in durations]
+    default = sum(known) / len(known) if known else 0.0
+    predicted = [durations.get(item, default) for item in collection]
+    return sorted(range(len(collection)), key=lambda index: -predicted[index])
+
+
+def partition(nodeids: list, durations: dict, count: int) -> list:
+    """Split test ids into `count` shards of similar total duration.
+
+    The result only depends on the test ids and durations, every machine
+    computes the same partition.
+
+    >>> durations = {'a': 4.0, 'b': 2.0, 'c': 1.0, 'd': 1.0}
+    >>> partition(['a', 'b', 'c', 'd'], durations, 2)
+    [['a'], ['b', 'c', 'd']]
+    >>> partition(['a', 'b', 'c'], {}, 2)
+    [['a', 'c'], ['b']]
+    """
+    known = [durations[item] for item in nodeids if item in durations]
+    default = sum(known) / len(known) if known else 1.0
+    predicted = {item: durations.get(item, default) for item in nodeids}
+    ordered = sorted(nodeids, key=lambda item: (-predicted[item], item))
+    loads = [(0.0, index) for index in range(count)]
+    result = [[] for _ in range(count)]
+    for item in ordered:
+        total, index = heapq.heappop(loads)
+        result[index].append(item)
+        heapq.heappush(loads, (total + predicted[item], index))
+    return [sorted(item) for item in result]
+
+
+class Recorder:
+    """Sum up durations of setup, call and teardown per test id."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.durations = {}
+        self.skipped = set()
+
+    def pytest_runtest_logreport(self, report):
+        if report.skipped:
+            self.skipped.add(report.nodeid)
+        current = self.durations.get(report.nodeid, 0.0)
+        self.durations[report.nodeid] = current + report.duration
+
+    def pytest_sessionfinish(self):
+        measured = {
+            key: value
+            for key, value in self.durations.items()
+            if key not in self.skipped
+        }
+        with open(self.path, 'w', encoding='utf8') as fp:
+            json.dump(measured, fp)
+
+
+def pytest_configure(config):
+    path = os.environ.get(REPORT)
+    if not path or hasattr(config, 'workerinput'):
+        # record on xdist controller only
+        return
+    config.pluginmanager.register(Recorder(path), 'bawrecorder')
+
+
+def python_file(path, patterns: list) -> bool:
+    """Check if `path` matches one of the `python_files` `patterns`.
+
+    >>> import pathlib
+    >>> python_file(pathlib.Path('tests/test_me.py'), ['test_*.py'])
+    True
+    >>> python_file(pathlib.Path('baw/utils.py'), ['test_*.py'])
+    False
+    """
+    return any(fnmatch.fnmatch(path.name, item) for item in patterns)
+
+
+def doctests_only(config, items):
+    """Deselect functions of source modules like `def testing()`, pytest
+    collects them if the module is passed as explicit path."""
+    patterns = config.getini('python_files')
+    kept, deselected = [], []
+    for item in items:
+        source = not python_file(item.path, patterns)
+        if source and isinstance(item, pytest.Function):
+            deselected.append(item)
+        else:
+            kept.append(item)
+    if deselected:
+        items[:] = kept
+        config.hook.pytest_deselected(items=deselected)
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    doctests_only(config, items)
+    selected = os.environ.get(SHARD)
+    if not selected:
+        return
+    index, count = (int(item) for item in selected.split('/'))
+    # without shared durations every test counts the same
+    durations = load(os.environ.get(SHARD_DURATIONS))
+    shards = partition([item.nodeid for item in items], durations, count)
+    keep = set(shards[index - 1])
+    deselected = [item for item in items if item.nodeid not in keep]
+    items[:] = [item for item in items if item.nodeid in keep]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption('dist') != 'load':
+        return None
+    durations = load(os.environ.get(DURATIONS))
+    if not durations:
+        return None
+    # xdist calls this hook only, the scheduler requires xdist
+    import bawlongest  # pylint:disable=C0415
+    return bawlongest.LongestFirst(config, log, durations)
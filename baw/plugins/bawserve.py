@@ -0,0 +1,270 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Serve requests on a unix socket and fork a worker per request.
+
+`baw serve` and the warm pytest server `bawwarm` are built on this
+module. It imports the standard library only: the warm server runs in
+the interpreter of the project and the client side is imported by every
+baw invocation.
+
+The socket is created in a dir which only the current user can access.
+Clients connect only to a socket of this user in such a dir, the
+request contains the complete environment of the client.
+
+A request is one line of json with the cwd and env of the client. The
+server forks a worker per request which runs with this cwd and env and
+streams stdout/stderr back in frames of channel(1 byte), payload
+length(4 byte) and payload. The last frame is EXIT with the returncode
+or RESTART if the server stopped to be restarted by the client.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+
+HEADER = struct.Struct('!cI')
+STDOUT = b'o'
+STDERR = b'e'
+EXIT = b'x'
+RESTART = b'r'
+
+CHUNK = 64 * 1024
+
+# unix socket paths are limited to 108 bytes, to 104 bytes on macOS
+SOCKET_MAX = 100
+
+# dir of sockets, accessible by the current user only
+SOCKETS = 'sockets'
+PRIVATE = 0o700
+
+# set inside a forked worker
+SERVING = False
+
+
+def available() -> bool:
+    return hasattr(os, 'fork') and hasattr(socket, 'AF_UNIX')
+
+
+def socket_path(folder: str, name: str) -> str:
+    """Path of socket `name` in private dir of `folder`, in the tmp dir
+    if too long.
+
+    >>> socket_path('/tmp', 'a.sock')
+    '/tmp/sockets/a.sock'
+    >>> socket_path('/tmp/' + 'x' * 100, 'a.sock').startswith('/tmp/baw_')
+    True
+    """
+    result = f'{folder}/{SOCKETS}/{name}'
+    if len(result.encode()) > SOCKET_MAX:
+        hashed = hashlib.sha256(result.encode()).hexdigest()[:16]
+        result = os.path.join(tempfile.gettempdir(), f'baw_{hashed}', name)
+    return result
+
+
+def trusted(path: str) -> bool:
+    """Check that socket `path` and its dir belong to the current user
+    and that no other user can access the dir."""
+    if not hasattr(os, 'getuid'):
+        return False
+    try:
+        located = os.stat(path)
+        folder = os.stat(os.path.dirname(path))
+    except OSError:
+        return False
+    if located.st_uid != os.getuid() or folder.st_uid != os.getuid():
+        return False
+    return stat.S_IMODE(folder.st_mode) == PRIVATE
+
+
+def connect(path: str):
+    """Connect to server of `path`, None if no trusted server is running."""
+    if not trusted(path):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        # stale socket, server is not running anymore
+        client.close()
+        return None
+    return client
+
+
+def call(connection, request: dict) -> int | None:
+    """Send `request` and write streamed output to stdout/stderr.
+
+    Returns:
+        returncode of worker or None if the server requires a restart
+    """
+    with connection:
+        connection.sendall(json.dumps(request).encode('utf8') + b'\n')
+        reader = connection.makefile('rb')
+        while True:
+            header = reader.read(HEADER.size)
+            if len(header) < HEADER.size:
+                sys.stderr.write('connection to server lost\n')
+                return 1
+            channel, length = HEADER.unpack(header)
+            payload = reader.read(length)
+            if channel == EXIT:
+                return int(payload)
+            if channel == RESTART:
+                return None
+            stream = sys.stdout if channel == STDOUT else sys.stderr
+            stream.flush()
+            stream.buffer.write(payload)
+            stream.buffer.flush()
+
+
+def send(connection, channel: bytes, payload: bytes = b''):
+    connection.sendall(HEADER.pack(channel, len(payload)) + payload)
+
+
+def serve(path: str, dispatch, idle: float = None):
+    """Listen on unix socket `path` till stopped with ctrl+c or SIGTERM.
+
+    Args:
+        path(str): location of unix socket
+        dispatch(callable): called in the server with the request,
+                            returns the function which runs the request
+                            in the forked worker and returns the
+                            returncode, or the channel EXIT or RESTART
+                            of the last frame to answer and stop
+        idle(float): stop after secs without request
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(folder, mode=PRIVATE, exist_ok=True)
+    # fails if the dir belongs to another user
+    os.chmod(folder, PRIVATE)
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # allow connections of current user only
+    previous = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(previous)
+    server.listen()
+    server.settimeout(idle)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while True:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                break
+            reap()
+            with connection:
+                connection.setblocking(True)
+                request = receive(connection)
+                if request is None:
+                    continue
+                worker = dispatch(request)
+                if isinstance(worker, bytes):
+                    send(connection, worker, b'0')
+                    break
+                sys.stdout.flush()
+                sys.stderr.flush()
+                if not os.fork():  # pragma: no cover
+                    server.close()
+                    run(connection, request, worker)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+
+def stop(*_):
+    raise KeyboardInterrupt
+
+
+def reap():
+    """Collect finished worker without blocking."""
+    with contextlib.suppress(ChildProcessError):
+        while os.waitpid(-1, os.WNOHANG)[0]:
+            continue
+
+
+def receive(connection) -> dict | None:
+    try:
+        return json.loads(connection.makefile('rb').readline())
+    except ValueError:
+        sys.stderr.write('serve: invalid request\n')
+        return None
+
+
+def run(connection, request: dict, worker):  # pragma: no cover
+    """Run `worker` in forked process and stream output to `connection`,
+    never returns."""
+    global SERVING  # pylint:disable=W0603
+    SERVING = True
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    lock = threading.Lock()
+
+    def locked(channel: bytes, payload: bytes):
+        with lock:
+            send(connection, channel, payload)
+
+    pumps = [
+        redirect(1, STDOUT, locked),
+        redirect(2, STDERR, locked),
+    ]
+    os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+    # stream output while running
+    sys.stdout.reconfigure(line_buffering=True)
+    returncode = 1
+    try:
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        returncode = worker(request)
+    except BaseException:  # pylint:disable=W0703
+        traceback.print_exc()
+    finally:
+        with contextlib.suppress(Exception):
+            sys.stdout.flush()
+            sys.stderr.flush()
+        # close write end of pipes to finish pumps
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        for pump in pumps:
+            pump.join()
+        locked(EXIT, str(returncode).encode('utf8'))
+        connection.close()
+        os._exit(0)  # pylint:disable=W0212
+
+
+def redirect(fd: int, channel: bytes, sender) -> threading.Thread:
+    """Redirect file descriptor `fd` into a pipe which is streamed with
+    `sender`. Subprocesses which inherit `fd` are streamed as well."""
+    reading, writing = os.pipe()
+    os.dup2(writing, fd)
+    os.close(writing)
+
+    def pump():
+        with os.fdopen(reading, 'rb', buffering=0) as pipe:
+            while chunk := pipe.read(CHUNK):
+                sender(channel, chunk)
+
+    result = threading.Thread(target=pump, daemon=True)
+    result.start()
+    return result
@@ -0,0 +1,80 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Warm pytest server which forks a pre-imported process per test run.
+
+`baw test --warm` starts this server in the interpreter of the project:
+
+    python -m bawwarm SOCKET KEY [PACKAGE...]
+
+The server imports pytest and the project packages once. Project
+modules are dropped afterwards, a forked run therefore imports the
+current project code but reuses the imported dependencies. Every request
+contains the pytest args, cwd and env, the forked run streams the pytest
+output back, see bawserve. A request with another KEY, for example after
+changed requirements, stops the server. The server stops after IDLE secs
+without request.
+"""
+
+import functools
+import importlib
+import os
+import sys
+import traceback
+
+import bawserve
+
+# stop server after secs without request
+IDLE = 1800.0
+
+
+def main(argv: list = None):
+    argv = sys.argv[1:] if argv is None else argv
+    path, key, packages = argv[0], argv[1], argv[2:]
+    preload(packages)
+    bawserve.serve(path, functools.partial(dispatch, key=key), idle=IDLE)
+
+
+def preload(packages: list):
+    import pytest  # pylint:disable=W0611,C0415
+    for package in packages:
+        try:
+            importlib.import_module(package)
+        except Exception:  # pylint:disable=W0703
+            # broken code is reported by the test run
+            traceback.print_exc()
+    forget(os.getcwd())
+
+
+def forget(root: str):
+    """Drop imported modules of project to import current code on run."""
+    root = os.path.join(os.path.abspath(root), '')
+    for name, module in list(sys.modules.items()):
+        if name in ('__main__', __name__):
+            continue
+        path = getattr(module, '__file__', None)
+        if path and os.path.abspath(path).startswith(root):
+            del sys.modules[name]
+
+
+def dispatch(request: dict, key: str):
+    if request.get('cmd') == 'stop':
+        return bawserve.EXIT
+    if request.get('key') != key:
+        return bawserve.RESTART
+    return run
+
+
+def run(request: dict) -> int:
+    """Run pytest in forked process."""
+    import pytest  # pylint:disable=C0415
+    return int(pytest.main(request['args']))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,8 +8,11 @@
 # =============================================================================
 """Base for generating project. Templates have to be here."""
 
+import functools
+import json
 import os
 import time
+import typing
 
 import utilo
 
@@ -37,13 +40,14 @@ def joined(path: str, asserts: bool = True) -> str:
     return result
 
 
-LICENSE_TEMPLATE = fread(joined('LICENSE'))
 WORKSPACE_TEMPLATE = joined('.code-workspace')
 GIT_IGNORE_TEMPLATE = joined('.gitignore')
 RCFILE_PATH = joined('.rcfile')
 ISORT_PATH = joined('.isort.cfg')
 CONFTEST_PATH = joined('conftest.tpy')
-DOCKER = fread(joined('Dockerfile'))
+
+# Optional single file which contains every template, see `pack`.
+PACKED = joined('templates.pack', asserts=False)
 
 README = """\
 # {{SHORT}}
@@ -179,48 +183,131 @@ if __name__ == "__main__":
     main()
 """
 
-CODE_WORKSPACE = fread(WORKSPACE_TEMPLATE)
-JENKINSFILE = fread(joined('Jenkinsfile'))
-GITIGNORE = fread(joined('.gitignore'))
-PYPROJECT = fread(joined('pyproject'))
-RELEASE_PLAN = fread(joined('docs/plan.rst'))
+WORKFLOWS = '.github/workflows'
 
-REFACTOR = fread(joined('refactor'))
+# Templates are read on first access and cached afterwards. Only cmds
+# which generate project files pay for the disk access.
+LAZY = {
+    'CODE_WORKSPACE': '.code-workspace',
+    'CONFTEST_TEMPLATE': 'conftest.tpy',
+    'DOCKER': 'Dockerfile',
+    'DOC_CONF': 'conf.py',
+    'GITIGNORE': '.gitignore',
+    'ISORT_TEMPLATE': '.isort.cfg',
+    'JENKINSFILE': 'Jenkinsfile',
+    'LICENSE_TEMPLATE': 'LICENSE',
+    'PYPROJECT': 'pyproject',
+    'REFACTOR': 'refactor',
+    'RELEASE_PLAN': 'docs/plan.rst',
+}
+
+GITHUB = (
+    '.github/dependabot.yml',
+    f'{WORKFLOWS}/docker.yml',
+    f'{WORKFLOWS}/pypi.yml',
+    f'{WORKFLOWS}/release.yml',
+    f'{WORKFLOWS}/test.yml',
+    'Makefile',
+)
+
+if typing.TYPE_CHECKING:
+    # loaded by `__getattr__`, declared for static analysis
+    CODE_WORKSPACE: str
+    CONFTEST_TEMPLATE: str
+    DOCKER: str
+    DOC_CONF: str
+    GITIGNORE: str
+    ISORT_TEMPLATE: str
+    JENKINSFILE: str
+    LICENSE_TEMPLATE: str
+    PYPROJECT: str
+    REFACTOR: str
+    RELEASE_PLAN: str
+    DOTGITHUB: list
+    FILES: list
+    NORMAL: list
+
+
+def __getattr__(name: str):
+    """Load template constants on first access, see PEP 562."""
+    if name in LAZY:
+        return load_template(LAZY[name])
+    if name in COLLECTIONS:
+        return COLLECTIONS[name]()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+@functools.lru_cache(maxsize=None)
+def load_template(path: str) -> str:
+    """Read template `path` relative to TEMPLATES once.
+
+    >>> load_template('LICENSE') is load_template('LICENSE')
+    True
+    """
+    loaded = packed()
+    if path in loaded:
+        return loaded[path]
+    return fread(joined(path))
 
-DOC_CONF = fread(joined('conf.py'))
 
-ISORT_TEMPLATE = fread(ISORT_PATH)
-CONFTEST_TEMPLATE = fread(CONFTEST_PATH)
+@functools.lru_cache(maxsize=1)
+def packed() -> dict:
+    """Load all templates out of PACKED with a single read if exists."""
+    if not os.path.exists(PACKED):
+        return {}
+    with open(PACKED, encoding=baw.utils.UTF8) as fp:
+        return json.load(fp)
 
-WORKFLOWS = '.github/workflows'
 
-NORMAL = [
-    ('.git/info/exclude', GITIGNORE),
-    ('Dockerfile', DOCKER),
-    ('CHANGELOG', CHANGELOG),
-    ('LICENSE', LICENSE_TEMPLATE),
-    ('README', README),
-    ('docs/index.rst', INDEX_RST),
-    ('docs/releases/backlog.rst', BACKLOG_RST),
-    ('docs/releases/releases.rst', RELEASE_RST),
-]
+def pack(outpath: str = PACKED) -> str:
+    """Write every known template into a single resource file.
 
-# None copies files
-FILES = NORMAL + [
-    # ('..code-workspace', CODE_WORKSPACE),
-    ('tests/__init__.py', COPYRIGHT),
-    ('tests/conftest.py', CONFTEST_TEMPLATE),
-    # (baw.utils.REQUIREMENTS_TXT, REQUIREMENTS),
-]
-
-DOTGITHUB = [
-    ('.github/dependabot.yml', fread(joined('.github/dependabot.yml'))),
-    (f'{WORKFLOWS}/docker.yml', fread(joined(f'{WORKFLOWS}/docker.yml'))),
-    (f'{WORKFLOWS}/pypi.yml', fread(joined(f'{WORKFLOWS}/pypi.yml'))),
-    (f'{WORKFLOWS}/release.yml', fread(joined(f'{WORKFLOWS}/release.yml'))),
-    (f'{WORKFLOWS}/test.yml', fread(joined(f'{WORKFLOWS}/test.yml'))),
-    ('Makefile', fread(joined('Makefile'))),
-]
+    Args:
+        outpath(str): path to write the packed templates
+    Returns:
+        path of written resource file
+    """
+    todo = sorted(set(LAZY.values()) | set(GITHUB) | {'semantic.cfg'})
+    content = {path: fread(joined(path)) for path in todo}
+    with open(outpath, mode='w', encoding=baw.utils.UTF8) as fp:
+        json.dump(content, fp, indent=1, sort_keys=True)
+    packed.cache_clear()
+    load_template.cache_clear()
+    return outpath
+
+
+def normal() -> list:
+    return [
+        ('.git/info/exclude', load_template('.gitignore')),
+        ('Dockerfile', load_template('Dockerfile')),
+        ('CHANGELOG', CHANGELOG),
+        ('LICENSE', load_template('LICENSE')),
+        ('README', README),
+        ('docs/index.rst', INDEX_RST),
+        ('docs/releases/backlog.rst', BACKLOG_RST),
+        ('docs/releases/releases.rst', RELEASE_RST),
+    ]
+
+
+def files() -> list:
+    # None copies files
+    return normal() + [
+        # ('..code-workspace', CODE_WORKSPACE),
+        ('tests/__init__.py', COPYRIGHT),
+        ('tests/conftest.py', load_template('conftest.tpy')),
+        # (baw.utils.REQUIREMENTS_TXT, REQUIREMENTS),
+    ]
+
+
+def dotgithub() -> list:
+    return [(path, load_template(path)) for path in GITHUB]
+
+
+COLLECTIONS = {
+    'DOTGITHUB': dotgithub,
+    'FILES': files,
+    'NORMAL': normal,
+}
 
 
 def template_replace(root: str, template: str, **kwargs) -> str:
@@ -13,20 +13,8 @@ import time
 
 import baw
 import baw.cli
-import baw.cmd
-import baw.cmd.bisect
-import baw.cmd.clean
-import baw.cmd.doc
-import baw.cmd.ide
-import baw.cmd.init
-import baw.cmd.lint
-import baw.cmd.open
-import baw.cmd.plan
-import baw.cmd.test
-import baw.cmd.upgrade
 import baw.cmd.utils
-import baw.dockers
-import baw.project
+import baw.parallel
 import baw.runtime
 import baw.utils
 
@@ -38,6 +26,7 @@ def run_main():  # pylint:disable=R0911,R1260,too-many-branches
         return baw.SUCCESS
     if run_version(args):
         return baw.SUCCESS
+    baw.parallel.setup(args.get('jobs'))
     if args.get('bisect', False):
         if failure := run_bisect(args):
             return failure
@@ -64,6 +53,7 @@ def run_version(args) -> bool:
 
 
 def run_open(args):
+    import baw.cmd.open  # pylint:disable=W0621
     directory = baw.cmd.utils.run_environment(args)
     printme = args['print']
     baw.cmd.open.openme(
@@ -75,6 +65,8 @@ def run_open(args):
 
 
 def run_ide(args):
+    import baw.cmd.ide  # pylint:disable=W0621
+
     # open vscode
     root = baw.cmd.utils.run_environment(args)
     packages = None
@@ -89,6 +81,7 @@ def run_ide(args):
 
 
 def run_bisect(args):
+    import baw.cmd.bisect  # pylint:disable=W0621
     commits = args['bisect']
     cmds = list(sys.argv)[1:]
     cmds.remove('--bisect')
@@ -104,6 +97,7 @@ def run_bisect(args):
 
 
 def run_doc(args: dict):
+    import baw.cmd.doc  # pylint:disable=W0621
     root = baw.cmd.utils.get_root(args)
     result = baw.cmd.doc.doc(
         root=root,
@@ -113,16 +107,20 @@ def run_doc(args: dict):
 
 
 def run_lint(args: dict):
+    import baw.cmd.lint  # pylint:disable=W0621
     root = baw.cmd.utils.get_root(args)
     result = baw.cmd.lint.lint(
         root=root,
         scope=args['action'],
         verbose=args.get('verbose', 0),
+        new_only=args['base'] if args.get('new_only') else None,
+        in_process=args.get('in_process', False),
     )
     return result
 
 
 def run_plan(args: dict):
+    import baw.cmd.plan  # pylint:disable=W0621
     root = baw.cmd.utils.get_root(args)
     result = baw.cmd.plan.action(
         root=root,
@@ -7,19 +7,36 @@
 # be prosecuted under federal law. Its content is company confidential.
 #==============================================================================
 
-import concurrent.futures
+import collections
 import os
 import shutil
 import subprocess
 import sys
+import threading
 import time
 
 import baw
 import baw.config
+import baw.parallel
 import baw.utils
 
 NO_EXECUTABLE = 127
 
+# lines of stdout/stderr which are kept when streaming process output
+TAIL = 200
+
+
+class StreamedProcess(subprocess.CompletedProcess):
+    """Completed process which only holds the tail of stdout/stderr.
+
+    If `echoed` is True, every line was already forwarded to the logger
+    while the process was running.
+    """
+
+    def __init__(self, args, returncode, stdout, stderr, echoed: bool):
+        super().__init__(args, returncode, stdout=stdout, stderr=stderr)
+        self.echoed = echoed
+
 
 def destroy(path: str):
     """Remove venv path recursive if path exists, do nothing."""
@@ -49,6 +66,8 @@ def run_target(
     runtimelog: bool = True,
     skip_error_code: set = None,
     skip_error_message: list = None,
+    stream: bool = False,
+    jobs: int = 1,
     verbose: int = 4,
 ) -> subprocess.CompletedProcess:
     """Run target
@@ -66,6 +85,9 @@ def run_target(
                               process works successfully
         skip_error_message(list): list of error messages which are
                                   expected as no problem
+        stream(bool): read output incrementally, forward it to the logger
+                      when `verbose` and keep only the tail
+        jobs(int): number of workers started by cmd, see `baw.parallel`
         verbose(bool): explain what is beeing done
 
     Returns:
@@ -90,6 +112,9 @@ def run_target(
         cwd=cwd,
         debugging=debugging,
         env=env,
+        stream=stream,
+        echo=bool(verbose),
+        jobs=jobs,
     )
     log_result(
         completed,
@@ -147,10 +172,12 @@ def log_result(  # pylint:disable=R1260,R0912
     if isinstance(skip_error_code, int):
         skip_error_code = {skip_error_code}
     reporting = returncode and (returncode not in skip_error_code)
+    # streamed output was already forwarded while running
+    echoed = getattr(completed, 'echoed', False)
     if reporting:
         msg = f'Completed: `{cmd}` in `{cwd}` returncode: {returncode}\n'
         baw.error(msg)
-    if completed.stdout and verbose:
+    if completed.stdout and verbose and not echoed:
         baw.log(completed.stdout)
     if verbose:
         if not reporting:
@@ -165,10 +192,11 @@ def log_result(  # pylint:disable=R1260,R0912
         error_message = ''
     for remove_skip in skip_error_message:
         error_message = error_message.replace(remove_skip, '')
-    if reporting and error_message.strip():
+    if reporting and error_message.strip() and not echoed:
         baw.error(error_message.strip())
     if verbose:
-        baw.completed(completed)
+        if not echoed:
+            baw.completed(completed)
         if start is not None:
             baw.utils.print_runtime(start)
 
@@ -179,9 +207,26 @@ def run(
     env=None,
     debugging: bool = False,
     live: bool = False,
+    stream: bool = False,
+    echo: bool = True,
+    tail: int = TAIL,
+    jobs: int = 1,
 ):
     """Run process.
 
+    Args:
+        cmd(str): cmd to run in shell
+        cwd(str): location where cmd is executed
+        env(dict): environment of process, use os.environ if None
+        debugging(bool): do not capture stdout/stderr
+        live(bool): same as debugging
+        stream(bool): read stdout/stderr incrementally with bounded
+                      memory, see `run_stream`
+        echo(bool): forward streamed lines to logger
+        tail(int): number of streamed lines to keep
+        jobs(int): number of job tokens which are required by cmd
+    Returns:
+        CompletedProcess - os process which was runned
     Hint:
         Do not use stdout/stderr=PIPE, after this, running pdb with
         cmdline is not feasible :) anymore. TODO: Investigate why.
@@ -192,42 +237,113 @@ def run(
         env = dict(os.environ.items())
     if live:
         debugging = True
-    # Capturering stdout and stderr reuqires PIPE in completed process.
-    # Debugging with pdb due console requires no PIPE.
-    process = subprocess.run(  # pylint:disable=W1510 # nosec
+    with baw.parallel.slot(jobs) as acquired:
+        env = baw.parallel.budget(env, acquired)
+        if stream and not debugging:
+            return run_stream(cmd, cwd=cwd, env=env, echo=echo, tail=tail)
+        # Capturering stdout and stderr reuqires PIPE in completed process.
+        # Debugging with pdb due console requires no PIPE.
+        process = subprocess.run(  # pylint:disable=W1510 # nosec
+            cmd,
+            cwd=cwd,
+            encoding=baw.utils.UTF8,
+            env=env,
+            shell=True,
+            stderr=None if debugging else subprocess.PIPE,
+            stdout=None if debugging else subprocess.PIPE,
+            errors='ignore',
+            universal_newlines=True,
+            check=False,
+        )
+    return process
+
+
+def run_stream(
+    cmd: str,
+    cwd: str,
+    env: dict,
+    echo: bool = True,
+    tail: int = TAIL,
+) -> StreamedProcess:
+    """Run process and read stdout/stderr line by line while running.
+
+    Memory is bounded by `tail`, only the last lines of every pipe are
+    kept for error reporting.
+
+    >>> run_stream('echo hello; echo world >&2', cwd=None, env=None, echo=False).stdout
+    'hello\\n'
+    >>> run_stream('seq 10', cwd=None, env=None, echo=False, tail=2).stdout
+    '9\\n10\\n'
+    """
+    with subprocess.Popen(  # pylint:disable=W1510 # nosec
+            cmd,
+            cwd=cwd,
+            encoding=baw.utils.UTF8,
+            env=env,
+            shell=True,
+            stderr=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            errors='ignore',
+            universal_newlines=True,
+    ) as process:
+        stdout = collections.deque(maxlen=tail)
+        stderr = collections.deque(maxlen=tail)
+        readers = [
+            threading.Thread(
+                target=pump,
+                args=(process.stdout, stdout, baw.log if echo else None),
+            ),
+            threading.Thread(
+                target=pump,
+                args=(process.stderr, stderr, baw.error if echo else None),
+            ),
+        ]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        returncode = process.wait()
+    result = StreamedProcess(
         cmd,
-        cwd=cwd,
-        encoding=baw.utils.UTF8,
-        env=env,
-        shell=True,
-        stderr=None if debugging else subprocess.PIPE,
-        stdout=None if debugging else subprocess.PIPE,
-        errors='ignore',
-        universal_newlines=True,
-        check=False,
+        returncode,
+        stdout=''.join(stdout),
+        stderr=''.join(stderr),
+        echoed=echo,
     )
-    return process
+    return result
+
+
+def pump(pipe, collected: collections.deque, logger=None):
+    for line in pipe:
+        collected.append(line)
+        if logger:
+            logger(line.rstrip('\n'))
 
 
 def runs(
     cmds: list,
     cwd: str,
     verbose: int = 0,
-    workers: int = 12,
+    timeout: float = None,
+    jobs: int = 1,
 ) -> int:
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        waitfor = []
-        for cmd in cmds:
-            waitfor.append(executor.submit(
-                run,
-                cmd=cmd,
-                cwd=cwd,
-            ))
-        for future in concurrent.futures.as_completed(waitfor):
-            completed = future.result()
-            if completed.returncode:
-                baw.error(f'error: {completed.stderr}')
-                return baw.FAILURE
+    """Run `cmds` in parallel, stop remaining cmds after first failure.
+
+    >>> runs(['true', 'true'], cwd=None)
+    0
+    """
+    for completed in baw.parallel.execute(
+            cmds,
+            cwd=cwd,
+            timeout=timeout,
+            tokens=jobs,
+    ):
+        if completed.timeout:
+            baw.error(f'timeout: {completed.cmd}')
+            return baw.FAILURE
+        if completed.returncode and not completed.cancelled:
+            baw.error(f'error: {completed.stderr}')
+            return baw.FAILURE
     if verbose:
         baw.log(f'{cmds}: complete\n')
     return baw.SUCCESS
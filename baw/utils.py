@@ -12,6 +12,7 @@ import concurrent.futures
 import contextlib
 import functools
 import glob
+import json
 import math
 import os
 import random
@@ -192,6 +193,18 @@ def tmp(root: str) -> str:
     return path
 
 
+def plugins(env: dict) -> dict:
+    """Make the modules of baw/plugins importable in subprocess with `env`.
+
+    >>> 'plugins' in plugins({})['PYTHONPATH']
+    True
+    """
+    path = utilo.join(baw.ROOT, 'baw/plugins')
+    pythonpath = [path, env.get('PYTHONPATH', '')]
+    env['PYTHONPATH'] = os.pathsep.join(item for item in pythonpath if item)
+    return env
+
+
 def tmpname(width: int = 10):
     """\
     >>> len(tmpname(15))
@@ -358,6 +371,10 @@ def fork(
     >>> fork(['Not A Method', 'Also not a method'], returncode=True) == baw.FAILURE
     True
     """
+    import baw.parallel  # pylint:disable=W0621
+
+    # processes started by runnables share the global limit
+    worker = min(worker, baw.parallel.workers())
     failure = 0
     executor = concurrent.futures.ThreadPoolExecutor
     if process:
@@ -464,6 +481,7 @@ def git_hash(root) -> str:
 
 
 def static(root):
+    import baw.cmd.info  # pylint:disable=W0621
     short = baw.cmd.info.baw_name(root)
     if not short:
         exitx(msg=f"missing short `{short}` def in .baw: {root}")
@@ -583,18 +601,37 @@ def file_list(  # pylint:disable=R1260
     return result
 
 
+def load_json(path: str) -> dict:
+    """Load json object of `path`, empty if missing or invalid."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        return json.loads(utilo.file_read(path))
+    except ValueError:
+        return {}
+
+
 def load_toml(path: str) -> dict:
     """\
     >>> load_toml(PYPROJECT)
     {'build-system': {'requires':... 'section_whitelines': 1}}}
     """
-    config = {}
     with open(path, "rb") as f:
-        try:
-            config = tomllib.load(f)
-        except tomllib.TOMLDecodeError as err:
-            baw.error(f'invalid config {path}')
-            baw.exitx(msg=str(err))
+        return parse_toml(f.read(), path)
+
+
+def parse_toml(content: bytes, path: str = '') -> dict:
+    """Parse toml `content` of `path`, exit if content is invalid.
+
+    >>> parse_toml(b'[a]\\nb = 1\\n')
+    {'a': {'b': 1}}
+    """
+    config = {}
+    try:
+        config = tomllib.loads(content.decode(UTF8))
+    except tomllib.TOMLDecodeError as err:
+        baw.error(f'invalid config {path}')
+        baw.exitx(msg=str(err))
     return config
 
 
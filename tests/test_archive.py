@@ -28,3 +28,23 @@ def test_tested(testdir):
     assert not baw.archive.test.is_tested(root, hashed)
     assert baw.archive.test.mark_tested(root, hashed)
     assert baw.archive.test.is_tested(root, hashed)
+
+
+def test_tested_metadata_and_migration(testdir):
+    root = testdir.tmpdir
+    baw.file_create(root.join('.baw'))
+    baw.config.create(root, baw.tmpname(15), 'tested')
+    # legacy text archive is imported on first use
+    baw.file_create(baw.archive.test.path_tested(root), 'legacy\n')
+    assert baw.archive.test.is_tested(root, 'legacy')
+    baw.archive.test.mark_tested(
+        root,
+        'abc',
+        mode='long',
+        duration=1.5,
+        workers=4,
+        requirements='1234',
+    )
+    loaded = baw.archive.test.record(root, 'abc')
+    assert (loaded.mode, loaded.duration, loaded.workers) == ('long', 1.5, 4)
+    assert loaded.requirements == '1234'
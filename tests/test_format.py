@@ -14,8 +14,11 @@ import utilo
 
 import baw
 import baw.cmd.format
+import baw.cmd.format.engine
 import baw.config
+import baw.runtime
 import tests
+import tests.fixtures.project
 
 
 @pytest.fixture
@@ -109,3 +112,119 @@ def test_format_invalid_yml(project_example, monkeypatch, capsys):  # pylint:dis
     stderr = tests.stderr(capsys)
     expected = 'ruyaml.scanner.ScannerError: mapping values are not allowed here'
     assert expected in stderr
+
+
+def test_format_changed_only(example, capsys):
+    root = str(example)
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    assert not baw.cmd.format.format_repository(root, changed=True)
+    baw.runtime.run('git add . && git commit -m "format"', cwd=root)
+    ugly = utilo.join(root, f'{name}/ugly.py')
+    utilo.file_create(ugly, 'VALUE=( 1 )\n')
+    capsys.readouterr()
+    assert not baw.cmd.format.format_repository(root, changed=True)
+    assert 'format: 1 changed files' in capsys.readouterr().out
+    assert utilo.file_read(ugly) == 'VALUE = (1)\n'
+    assert not baw.cmd.format.format_repository(root, changed=True)
+    assert 'format: no changed files' in capsys.readouterr().out
+    # untracked file differs from git base
+    assert not baw.cmd.format.format_repository(root, base='HEAD')
+    assert 'format: 1 changed files' in capsys.readouterr().out
+
+
+UNFORMATTED = """\
+import sys, os
+from pytest import fixture
+import abc.core
+def value( a,b ):
+    return {'a':a,
+    'b' : b}
+"""
+
+
+def test_format_engine_equals_cmdline(testdir):
+    args = ' '.join(baw.cmd.format.ISORT) % 'abc'
+    for folder in ('cmdline', 'engine'):
+        os.makedirs(f'{folder}/abc')
+        utilo.file_create(f'{folder}/abc/__init__.py', UNFORMATTED)
+        utilo.file_create(f'{folder}/abc/crlf.py',
+                          UNFORMATTED.replace('\n', '\r\n'))
+    cmdline = testdir.tmpdir.join('cmdline/abc')
+    files = [str(cmdline.join(item)) for item in ('__init__.py', 'crlf.py')]
+    for cmd in (
+            f'yapf -i --style=google --no-local-style {" ".join(files)}',
+            f'isort {args} {cmdline}',
+    ):
+        assert not baw.runtime.run(cmd, cwd=testdir.tmpdir).returncode
+    engine = testdir.tmpdir.join('engine/abc')
+    files = [str(engine.join(item)) for item in ('__init__.py', 'crlf.py')]
+    assert not baw.cmd.format.engine.format_files(
+        str(testdir.tmpdir),
+        files,
+        baw.cmd.format.STYLE,
+    )
+    assert not baw.cmd.format.engine.sort_imports(args, folders=[str(engine)])
+    for item in ('__init__.py', 'crlf.py'):
+        expected = cmdline.join(item).read_binary()
+        assert engine.join(item).read_binary() == expected
+        assert expected != UNFORMATTED.encode()
+
+
+SORTED = """\
+import sys
+import os
+x = os.sep + sys.platform
+"""
+
+
+def test_format_engine_sort_paths_config_per_folder(testdir):
+    args = ' '.join(baw.cmd.format.ISORT) % 'abc'
+    for folder in ('cmdline', 'engine'):
+        for source in ('abc', 'tests'):
+            os.makedirs(f'{folder}/{source}')
+            utilo.file_create(f'{folder}/{source}/a.py', SORTED)
+        utilo.file_create(
+            f'{folder}/tests/.isort.cfg',
+            '[settings]\nlines_after_imports = 2\n',
+        )
+    cmdline = testdir.tmpdir.join('cmdline')
+    for source in ('abc', 'tests'):
+        completed = baw.runtime.run(
+            f'isort {args} {cmdline.join(source)}',
+            cwd=cmdline.join(source),
+        )
+        assert not completed.returncode
+    engine = testdir.tmpdir.join('engine')
+    assert not baw.cmd.format.engine.sort_imports(
+        args,
+        paths=[str(engine.join(item, 'a.py')) for item in ('abc', 'tests')],
+        root=str(engine),
+    )
+    for source in ('abc', 'tests'):
+        expected = cmdline.join(source, 'a.py').read_binary()
+        assert engine.join(source, 'a.py').read_binary() == expected
+    # config of tests is not used for abc
+    first, second = (cmdline.join(item, 'a.py') for item in ('abc', 'tests'))
+    assert first.read() != second.read()
+
+
+def test_format_discover_skips_ignored(example):
+    root = str(example)
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    with open(utilo.join(root, '.git/info/exclude'), 'a',
+              encoding='utf8') as fp:
+        fp.write('\nscratch/\n')
+    os.makedirs(utilo.join(root, 'scratch/deep'))
+    utilo.file_create(utilo.join(root, 'scratch/deep/skip.toml'), '[a]\n')
+    utilo.file_create(utilo.join(root, f'{name}/keep.toml'), '[a]\nb = 1\n')
+    found = baw.cmd.format.discover(root)
+    assert f'{name}/keep.toml' in found[baw.cmd.format.TOML]
+    assert not any(
+        item.startswith(('scratch/', '.git/'))
+        for paths in found.values()
+        for item in paths)
+    # formatted toml is not written again
+    path = utilo.join(root, f'{name}/keep.toml')
+    os.utime(path, (0, 0))
+    assert not baw.cmd.format.format_toml(root)
+    assert os.stat(path).st_mtime == 0
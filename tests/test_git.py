@@ -7,9 +7,12 @@
 # be prosecuted under federal law. Its content is company confidential.
 # =============================================================================
 
+import os
+
 import baw.cmd.release
 import baw.gix
 import baw.runtime
+import baw.utils
 
 
 def test_commit_with_tag(simple):
@@ -37,3 +40,38 @@ def test_stash(simple):
     with baw.git_stash(root):
         assert baw.is_clean(root)
     assert not baw.is_clean(root)
+
+
+def test_session_matches_git(simple):
+    root = simple[1]
+    head = baw.runtime.run('git rev-parse --verify HEAD', cwd=root)
+    assert baw.gix.headhash(root) == head.stdout.strip()
+    assert baw.gix.headtag(root) == baw.cmd.release.FIRST_RELEASE
+    assert baw.gix.branchname(root) == 'main'
+    # invalidate after commit and tag
+    baw.runtime.run_target(root, 'touch ABC')
+    baw.gix.git_add(root, 'ABC')
+    baw.gix.git_commit(root, source='ABC', message='abc', tag='v0.1.0')
+    assert baw.gix.headhash(root) != head.stdout.strip()
+    assert baw.gix.headtag(root) == 'v0.1.0'
+    # detect changes made without baw
+    baw.runtime.run('git tag extern', cwd=root)
+    assert baw.gix.headtag(root) == 'extern\nv0.1.0'
+
+
+def test_is_clean_staged_and_exclude(simple, monkeypatch):
+    root = simple[1]
+    monkeypatch.setenv('LANG', 'de_DE.UTF-8')
+    assert baw.is_clean(root)
+    exclude = os.path.join(root, baw.gix.GIT_REPO_EXCLUDE)
+    before = os.stat(exclude).st_mtime_ns
+    assert baw.is_clean(root)
+    # exclude file is synced only if content changed
+    assert os.stat(exclude).st_mtime_ns == before
+    baw.runtime.run_target(root, 'touch ABC && git add ABC')
+    assert not baw.is_clean(root)
+    assert baw.gix.is_modified(root)
+    with open(exclude, 'a', encoding='utf8') as fp:
+        fp.write('ABC\n')
+    baw.gix.update_gitignore(root)
+    assert 'ABC\n' not in baw.utils.file_read(exclude)
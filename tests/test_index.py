@@ -0,0 +1,64 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+
+import glob
+import os
+
+import utilo
+
+import baw.config
+import baw.index
+import baw.runtime
+
+
+def test_index_prune_and_buckets(testdir):
+    root = str(testdir.tmpdir)
+    baw.runtime.run('git init', cwd=root)
+    utilo.file_create(utilo.join(root, '.gitignore'), 'out/\n*.log\n')
+    for item in ('pk/sub', 'out/deep', 'venv/lib', 'pk/__pycache__'):
+        os.makedirs(utilo.join(root, item))
+    for item in ('pk/a.py', 'pk/sub/b.py', 'pk/c.toml', 'pk/x.log',
+                 'out/deep/d.py', 'venv/lib/e.py', 'pk/__pycache__/a.pyc'):
+        utilo.file_create(utilo.join(root, item))
+    index = baw.index.snapshot(root)
+    assert index.files(('.py',)) == ['pk/a.py', 'pk/sub/b.py']
+    assert index.files(('.toml',), ['pk']) == ['pk/c.toml']
+    assert 'out' not in [item[0] for item in index.walk()]
+    # clean matches ignored entries like glob
+    for pattern in ('*.log', '__pycache__', 'out', 'sub/*.py'):
+        assert index.match(pattern) == sorted(
+            glob.glob(f'{root}/**/{pattern}', recursive=True)), pattern
+
+
+def test_index_refresh_changed_folders(testdir, monkeypatch):
+    root = str(testdir.tmpdir)
+    os.makedirs(utilo.join(root, 'pk'))
+    utilo.file_create(utilo.join(root, 'pk/a.py'))
+    assert baw.index.snapshot(root).files() == ['pk/a.py']
+    utilo.file_create(utilo.join(root, 'pk/b.py'))
+    # racy folders are scanned again
+    assert baw.index.snapshot(root).files() == ['pk/a.py', 'pk/b.py']
+    monkeypatch.setattr(baw.config, 'bawtmp',
+                        lambda: testdir.tmpdir.join('tmpdir'))
+    monkeypatch.setattr(baw.index, 'RACY', 0.0)
+    monkeypatch.setattr(baw.index, 'SNAPSHOTS', {})
+    baw.index.snapshot(root, persist=True)
+    assert os.path.exists(baw.index.path_index(root))
+    scanned = []
+    listing = baw.index.listing
+    monkeypatch.setattr(
+        baw.index,
+        'listing',
+        lambda path, mtime: scanned.append(path) or listing(path, mtime),
+    )
+    monkeypatch.setattr(baw.index, 'SNAPSHOTS', {})
+    # persisted index of unchanged folders is reused
+    index = baw.index.snapshot(root, persist=True)
+    assert index.files(('.py',)) == ['pk/a.py', 'pk/b.py']
+    assert utilo.join(root, 'pk') not in scanned
@@ -7,11 +7,18 @@
 # be prosecuted under federal law. Its content is company confidential.
 # =============================================================================
 
+import os
+
 import utilo
 
 import baw.cmd.lint
+import baw.cmd.lint.cache
+import baw.cmd.lint.shard
+import baw.parallel
+import baw.runtime
 import baw.utils
 import tests
+import tests.fixtures.project
 
 
 @tests.nightly
@@ -51,3 +58,97 @@ def test_linter_run_with_scope(example, capsys):
 @tests.longrun
 def test_linter_run_cli(example, monkeypatch):  # pylint:disable=W0613,W0621
     tests.baaw('lint todo', monkeypatch=monkeypatch)
+
+
+def test_linter_incremental_equals_full(example, capsys):
+    root = str(example)
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    calc = utilo.join(root, f'{name}/calc.py')
+    utilo.file_replace(calc, '"""Calc."""\n\n\ndef value():\n    return 1\n')
+    utilo.file_replace(
+        utilo.join(root, f'{name}/user.py'),
+        f'"""User."""\n\nimport {name}.calc\n\nRESULT = {name}.calc.value()\n',
+    )
+    full = lint(root, capsys)
+    assert lint(root, capsys) == full
+    # removed function is reported in unchanged importing module
+    utilo.file_replace(calc, '"""Calc."""\n')
+    incremental = lint(root, capsys)
+    assert incremental != full
+    assert 'E1101' in incremental[1], incremental
+    for tool in ('pylint', 'bandit'):
+        os.remove(baw.cmd.lint.cache.path_cache(root, tool))
+    assert lint(root, capsys) == incremental
+
+
+def test_linter_shards_equal_one_process(example, capsys, monkeypatch):
+    root = str(example)
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    for index in range(4):
+        utilo.file_replace(
+            utilo.join(root, f'{name}/module{index}.py'),
+            f'import {name}.module{(index + 1) % 4}\n\nVALUE={index}\n',
+        )
+    monkeypatch.setattr(baw.cmd.lint.shard, 'MIN_FILES', 1)
+    monkeypatch.setattr(baw.parallel, 'share', lambda: 3)
+    sharded = lint(root, capsys)
+    assert 'W0611' in sharded[1], sharded
+    cached = baw.cmd.lint.cache.load(root, 'pylint')['files']
+    assert cached[f'{name}/module0.py']['duration'] > 0
+    os.remove(baw.cmd.lint.cache.path_cache(root, 'pylint'))
+    monkeypatch.setattr(baw.parallel, 'share', lambda: 1)
+    assert lint(root, capsys) == sharded
+
+
+def test_linter_new_only_and_rating(example, capsys, monkeypatch):
+    root = str(example)
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    module = utilo.join(root, f'{name}/legacy.py')
+    utilo.file_replace(module, '"""Legacy."""\n\nimport os\n')
+    baw.runtime.run('git add . && git commit -m "legacy"', cwd=root)
+    assert lint(root, capsys)[0]
+    # moved finding is no new finding
+    utilo.file_replace(module, '"""Legacy."""\n\n\nimport os\nimport sys\n')
+    returncode = baw.cmd.lint.lint(root, log_always=False, new_only='HEAD')
+    output = capsys.readouterr().out
+    assert returncode == baw.FAILURE, output
+    assert 'Unused import sys' in output, output
+    assert 'Unused import os' not in output, output
+    assert 'pylint: 1 new findings since HEAD' in output, output
+    # rating of recorded run does not lint again
+    rating = baw.cmd.lint.rating(root)
+    assert rating < 10.0, rating
+    monkeypatch.setattr(baw.cmd.lint, 'pylint', None)
+    assert baw.cmd.lint.rating(root) == rating
+
+
+def test_linter_in_process_equals_subprocess(example, capsys, monkeypatch):
+    root = str(example)
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    utilo.file_replace(
+        utilo.join(root, f'{name}/shell.py'),
+        'import os\nimport subprocess\n\nsubprocess.call("ls", shell=True)\n',
+    )
+    monkeypatch.setattr(baw.cmd.lint.shard, 'MIN_FILES', 1)
+    monkeypatch.setattr(baw.parallel, 'share', lambda: 2)
+    expected = lint(root, capsys)
+    assert 'W0611' in expected[1], expected
+    for tool in ('pylint', 'bandit'):
+        os.remove(baw.cmd.lint.cache.path_cache(root, tool))
+    assert lint(root, capsys, in_process=True) == expected
+    # incremental run of engine
+    utilo.file_replace(utilo.join(root, f'{name}/shell.py'), '"""Shell."""\n')
+    changed = lint(root, capsys, in_process=True)
+    assert changed != expected
+    assert lint(root, capsys) == changed
+
+
+def lint(root: str, capsys, in_process: bool = False) -> tuple:
+    returncode = baw.cmd.lint.lint(
+        root,
+        log_always=False,
+        in_process=in_process,
+    )
+    output = capsys.readouterr().out
+    report = [line for line in output.splitlines() if line.startswith('x')]
+    return returncode, '\n'.join(report)
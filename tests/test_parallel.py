@@ -0,0 +1,100 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+
+import contextlib
+import os
+import time
+
+import baw.parallel
+import baw.runtime
+
+
+def test_parallel_execute_cwd(testdir):
+    first = testdir.mkdir('first')
+    second = testdir.mkdir('second')
+    completed = baw.parallel.execute([
+        ('pwd', str(first)),
+        ('pwd', str(second)),
+    ])
+    assert [item.stdout.strip() for item in completed] == [
+        str(first),
+        str(second),
+    ]
+    assert all(item.returncode == baw.SUCCESS for item in completed)
+
+
+def test_parallel_execute_without_failfast():
+    completed = baw.parallel.execute(
+        ['exit 3', 'echo done'],
+        failfast=False,
+    )
+    assert completed[0].returncode == 3
+    assert completed[1].stdout == 'done\n'
+    assert not any(item.cancelled for item in completed)
+
+
+def test_parallel_execute_shared_limit(monkeypatch):
+    monkeypatch.setenv(baw.parallel.JOBS, '1')
+    baw.parallel.setup()
+    try:
+        start = time.time()
+        baw.parallel.execute(['sleep 0.2', 'sleep 0.2'])
+        # one token only: processes run one after another
+        assert time.time() - start >= 0.4
+        with baw.parallel.slot():
+            assert not baw.parallel.jobserver().acquire(blocking=False)
+    finally:
+        monkeypatch.delenv(baw.parallel.JOBS)
+        baw.parallel.setup()
+
+
+def test_parallel_budget_nested(monkeypatch):
+    monkeypatch.setenv(baw.parallel.JOBS, '4')
+    baw.parallel.setup()
+    try:
+        assert baw.parallel.share(8) == 4
+        # nested baw process inherits the acquired share only
+        completed = baw.parallel.execute(
+            [f'echo ${baw.parallel.JOBS}'],
+            tokens=3,
+        )
+        assert completed[0].stdout == '3\n'
+        # a single token limits the nested process to one job
+        completed = baw.parallel.execute([f'echo ${baw.parallel.JOBS}'])
+        assert completed[0].stdout == '1\n'
+        completed = baw.runtime.run(f'echo ${baw.parallel.JOBS}', jobs=8)
+        assert completed.stdout == '4\n'
+    finally:
+        monkeypatch.delenv(baw.parallel.JOBS)
+        baw.parallel.setup()
+
+
+def test_parallel_execute_kill_children(testdir):
+    pidfile = testdir.tmpdir.join('pid')
+    completed = baw.parallel.execute(
+        [f'sleep 30 & echo $! > {pidfile}; wait'],
+        timeout=0.5,
+    )
+    assert completed[0].timeout
+    pid = int(pidfile.read())
+    time.sleep(0.1)
+    # child of shell is killed with the process group
+    assert not alive(pid)
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # killed but not reaped by init yet
+    stat = f'/proc/{pid}/stat'
+    with contextlib.suppress(OSError), open(stat, encoding='utf8') as fp:
+        return fp.read().split()[2] != 'Z'
+    return True
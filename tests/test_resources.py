@@ -8,6 +8,7 @@
 # =============================================================================
 
 import baw
+import baw.resources
 from baw.resources import CODE_WORKSPACE
 from baw.resources import RCFILE_PATH
 from baw.resources import template_replace
@@ -22,3 +23,24 @@ def test_template_replace():
 
     assert '{{RCFILE}}' not in replaced
     assert RCFILE_PATH in replaced
+
+
+def test_template_lazy():
+    loaded = baw.resources.load_template('Jenkinsfile')
+    assert baw.resources.JENKINSFILE is loaded
+    assert baw.resources.DOTGITHUB[0][0] == '.github/dependabot.yml'
+    assert not hasattr(baw.resources, 'NOT_A_TEMPLATE')
+
+
+def test_template_packed(testdir, monkeypatch):
+    outpath = str(testdir.tmpdir.join('templates.pack'))
+    monkeypatch.setattr(baw.resources, 'PACKED', outpath)
+    try:
+        baw.resources.pack(outpath)
+        assert baw.resources.packed()
+        assert baw.resources.load_template('LICENSE') == baw.resources.fread(
+            baw.resources.joined('LICENSE'))
+    finally:
+        monkeypatch.undo()
+        baw.resources.packed.cache_clear()
+        baw.resources.load_template.cache_clear()
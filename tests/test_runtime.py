@@ -0,0 +1,39 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+
+import baw.runtime
+import tests
+
+
+def test_run_stream_echo(testdir, capsys):
+    cmd = 'echo hello; echo broken >&2; exit 3'
+    completed = baw.runtime.run_target(
+        testdir.tmpdir,
+        cmd,
+        stream=True,
+        verbose=1,
+    )
+    assert completed.returncode == 3
+    assert completed.echoed
+    assert completed.stdout == 'hello\n'
+    captured = capsys.readouterr()
+    assert captured.out.splitlines().count('hello') == 1
+    assert captured.err.splitlines().count('[ERROR] broken') == 1
+
+
+def test_run_stream_tail(testdir, capsys):
+    completed = baw.runtime.run(
+        'seq 10000',
+        cwd=testdir.tmpdir,
+        stream=True,
+        echo=False,
+        tail=3,
+    )
+    assert completed.stdout == '9998\n9999\n10000\n'
+    assert not tests.stdout(capsys)
@@ -0,0 +1,91 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+
+import os
+import subprocess
+import sys
+import time
+
+import utilo
+
+import baw.client
+import tests
+
+
+def test_serve_forward_without_daemon(testdir, monkeypatch):
+    monkeypatch.setenv('BAW', str(testdir.tmpdir))
+    assert baw.client.forward(['baw', 'info', 'name']) is None
+
+
+def test_serve_forward_selected_command(testdir, monkeypatch):
+    monkeypatch.setenv('BAW', str(testdir.tmpdir))
+    path = baw.client.socket_path()
+    script = ('from baw.plugins import bawserve; '
+              f'bawserve.serve({path!r}, lambda request: lambda request: 3)')
+    with subprocess.Popen([sys.executable, '-c', script]) as server:  # nosec
+        try:
+            wait(path)
+            assert baw.client.forward(['baw', 'serve']) is None
+            assert baw.client.forward(['baw', 'test', '--pdb']) is None
+            # option value is no subcommand
+            assert baw.client.forward(['baw', 'test', '-k', 'serve']) == 3
+            # other users can access the socket dir
+            os.chmod(os.path.dirname(path), 0o755)
+            assert baw.client.forward(['baw', 'test', '-k', 'serve']) is None
+        finally:
+            server.terminate()
+
+
+def wait(path: str):
+    # the daemon imports every subcommand first, slow on a loaded machine
+    for _ in range(300):
+        if os.path.exists(path):
+            return
+        time.sleep(0.1)
+    assert os.path.exists(path)
+
+
+def test_serve_client_imports():
+    """Importing the client does not import the cli or any subcommand."""
+    completed = subprocess.run(  # nosec
+        [
+            sys.executable,
+            '-c',
+            'import sys, baw.client; print(sorted(sys.modules))',
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert "'baw.cli'" not in completed.stdout
+    assert "'baw.cmd" not in completed.stdout
+
+
+@tests.longrun
+@tests.hasbaw
+def test_serve_daemon(testdir):
+    env = dict(os.environ.items())
+    env['BAW'] = str(testdir.tmpdir)
+    socket = utilo.join(testdir.tmpdir, 'sockets', baw.client.SOCKET)
+    with subprocess.Popen(['baw', 'serve'], env=env) as daemon:  # nosec
+        try:
+            wait(socket)
+            completed = subprocess.run(  # nosec
+                ['baw', 'info', 'shortcut'],
+                cwd=tests.PROJECT,
+                env=env,
+                capture_output=True,
+                check=False,
+                text=True,
+            )
+            assert completed.returncode == baw.SUCCESS, completed.stderr
+            assert completed.stdout.strip() == 'baw'
+        finally:
+            daemon.terminate()
+    assert not os.path.exists(socket)
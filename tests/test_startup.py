@@ -0,0 +1,81 @@
+# =============================================================================
+# C O P Y R I G H T
+# -----------------------------------------------------------------------------
+# Copyright (c) 2023 by Helmut Konrad Schewe. All rights reserved.
+# This file is property of Helmut Konrad Schewe. Any unauthorized copy,
+# use or distribution is an offensive act against international law and may
+# be prosecuted under federal law. Its content is company confidential.
+# =============================================================================
+"""Benchmark cold start of trivial cmds with `python -X importtime`."""
+
+import subprocess
+import sys
+
+import pytest
+
+import tests
+
+# third party packages which are only required by heavy subcommands
+HEAVY = 'docker git semver pip'.split()
+
+# Import time of baw itself, measured relative to the import time of
+# utilo. Using a ratio keeps the benchmark stable on loaded machines.
+BUDGET = 0.5
+
+STARTUP = """\
+import baw.cli
+import baw.run
+baw.cli.create_parser(%r)
+"""
+
+
+def importtime(argv: list) -> dict:
+    """Run parser creation of `argv` and return imported modules with
+    their cumulative import time in micro seconds."""
+    completed = subprocess.run(  # nosec
+        [sys.executable, '-X', 'importtime', '-c', STARTUP % argv],
+        cwd=tests.PROJECT,
+        capture_output=True,
+        check=False,
+        text=True,
+    )
+    assert not completed.returncode, completed.stderr
+    result = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        try:
+            # keep indentation of nested imports
+            result[name[1:].rstrip()] = int(cumulative)
+        except ValueError:
+            # header line
+            continue
+    return result
+
+
+@pytest.mark.parametrize('argv', [
+    ['--version'],
+    ['info', 'shortcut'],
+    ['info', 'name'],
+])
+def test_startup_skip_heavy_imports(argv):
+    imported = importtime(argv)
+    imported = {item.strip() for item in imported}
+    heavy = [item for item in HEAVY if item in imported]
+    assert not heavy, f'trivial cmd {argv} imports: {heavy}'
+    commands = [item for item in imported if item.startswith('baw.cmd.')]
+    expected = {'baw.cmd.utils'}
+    if 'info' in argv:
+        expected.add('baw.cmd.info')
+    assert set(commands) <= expected, commands
+
+
+def test_startup_budget():
+    imported = importtime(['info', 'shortcut'])
+    imported = {key.strip(): value for key, value in imported.items()}
+    foundation = imported['utilo']
+    overhead = imported['baw.cli'] - foundation
+    ratio = overhead / foundation
+    assert ratio < BUDGET, f'startup regression: {overhead}us {ratio:.2f}'
@@ -7,12 +7,24 @@
 # be prosecuted under federal law. Its content is company confidential.
 # =============================================================================
 
+import json
 import os
+import sys
 import textwrap
+import time
 
+import pytest
 import utilo
 
 import baw
+import baw.cmd.test.covmap
+import baw.cmd.test.durations
+import baw.cmd.test.impact
+import baw.cmd.test.session
+import baw.cmd.test.shard
+import baw.cmd.test.warm
+import baw.cmd.test.watch
+import baw.runtime
 import tests
 import tests.fixtures.project
 
@@ -91,3 +103,227 @@ def test_cmd_test_all(simple):
     )
     completed = utilo.run('baw test fast -n1', cwd=root)
     assert 'test_all PASSED' in completed.stdout or 'test_all PASSED' in completed.stderr
+
+
+def test_cmd_test_cache(simple):
+    root = simple[1]
+    utilo.file_create(
+        utilo.join(root, 'tests/test_simple.py'),
+        content=SIMPLE,
+    )
+    completed = utilo.run('baw test fast -n1', cwd=root)
+    assert 'test_all PASSED' in completed.stdout + completed.stderr
+    # nothing changed: replay
+    completed = utilo.run('baw test fast -n1', cwd=root)
+    output = completed.stdout + completed.stderr
+    assert 'test_all PASSED' not in output
+    assert 'replay cached result' in output
+    # force running
+    completed = utilo.run('baw test fast -n1 --no-cache', cwd=root)
+    assert 'test_all PASSED' in completed.stdout + completed.stderr
+    # changed test: run again
+    utilo.file_append(utilo.join(root, 'tests/test_simple.py'), '\n')
+    completed = utilo.run('baw test fast -n1', cwd=root)
+    assert 'test_all PASSED' in completed.stdout + completed.stderr
+    # new root conftest: run again
+    utilo.file_create(utilo.join(root, 'conftest.py'), content='')
+    completed = utilo.run('baw test fast -n1', cwd=root)
+    assert 'test_all PASSED' in completed.stdout + completed.stderr
+
+
+def test_test_changed_selection(simple):
+    root = simple[1]
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    for path, content in (
+        (f'{name}/first.py', ''),
+        (f'{name}/second.py', f'from {name} import first\n'),
+        ('tests/test_first.py', f'import {name}.first\n'),
+        ('tests/test_second.py', f'from {name}.second import first\n'),
+        ('tests/test_other.py', 'import os\n'),
+    ):
+        utilo.file_create(utilo.join(root, path), content)
+    baw.runtime.run('git add . && git commit -m "add"', cwd=root)
+    assert baw.cmd.test.impact.select(root) == []
+    utilo.file_append(utilo.join(root, f'{name}/first.py'), 'VALUE = 1\n')
+    assert baw.cmd.test.impact.select(root) == [
+        'tests/test_first.py',
+        'tests/test_second.py',
+        f'{name}/first.py',
+        f'{name}/second.py',
+    ]
+    utilo.file_append(utilo.join(root, 'tests/conftest.py'), '\n')
+    assert baw.cmd.test.impact.select(root) is None
+
+
+HELPER = '''\
+def testing(value):
+    """
+    >>> testing(1)
+    1
+    """
+    return value
+'''
+
+
+def test_test_changed_source_with_test_function(simple):
+    root = simple[1]
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    # __init__ avoids requiring installed package metadata
+    utilo.file_replace(utilo.join(root, f'{name}/__init__.py'), '')
+    utilo.file_create(utilo.join(root, f'{name}/helper.py'), HELPER)
+    baw.runtime.run('git add . && git commit -m "add"', cwd=root)
+    utilo.file_append(utilo.join(root, f'{name}/helper.py'), 'VALUE = 1\n')
+    completed = utilo.run('baw test changed -n1', cwd=root)
+    output = completed.stdout + completed.stderr
+    # only the doctest of the selected source module runs
+    assert not completed.returncode, output
+    assert 'fixture' not in output
+    assert '1 passed' in output
+
+
+SOURCE = """\
+def first():
+    return 1
+
+
+def second():
+    return 2
+"""
+
+CALC_TEST = """\
+import {name}.calc
+
+def test_{test}():
+    assert {name}.calc.{test}() == {value}
+"""
+
+
+def test_test_changed_cov_map(simple):
+    root = simple[1]
+    name = tests.fixtures.project.EXAMPLE_PROJECT_NAME
+    first = CALC_TEST.format(name=name, test='first', value=1)
+    second = CALC_TEST.format(name=name, test='second', value=2)
+    # __init__ avoids requiring installed package metadata
+    for path, content in (
+        (f'{name}/__init__.py', ''),
+        (f'{name}/calc.py', SOURCE),
+        ('tests/test_first.py', first),
+        ('tests/test_second.py', second),
+    ):
+        utilo.file_replace(utilo.join(root, path), content)
+    baw.runtime.run('git add . && git commit -m "add"', cwd=root)
+    simple[0]('test --cov_map --no_report -n1')
+    assert os.path.exists(baw.cmd.test.covmap.mappath(root))
+    changed = SOURCE.replace('return 2', 'return 1 + 1')
+    utilo.file_replace(utilo.join(root, f'{name}/calc.py'), changed)
+    assert baw.cmd.test.covmap.select(root) == [
+        'tests/test_second.py::test_second',
+    ]
+    # changed signature runs on import only: use import graph
+    changed = SOURCE.replace('def second():', 'def second(value=None):')
+    utilo.file_replace(utilo.join(root, f'{name}/calc.py'), changed)
+    assert 'tests/test_first.py' in baw.cmd.test.covmap.select(root)
+
+
+def test_test_durations_schedule(simple):
+    root = simple[1]
+    utilo.file_create(
+        utilo.join(root, 'tests/test_slow.py'),
+        'import time\n\ndef test_slow():\n    time.sleep(0.3)\n\n'
+        'def test_quick():\n    pass\n',
+    )
+    simple[0]('test fast -n2 --no_cache')
+    durations = json.loads(
+        utilo.file_read(baw.cmd.test.durations.path_report(root)))
+    assert durations['tests/test_slow.py::test_slow'] >= 0.3
+    predicted = baw.cmd.test.durations.predict(root, 'fast', workers=2)
+    assert predicted >= 0.3
+    # schedule slowest test first
+    simple[0]('test fast -n2 --no_cache')
+    exported = json.loads(
+        utilo.file_read(baw.cmd.test.durations.path_export(root)))
+    assert exported['tests/test_slow.py::test_slow'] >= 0.3
+
+
+def test_test_shard_merge(simple):
+    root = simple[1]
+    utilo.file_create(
+        utilo.join(root, 'tests/test_shard.py'),
+        ''.join(f'def test_{index}():\n    pass\n\n\n' for index in range(5)),
+    )
+    shardir = baw.cmd.test.shard.shardir(root)
+    simple[0]('test fast -n1 --shard 1/2')
+    # missing second shard
+    simple[0]('test merge', expect=False)
+    simple[0]('test fast -n1 --shard 2/2')
+    simple[0]('test merge')
+    merged = utilo.file_read(utilo.join(shardir, 'junit.xml'))
+    for index in range(5):
+        assert merged.count(f'name="test_{index}"') == 1
+    durations = utilo.join(shardir, 'durations.json')
+    assert 'tests/test_shard.py::test_4' in utilo.file_read(durations)
+    # balance by durations of previous run
+    for index in (1, 2):
+        simple[0](
+            f'test fast -n1 --shard {index}/2 --shard_durations {durations}')
+    simple[0]('test merge')
+    merged = utilo.file_read(utilo.join(shardir, 'junit.xml'))
+    assert merged.count('<testcase') == 5
+
+
+def test_test_session_config_and_prune(tmpdir):
+    root = str(tmpdir)
+    path = baw.cmd.test.session.config(root)
+    written = os.stat(path).st_mtime_ns
+    # unchanged: do not touch
+    assert baw.cmd.test.session.config(root) == path
+    assert os.stat(path).st_mtime_ns == written
+    # changed by user: render again
+    utilo.file_replace(path, '[pytest]\n')
+    baw.cmd.test.session.config(root)
+    assert '--continue-on-collection-errors' in utilo.file_read(path)
+    testdirs = tmpdir.mkdir('testdirs')
+    for index in range(5):
+        created = testdirs.mkdir(f'test_10_00_0{index}')
+        os.utime(created, (index, index))
+    testdirs.mkdir('pytest_cache')
+    removed = baw.cmd.test.session.prune(str(testdirs), keep=3)
+    assert sorted(os.path.basename(item) for item in removed) == [
+        'test_10_00_00',
+        'test_10_00_01',
+    ]
+    assert len(os.listdir(testdirs)) == 4
+
+
+@pytest.mark.skipif(not baw.cmd.test.warm.available(), reason='require fork')
+def test_test_warm(simple):
+    root = simple[1]
+    path = utilo.join(root, 'tests/test_warm.py')
+    utilo.file_create(path, 'def test_warm():\n    assert True\n')
+    try:
+        simple[0]('test fast --warm --no_cache')
+        assert os.path.exists(baw.cmd.test.warm.socketpath(root))
+        # forked run imports changed code
+        utilo.file_replace(path, 'def test_warm():\n    assert False\n')
+        simple[0]('test fast --warm --no_cache', expect=False)
+    finally:
+        simple[0]('test --warm_stop')
+    assert not os.path.exists(baw.cmd.test.warm.socketpath(root))
+
+
+@pytest.mark.parametrize('kind', ('Inotify', 'Poller'))
+def test_test_watch_changes(tmpdir, kind):
+    if kind == 'Inotify' and not sys.platform.startswith('linux'):
+        pytest.skip('require linux')
+    watching = getattr(baw.cmd.test.watch, kind)([str(tmpdir)])
+    try:
+        assert watching.changes(0.1) == set()
+        tmpdir.mkdir('sub')
+        time.sleep(0.1)
+        path = tmpdir.join('sub/source.py')
+        path.write('VALUE = 1\n')
+        tmpdir.join('sub/.source.py.swp').write('')
+        changed = baw.cmd.test.watch.collect(watching, debounce=0.6)
+        assert changed == {str(path)}
+    finally:
+        watching.close()